@@ -1,72 +1,71 @@
+import os
 from flask import Flask, session
 from config import Config
-from models import db, UsuarioInfo
-from routes import is_admin
+from models.banco import init_banco
+from models.migracoes import verificar_esquema as _verificar_esquema
+from routes import is_admin, dados_do_usuario
 from services.oauth_service import init_oauth
+from services.sessoes import init_sessoes
+from services.indice_tags import indice_tags
+from services.registro_tags import registro_tags
+from services.estatisticas import estatisticas
+from services.cache_fragmentos import cache_fragmentos
+from services.instrumentacao_sql import instrumentacao_sql
+from services.versoes import versoes
+from services.fila_tarefas import fila
+from services.fotos import fotos
+from services.estaticos import estaticos
+from services.compressao import compressao
 from routes.auth import auth_bp
 from routes.main import main_bp
 from routes.produtos import produtos_bp
 from routes.perfil import perfil_bp
 from routes.tags import tags_bp
+from routes.admin import admin_bp
 
 
-def _migrate_add_columns(app):
-    """Adiciona colunas novas em tabelas existentes (SQLite não suporta IF NOT EXISTS)."""
-    with app.app_context():
-        conn = db.engine.raw_connection()
-        try:
-            cur = conn.cursor()
-            for stmt in [
-                "ALTER TABLE usuario_info ADD COLUMN is_admin BOOLEAN NOT NULL DEFAULT 0",
-                "ALTER TABLE tag ADD COLUMN cor VARCHAR(7) NOT NULL DEFAULT '#6c757d'",
-            ]:
-                try:
-                    cur.execute(stmt)
-                except Exception:
-                    pass  # coluna já existe
-            conn.commit()
-        finally:
-            conn.close()
-
-
-def _seed_admins(app):
-    with app.app_context():
-        for matricula in Config.ADMIN_MATRICULAS:
-            u = UsuarioInfo.query.filter_by(matricula=matricula).first()
-            if u and not u.is_admin:
-                u.is_admin = True
-        db.session.commit()
-
-
-def create_app():
+def create_app(verificar_esquema=True, **config):
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.config.update(config)
 
-    db.init_app(app)
+    init_banco(app)
     init_oauth(app)
+    init_sessoes(app)
+    cache_fragmentos.init_app(app)
+    instrumentacao_sql.init_app(app)
+    versoes.init_app(app)
+    registro_tags.init_app(app)
+    fotos.init_app(app)
+    estaticos.init_app(app)
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
     app.register_blueprint(produtos_bp)
     app.register_blueprint(perfil_bp)
     app.register_blueprint(tags_bp)
+    app.register_blueprint(admin_bp)
+
+    # No-op fora de renderizar_em_fluxo, que a substitui para descarregar o layout.
+    app.jinja_env.globals['descarregar'] = lambda: ''
 
     @app.context_processor
     def inject_globals():
         return {
             'is_admin': is_admin(),
-            'usuario': session.get('dados_usuario', {}),
+            'usuario': dados_do_usuario(),
         }
 
-    with app.app_context():
-        db.create_all()
-
-    _migrate_add_columns(app)
-    _seed_admins(app)
+    if verificar_esquema:
+        _verificar_esquema(app)
+        indice_tags.init_app(app)
+        fila.init_app(app)
+    estatisticas.init_app(app)
+    compressao.init_app(app)
 
     return app
 
 
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app(AUTO_MIGRAR=os.environ.get('AUTO_MIGRAR', '1') == '1')
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,178 @@
+"""Gerador determinístico de dados sintéticos para medir o app em escala.
+
+Cria usuários, tags, produtos (com coordenadas, geohash e tags) e avaliações
+por inserção em lote, com os agregados de avaliação de cada produto já
+consistentes e o índice de busca populado. A mesma --semente sempre gera o
+mesmo banco.
+
+    python -m bench.dados --banco sqlite:///bench.db
+    python -m bench.dados --banco sqlite:///bench.db --usuarios 20000 \\
+        --produtos 100000 --avaliacoes 1000000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app import create_app
+from models import db, UsuarioInfo, Produto, Tag, Avaliacao, produto_tags
+from models.tag import _gerar_slug
+from services.busca_service import indexar_em_lote
+from services.geo import codificar_geohash
+
+LOTE = 5000
+DATA_BASE = datetime(2026, 1, 1)
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Felipe', 'Gabriela', 'Heitor', 'Isabela',
+         'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Tiago']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Lima', 'Pereira', 'Costa', 'Rocha', 'Almeida',
+              'Nascimento', 'Medeiros', 'Dantas', 'Fernandes', 'Bezerra', 'Cavalcanti']
+CURSOS = ['Informática', 'Edificações', 'Eletrotécnica', 'Mecânica', 'Análise de Sistemas',
+          'Física', 'Gestão Ambiental', 'Redes de Computadores']
+CATEGORIAS = ['Móveis', 'Livros', 'Eletrônicos', 'Roupas', 'Calçados', 'Esportes', 'Papelaria',
+              'Informática', 'Celulares', 'Instrumentos', 'Cozinha', 'Decoração', 'Ferramentas',
+              'Jogos', 'Bicicletas', 'Material de laboratório', 'Apostilas', 'Uniformes']
+OBJETOS = ['Cadeira', 'Mesa', 'Livro de cálculo', 'Notebook', 'Calculadora científica', 'Mochila',
+           'Tênis', 'Violão', 'Bicicleta', 'Monitor', 'Teclado', 'Jaleco', 'Apostila', 'Ventilador',
+           'Estante', 'Fone de ouvido', 'Celular', 'Multímetro', 'Kit de desenho', 'Garrafa térmica']
+ADJETIVOS = ['usado', 'seminovo', 'novo', 'conservado', 'com marcas de uso', 'na caixa', 'revisado']
+# Campi do IFRN: produtos se concentram em torno deles.
+CENTROS = [(-5.8119, -35.2058), (-5.8871, -35.1800), (-5.2045, -37.3250), (-6.4605, -37.0937),
+           (-5.6405, -35.4247), (-6.2639, -36.5141)]
+
+
+def _sortear_quantidades(rng, produtos, avaliacoes, maximo):
+    """Avaliações por produto com cauda longa: poucos produtos concentram muitos votos.
+
+    Cada produto recebe no máximo `maximo` (um voto por usuário); a sobra do
+    arredondamento é distribuída entre os que ainda cabem.
+    """
+    avaliacoes = min(avaliacoes, produtos * maximo)
+    pesos = [rng.paretovariate(1.2) for _ in range(produtos)]
+    soma = sum(pesos)
+    quantidades = [min(maximo, int(avaliacoes * p / soma)) for p in pesos]
+    abertos = [i for i, q in enumerate(quantidades) if q < maximo]
+    for _ in range(avaliacoes - sum(quantidades)):
+        posicao = rng.randrange(len(abertos))
+        indice = abertos[posicao]
+        quantidades[indice] += 1
+        if quantidades[indice] == maximo:
+            abertos[posicao] = abertos[-1]
+            abertos.pop()
+    return quantidades
+
+
+def gerar(usuarios: int, produtos: int, avaliacoes: int, tags: int, semente: int, saida=print) -> dict:
+    rng = random.Random(semente)
+    conn = db.session.connection()
+
+    matriculas = [f'2099{i:010d}' for i in range(usuarios)]
+    nomes = [f'{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}' for _ in range(usuarios)]
+    for inicio in range(0, usuarios, LOTE):
+        conn.execute(UsuarioInfo.__table__.insert(), [
+            {'matricula': matriculas[i], 'nome': nomes[i], 'curso': rng.choice(CURSOS),
+             'campus': 'Natal-Central', 'is_admin': False,
+             'created_at': DATA_BASE - timedelta(days=400), 'updated_at': DATA_BASE - timedelta(days=400)}
+            for i in range(inicio, min(usuarios, inicio + LOTE))
+        ])
+    saida(f'{usuarios} usuários')
+
+    nomes_tags = [CATEGORIAS[i] if i < len(CATEGORIAS) else f'Categoria {i}' for i in range(tags)]
+    conn.execute(Tag.__table__.insert(), [
+        {'id': i + 1, 'nome': nome, 'slug': _gerar_slug(nome), 'cor': f'#{rng.randrange(0x1000000):06x}'}
+        for i, nome in enumerate(nomes_tags)
+    ])
+    saida(f'{tags} tags')
+
+    quantidades = _sortear_quantidades(rng, produtos, avaliacoes, max(0, usuarios - 1))
+    total_avaliacoes = total_tags = 0
+    lote_produtos, lote_tags, lote_avaliacoes = [], [], []
+
+    def descarregar():
+        conn = db.session.connection()  # o commit anterior devolve a conexão ao pool
+        if lote_produtos:
+            conn.execute(Produto.__table__.insert(), lote_produtos)
+            indexar_em_lote(conn, [(p['id'], p['nome'], p['descricao']) for p in lote_produtos])
+        if lote_tags:
+            conn.execute(produto_tags.insert(), lote_tags)
+        if lote_avaliacoes:
+            conn.execute(Avaliacao.__table__.insert(), lote_avaliacoes)
+        db.session.commit()
+        lote_produtos.clear()
+        lote_tags.clear()
+        lote_avaliacoes.clear()
+
+    for indice in range(produtos):
+        produto_id = indice + 1
+        dono = rng.randrange(usuarios)
+        tipo = 'venda' if rng.random() < 0.6 else 'troca'
+        latitude = longitude = None
+        if rng.random() < 0.9:
+            centro_lat, centro_lon = rng.choice(CENTROS)
+            latitude, longitude = rng.gauss(centro_lat, 0.03), rng.gauss(centro_lon, 0.03)
+        nome = f'{rng.choice(OBJETOS)} {rng.choice(ADJETIVOS)}'
+        criado_em = DATA_BASE - timedelta(seconds=rng.randrange(365 * 86400))
+
+        votantes = [v for v in rng.sample(range(usuarios), min(usuarios, quantidades[indice] + 1))
+                    if v != dono][:quantidades[indice]]
+        notas = rng.choices([1, 2, 3, 4, 5], weights=[5, 7, 15, 33, 40], k=len(votantes))
+        histograma = {n: 0 for n in range(1, 6)}
+        for votante, nota in zip(votantes, notas):
+            histograma[nota] += 1
+            lote_avaliacoes.append({'produto_id': produto_id, 'avaliador_matricula': matriculas[votante],
+                                    'nota': nota, 'created_at': DATA_BASE})
+        total_avaliacoes += len(votantes)
+
+        for tag_id in rng.sample(range(1, tags + 1), min(tags, rng.choice([0, 1, 1, 2, 2, 3]))):
+            lote_tags.append({'produto_id': produto_id, 'tag_id': tag_id})
+            total_tags += 1
+
+        lote_produtos.append({
+            'id': produto_id,
+            'nome': nome,
+            'preco': round(rng.uniform(5, 800), 2) if tipo == 'venda' else 0.0,
+            'descricao': f'{nome}, anunciado para {tipo}. Retirada no campus.',
+            'usuario_matricula': matriculas[dono],
+            'usuario_nome': nomes[dono],
+            'tipo': tipo,
+            'status': rng.choices(['disponivel', 'reservado', 'concluido'], weights=[8, 1, 1])[0],
+            'latitude': latitude,
+            'longitude': longitude,
+            'geohash': codificar_geohash(latitude, longitude) if latitude is not None else None,
+            'avaliacoes_total': len(votantes),
+            'avaliacoes_soma': sum(notas),
+            **{f'avaliacoes_{n}': histograma[n] for n in range(1, 6)},
+            'created_at': criado_em,
+            'updated_at': criado_em,
+        })
+        if len(lote_produtos) >= LOTE or len(lote_avaliacoes) >= 10 * LOTE:
+            descarregar()
+            saida(f'{produto_id}/{produtos} produtos, {total_avaliacoes} avaliações')
+    descarregar()
+
+    return {'usuarios': usuarios, 'tags': tags, 'produtos': produtos,
+            'produto_tags': total_tags, 'avaliacoes': total_avaliacoes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Popula um banco novo com dados sintéticos.')
+    parser.add_argument('--banco', required=True, help='URL SQLAlchemy, ex.: sqlite:///bench.db')
+    parser.add_argument('--usuarios', type=int, default=2000)
+    parser.add_argument('--produtos', type=int, default=10_000)
+    parser.add_argument('--avaliacoes', type=int, default=100_000)
+    parser.add_argument('--tags', type=int, default=len(CATEGORIAS))
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app(SQLALCHEMY_DATABASE_URI=args.banco, AUTO_MIGRAR=True)
+    with app.app_context():
+        if db.session.query(func.count(Produto.id)).scalar():
+            parser.error('o banco já tem produtos; use um banco novo.')
+        inicio = time.perf_counter()
+        totais = gerar(args.usuarios, args.produtos, args.avaliacoes, args.tags, args.semente)
+        print(', '.join(f'{v} {k}' for k, v in totais.items()),
+              f'em {time.perf_counter() - inicio:.1f}s.')
+
+
+if __name__ == '__main__':
+    main()
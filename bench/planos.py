@@ -0,0 +1,245 @@
+"""Regressão de planos de consulta: nenhuma rota pode varrer uma tabela inteira.
+
+Sobe o app num banco SQLite temporário com dados de exemplo, exercita cada
+rota registrada com o cliente de teste do Flask, captura todo SQL emitido
+durante as requisições e roda EXPLAIN QUERY PLAN em cada comando. Termina
+com código 1 se algum plano tiver SCAN de tabela fora de VARREDURAS_PERMITIDAS
+ou se alguma rota (endpoint + método) não tiver cenário em CENARIOS — assim
+uma rota nova também precisa entrar aqui.
+
+    python -m bench.planos               # resumo; falhas detalhadas
+    python -m bench.planos --verbose     # todos os planos
+    python -m bench.planos --json        # saída para CI
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from flask import has_request_context, request
+from sqlalchemy import event
+from app import create_app
+from models import db, UsuarioInfo, Produto, Tag, Avaliacao
+from models.banco import motor_de_leitura
+from services.crypto_service import hash_senha
+
+SENHA = 'senha-de-teste'
+ALUNO = {'usuario_logado': True, 'matricula': '20230000000001', 'is_admin': False,
+         'dados_usuario': {'nome_usual': 'Aluno', 'nome': 'Aluno', 'matricula': '20230000000001'}}
+ADMIN = {'usuario_logado': True, 'matricula': '20230000000002', 'is_admin': True,
+         'dados_usuario': {'nome_usual': 'Admin', 'nome': 'Admin', 'matricula': '20230000000002'}}
+REGISTRO = {'registro_matricula': '20230000000009', 'registro_token': 'token',
+            'registro_dados': {'nome_usual': 'Novo'}}
+ANONIMO = {}
+
+# (endpoint, método, url, sessão, argumentos extras de client.open). Rodam em
+# ordem: as exclusões ficam no fim.
+CENARIOS = [
+    ('auth.login', 'GET', '/login', ANONIMO, {}),
+    ('auth.login', 'POST', '/login', ANONIMO, {'data': {'matricula': ALUNO['matricula'], 'senha': SENHA}}),
+    ('auth.cadastro', 'GET', '/cadastro', ANONIMO, {}),
+    ('auth.cadastro', 'POST', '/cadastro', ANONIMO, {'data': {
+        'nome': 'Outro', 'matricula': '20230000000008', 'senha': SENHA, 'confirmar_senha': SENHA}}),
+    ('auth.registro', 'GET', '/registro', REGISTRO, {}),
+    ('auth.registro', 'POST', '/registro', REGISTRO, {'data': {'senha': SENHA, 'confirmar_senha': SENHA}}),
+    ('auth.logout', 'GET', '/logout', ALUNO, {}),
+    ('main.index', 'GET', '/', ANONIMO, {}),
+    ('main.home', 'GET', '/home', ALUNO, {}),
+    ('main.home', 'GET', '/home?tags=moveis,livros', ALUNO, {}),
+    ('main.home', 'GET', '/home?tags=moveis,livros&modo=ou&formato=json', ALUNO, {}),
+    ('produtos.novo_produto', 'GET', '/produtos/novo', ALUNO, {}),
+    ('produtos.novo_produto', 'POST', '/produtos/novo', ALUNO, {'data': {
+        'nome': 'Mesa', 'tipo': 'venda', 'preco': '50', 'latitude': '-5.8', 'longitude': '-35.2'}}),
+    ('produtos.meus_produtos', 'GET', '/meus-produtos', ALUNO, {}),
+    ('produtos.editar_produto', 'GET', '/produtos/1/editar', ALUNO, {}),
+    ('produtos.editar_produto', 'POST', '/produtos/1/editar', ALUNO, {'data': {
+        'nome': 'Cadeira azul', 'tipo': 'troca'}}),
+    ('produtos.venda', 'GET', '/venda', ALUNO, {}),
+    ('produtos.venda', 'GET', '/venda?formato=json', ALUNO, {}),
+    ('produtos.troca', 'GET', '/troca', ALUNO, {}),
+    ('produtos.buscar', 'GET', '/buscar?q=cad', ALUNO, {}),
+    ('produtos.mapa', 'GET', '/api/produtos/mapa?bbox=-35.3,-5.9,-35.1,-5.7&zoom=14', ALUNO, {}),
+    ('produtos.proximos', 'GET', '/api/produtos/proximos?lat=-5.8&lon=-35.2&raio_km=3&tipo=venda', ALUNO, {}),
+    ('produtos.avaliar_produto', 'POST', '/produtos/2/avaliar', ALUNO, {'data': {'nota': '4'}}),
+    ('produtos.avaliar_produto', 'POST', '/produtos/2/avaliar', ALUNO, {'data': {'nota': '5'}}),
+    ('admin.importar_produtos_em_lote', 'POST', '/admin/produtos/importar', ADMIN, {
+        'data': 'nome,tipo,preco,tags\nBanco,venda,30,"moveis,livros"\n', 'content_type': 'text/csv'}),
+    ('admin.exportar_produtos_em_lote', 'GET', '/admin/produtos/exportar', ADMIN, {}),
+    ('perfil.perfil', 'GET', '/perfil', ALUNO, {}),
+    ('perfil.perfil', 'POST', '/perfil', ALUNO, {'data': {'telefone': '84999990000'}}),
+    ('perfil.usuario_publico', 'GET', '/usuarios/20230000000002', ALUNO, {}),
+    ('tags.listar_tags', 'GET', '/admin/tags', ADMIN, {}),
+    ('tags.autocompletar_tags', 'GET', '/api/tags?prefix=Mo', ALUNO, {}),
+    ('tags.criar_tag', 'POST', '/admin/tags', ADMIN, {'json': {'nome': 'Ferramentas'}}),
+    ('tags.atualizar_tag', 'PATCH', '/admin/tags/1', ADMIN, {'json': {'nome': 'Mobília'}}),
+    ('tags.aplicar_tag', 'POST', '/produtos/1/tags', ALUNO, {'json': {'tag_id': 3}}),
+    ('tags.remover_tag', 'DELETE', '/produtos/1/tags/3', ALUNO, {}),
+    ('tags.aplicar_tags_em_lote', 'POST', '/produtos/tags/lote', ALUNO, {'json': {
+        'aplicar': [[4, 3], [7, 3], [10, 1]], 'remover': [[4, 1], [7, 2]]}}),
+    ('tags.promover_admin', 'POST', '/admin/usuarios/20230000000001/promover', ADMIN, {}),
+    ('tags.rebaixar_admin', 'POST', '/admin/usuarios/20230000000001/rebaixar', ADMIN, {}),
+    ('admin.cache', 'GET', '/admin/cache', ADMIN, {}),
+    ('admin.sql', 'GET', '/admin/sql', ADMIN, {}),
+    ('admin.sql', 'DELETE', '/admin/sql', ADMIN, {}),
+    ('admin.recalcular_avaliacoes', 'POST', '/admin/avaliacoes/recalcular', ADMIN, {}),
+    ('admin.recalcular_avaliacoes', 'POST', '/admin/avaliacoes/recalcular', ADMIN, {}),
+    ('admin.tarefas', 'GET', '/admin/tarefas', ADMIN, {}),
+    ('produtos.excluir_produto', 'POST', '/produtos/1/excluir', ALUNO, {}),
+    ('tags.excluir_tag', 'DELETE', '/admin/tags/2', ADMIN, {}),
+]
+
+# Rotas que não rodam sem serviços externos. Nenhuma faz consulta própria.
+SEM_CENARIO = {
+    'static': 'arquivos estáticos, sem SQL',
+    'estaticos_versionados': 'arquivos estáticos, sem SQL',
+    'produtos.foto': 'miniaturas lidas do disco, sem SQL',
+    'auth.login_google': 'redireciona para o Google, sem SQL',
+    'auth.callback_google': 'depende do OAuth do Google; a consulta por matrícula é a mesma de auth.login',
+}
+
+# Varreduras intencionais: (endpoint, tabela) → motivo. '*' vale para qualquer rota.
+VARREDURAS_PERMITIDAS = {
+    ('*', 'tag'): 'recarga do registro de tags, na primeira rota que o lê depois de uma mudança',
+    ('main.index', 'usuario_info'): 'estatísticas: contagem total, em cache por ESTATISTICAS_TTL',
+    ('main.index', 'produto'): 'estatísticas: contagem total, em cache por ESTATISTICAS_TTL',
+    ('main.home', 'produto_tags'): 'recarga do índice de tags (INDICE_TAGS_TTL)',
+    ('admin.exportar_produtos_em_lote', 'produto'): 'exportação do catálogo inteiro',
+    ('admin.exportar_produtos_em_lote', 'produto_tags'): 'exportação do catálogo inteiro',
+}
+
+_SCAN = re.compile(r'^SCAN (\w+)')
+_ALIAS = re.compile(r'(?:FROM|JOIN)\s+(\w+)\s+AS\s+(\w+)', re.IGNORECASE)
+_EXPLICAVEL = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT|WITH)\b', re.IGNORECASE)
+
+
+def _popular():
+    db.session.add_all([
+        UsuarioInfo(matricula=ALUNO['matricula'], nome='Aluno', senha_hash=hash_senha(SENHA)),
+        UsuarioInfo(matricula=ADMIN['matricula'], nome='Admin', is_admin=True),
+    ])
+    tags = [Tag.criar(nome) for nome in ('Móveis', 'Livros', 'Eletrônicos')]
+    db.session.flush()
+    for i in range(40):
+        dono = ALUNO if i % 3 == 0 else ADMIN
+        produto = Produto(
+            nome=f'Cadeira {i}' if i % 2 else f'Livro {i}', descricao='Produto de teste',
+            preco=10.0 + i, tipo='venda' if i % 2 else 'troca',
+            status='disponivel' if i % 5 else 'reservado',
+            usuario_matricula=dono['matricula'], usuario_nome=dono['dados_usuario']['nome'],
+            latitude=-5.8 + i * 0.001, longitude=-35.2 - i * 0.001,
+        )
+        produto.tags = [tags[i % 3], tags[(i + 1) % 3]] if i % 4 else [tags[i % 3]]
+        db.session.add(produto)
+    db.session.flush()
+    db.session.add(Avaliacao(produto_id=3, avaliador_matricula=ADMIN['matricula'], nota=5))
+    db.session.commit()
+
+
+def _tabelas_varridas(sql: str, plano: list[str]) -> list[str]:
+    aliases = {alias: tabela for tabela, alias in _ALIAS.findall(sql)}
+    tabelas = []
+    for detalhe in plano:
+        m = _SCAN.match(detalhe)
+        if m and 'VIRTUAL TABLE' not in detalhe and m.group(1) != 'CONSTANT':
+            tabelas.append(aliases.get(m.group(1), m.group(1)))
+    return tabelas
+
+
+def _explicar(conn, sql: str, parametros) -> list[str]:
+    if isinstance(parametros, list):  # executemany: o plano é o mesmo para todas as linhas
+        parametros = parametros[0] if parametros else ()
+    return [linha[3] for linha in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, parametros)]
+
+
+def executar() -> dict:
+    diretorio = tempfile.mkdtemp(prefix='planos-')
+    app = create_app(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(diretorio, 'planos.db')}",
+        AUTO_MIGRAR=True, TESTING=True,
+        INDICE_TAGS_TTL=0,  # força a recarga do índice dentro das requisições
+        REGISTRO_TAGS_INTERVALO=0,
+        TAREFAS_WORKERS=0,  # as tarefas ficam na fila; só as consultas das rotas interessam
+    )
+    capturados: list[tuple[str, str, object]] = []
+
+    with app.app_context():
+        _popular()
+
+        def _capturar(conn, cursor, sql, parametros, contexto, executemany):
+            if has_request_context():
+                capturados.append((request.endpoint, sql, parametros))
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _capturar)
+
+        cobertos = set()
+        cliente = app.test_client()
+        for endpoint, metodo, url, sessao, extras in CENARIOS:
+            with cliente.session_transaction() as s:
+                s.clear()
+                s.update(sessao)
+            resposta = cliente.open(url, method=metodo, **extras)
+            # Páginas em fluxo só consultam o banco enquanto o corpo é lido.
+            resposta.get_data()
+            resposta.close()
+            if resposta.status_code >= 400:
+                raise RuntimeError(f'{metodo} {url} respondeu {resposta.status_code}')
+            cobertos.add((endpoint, metodo))
+        for engine in db.engines.values():
+            event.remove(engine, 'before_cursor_execute', _capturar)
+
+        esperados = {
+            (regra.endpoint, metodo)
+            for regra in app.url_map.iter_rules() if regra.endpoint not in SEM_CENARIO
+            for metodo in regra.methods - {'HEAD', 'OPTIONS'}
+        }
+
+        consultas, falhas, vistos = [], [], set()
+        with motor_de_leitura().connect() as conn:
+            for endpoint, sql, parametros in capturados:
+                if (endpoint, sql) in vistos or not _EXPLICAVEL.match(sql):
+                    continue
+                vistos.add((endpoint, sql))
+                plano = _explicar(conn, sql, parametros)
+                varridas = [t for t in _tabelas_varridas(sql, plano)
+                            if (endpoint, t) not in VARREDURAS_PERMITIDAS and ('*', t) not in VARREDURAS_PERMITIDAS]
+                item = {'endpoint': endpoint, 'sql': ' '.join(sql.split()), 'plano': plano, 'varreduras': varridas}
+                consultas.append(item)
+                if varridas:
+                    falhas.append(item)
+
+    return {
+        'consultas': consultas,
+        'falhas': falhas,
+        'sem_cenario': sorted(f'{e} {m}' for e, m in esperados - cobertos),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verifica os planos de consulta das rotas.')
+    parser.add_argument('--verbose', action='store_true', help='imprime todos os planos')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    resultado = executar()
+    ok = not resultado['falhas'] and not resultado['sem_cenario']
+    if args.json:
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+        sys.exit(0 if ok else 1)
+
+    for item in resultado['consultas'] if args.verbose else resultado['falhas']:
+        marca = 'FALHA' if item['varreduras'] else 'ok'
+        print(f"[{marca}] {item['endpoint']}: {item['sql']}")
+        for detalhe in item['plano']:
+            print(f'        {detalhe}')
+    for rota in resultado['sem_cenario']:
+        print(f'[SEM CENÁRIO] {rota}')
+
+    print(f"{len(resultado['consultas'])} consulta(s) verificada(s), "
+          f"{len(resultado['falhas'])} com varredura completa, "
+          f"{len(resultado['sem_cenario'])} rota(s) sem cenário.")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
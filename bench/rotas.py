@@ -0,0 +1,275 @@
+"""Benchmark das rotas pelo cliente de teste do Flask.
+
+Roda cada cenário N vezes contra um banco populado por bench.dados e mede
+latência (p50/p95/p99), tempo até o primeiro byte, bytes transferidos
+(com Accept-Encoding: gzip, como um navegador), consultas SQL por
+requisição; o pico de RSS é do processo na execução inteira (ru_maxrss
+só cresce, então não dá para atribuí-lo a uma rota). A saída JSON serve
+para comparar commits:
+
+    python -m bench.dados --banco sqlite:///bench.db --produtos 100000 --avaliacoes 1000000
+    python -m bench.rotas --banco sqlite:///bench.db --json > antes.json
+    python -m bench.rotas --banco sqlite:///bench.db --comparar antes.json
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from sqlalchemy import event, func
+from app import create_app
+from models import db, UsuarioInfo, Produto, Tag
+from services.crypto_service import hash_senha
+from services.fila_tarefas import fila
+
+SENHA = 'senha-de-benchmark'
+
+# Rotas que não entram na medição; qualquer outra sem cenário aparece no relatório.
+NAO_MEDIDAS = {
+    'static': 'arquivos estáticos',
+    'estaticos_versionados': 'arquivos estáticos',
+    'produtos.foto': 'miniaturas lidas do disco',
+    'auth.login_google': 'depende do Google',
+    'auth.callback_google': 'depende do Google',
+    'auth.cadastro POST': 'cria um usuário novo a cada repetição',
+    'auth.registro GET': 'exige um fluxo SUAP em andamento',
+    'auth.registro POST': 'exige um fluxo SUAP em andamento',
+    'produtos.novo_produto POST': 'cria um produto novo a cada repetição',
+    'produtos.excluir_produto POST': 'destrutiva',
+    'tags.criar_tag POST': 'cria uma tag nova a cada repetição',
+    'admin.importar_produtos_em_lote POST': 'cria produtos a cada repetição',
+    'admin.exportar_produtos_em_lote GET': 'percorre o catálogo inteiro a cada repetição',
+    'tags.excluir_tag DELETE': 'destrutiva',
+    'admin.recalcular_avaliacoes POST': 'enfileira um recálculo do catálogo inteiro',
+}
+
+
+def _sessao(usuario, admin=False):
+    return {'usuario_logado': True, 'matricula': usuario.matricula, 'is_admin': admin,
+            'dados_usuario': {'nome_usual': usuario.nome, 'nome': usuario.nome, 'matricula': usuario.matricula}}
+
+
+def _cenarios():
+    """(nome, endpoint, método, url, sessão, argumentos de client.open) a partir do banco."""
+    dono = (db.session.query(Produto.usuario_matricula)
+            .group_by(Produto.usuario_matricula).order_by(func.count().desc()).limit(1).scalar())
+    if dono is None:
+        sys.exit('Banco sem produtos: rode python -m bench.dados antes.')
+    usuario = UsuarioInfo.query.filter_by(matricula=dono).one()
+    outro = UsuarioInfo.query.filter(UsuarioInfo.matricula != dono).first()
+    proprio = Produto.query.filter_by(usuario_matricula=dono).first()
+    alheio = Produto.query.filter(Produto.usuario_matricula != dono).order_by(
+        Produto.avaliacoes_total.desc()).first()
+    proprios = [p for p, in db.session.query(Produto.id).filter_by(usuario_matricula=dono).limit(50)]
+    tags = Tag.query.order_by(Tag.id).limit(2).all()
+    slugs = ','.join(t.slug for t in tags)
+
+    usuario.senha_hash = hash_senha(SENHA)
+    db.session.commit()
+
+    aluno, admin, anonimo = _sessao(usuario), _sessao(usuario, admin=True), {}
+    formulario = {'nome': proprio.nome, 'tipo': proprio.tipo, 'preco': str(proprio.preco),
+                  'descricao': proprio.descricao or '', 'latitude': str(proprio.latitude or ''),
+                  'longitude': str(proprio.longitude or '')}
+    return [
+        ('index', 'main.index', 'GET', '/', anonimo, {}),
+        ('login', 'auth.login', 'GET', '/login', anonimo, {}),
+        ('login (senha)', 'auth.login', 'POST', '/login', anonimo,
+         {'data': {'matricula': usuario.matricula, 'senha': SENHA}}),
+        ('cadastro', 'auth.cadastro', 'GET', '/cadastro', anonimo, {}),
+        ('logout', 'auth.logout', 'GET', '/logout', aluno, {}),
+        ('home', 'main.home', 'GET', '/home', aluno, {}),
+        ('home tags e', 'main.home', 'GET', f'/home?tags={slugs}', aluno, {}),
+        ('home tags ou json', 'main.home', 'GET', f'/home?tags={slugs}&modo=ou&formato=json', aluno, {}),
+        ('venda', 'produtos.venda', 'GET', '/venda', aluno, {}),
+        ('venda json', 'produtos.venda', 'GET', '/venda?formato=json', aluno, {}),
+        ('troca', 'produtos.troca', 'GET', '/troca', aluno, {}),
+        ('meus produtos', 'produtos.meus_produtos', 'GET', '/meus-produtos', aluno, {}),
+        ('buscar', 'produtos.buscar', 'GET', '/buscar?q=cadeira', aluno, {}),
+        ('mapa cidade', 'produtos.mapa', 'GET', '/api/produtos/mapa?bbox=-35.35,-5.95,-35.05,-5.70&zoom=12',
+         aluno, {}),
+        ('mapa bairro', 'produtos.mapa', 'GET', '/api/produtos/mapa?bbox=-35.22,-5.83,-35.19,-5.80&zoom=16',
+         aluno, {}),
+        ('próximos 1 km', 'produtos.proximos', 'GET', '/api/produtos/proximos?lat=-5.81&lon=-35.21&raio_km=1',
+         aluno, {}),
+        ('próximos 10 km venda', 'produtos.proximos', 'GET',
+         '/api/produtos/proximos?lat=-5.81&lon=-35.21&raio_km=10&tipo=venda', aluno, {}),
+        ('novo produto', 'produtos.novo_produto', 'GET', '/produtos/novo', aluno, {}),
+        ('editar produto', 'produtos.editar_produto', 'GET', f'/produtos/{proprio.id}/editar', aluno, {}),
+        ('salvar produto', 'produtos.editar_produto', 'POST', f'/produtos/{proprio.id}/editar', aluno,
+         {'data': formulario}),
+        ('avaliar', 'produtos.avaliar_produto', 'POST', f'/produtos/{alheio.id}/avaliar', aluno,
+         {'data': {'nota': '4'}}),
+        ('perfil', 'perfil.perfil', 'GET', '/perfil', aluno, {}),
+        ('salvar perfil', 'perfil.perfil', 'POST', '/perfil', aluno, {'data': {'telefone': '84999990000'}}),
+        ('perfil público', 'perfil.usuario_publico', 'GET', f'/usuarios/{dono}', aluno, {}),
+        ('aplicar tag', 'tags.aplicar_tag', 'POST', f'/produtos/{proprio.id}/tags', aluno,
+         {'json': {'tag_id': tags[0].id}}),
+        ('remover tag', 'tags.remover_tag', 'DELETE', f'/produtos/{proprio.id}/tags/{tags[0].id}', aluno, {}),
+        ('aplicar tags em lote', 'tags.aplicar_tags_em_lote', 'POST', '/produtos/tags/lote', aluno,
+         {'json': {'aplicar': [[p, tags[0].id] for p in proprios]}}),
+        ('remover tags em lote', 'tags.aplicar_tags_em_lote', 'POST', '/produtos/tags/lote', aluno,
+         {'json': {'remover': [[p, tags[0].id] for p in proprios]}}),
+        ('listar tags', 'tags.listar_tags', 'GET', '/admin/tags', admin, {}),
+        ('autocompletar tags', 'tags.autocompletar_tags', 'GET', f'/api/tags?prefix={tags[0].nome[:2]}', aluno, {}),
+        ('atualizar tag', 'tags.atualizar_tag', 'PATCH', f'/admin/tags/{tags[1].id}', admin,
+         {'json': {'nome': tags[1].nome, 'cor': tags[1].cor}}),
+        ('promover', 'tags.promover_admin', 'POST', f'/admin/usuarios/{outro.matricula}/promover', admin, {}),
+        ('rebaixar', 'tags.rebaixar_admin', 'POST', f'/admin/usuarios/{outro.matricula}/rebaixar', admin, {}),
+        ('admin cache', 'admin.cache', 'GET', '/admin/cache', admin, {}),
+        ('admin sql', 'admin.sql', 'GET', '/admin/sql', admin, {}),
+        ('admin sql limpar', 'admin.sql', 'DELETE', '/admin/sql', admin, {}),
+        ('admin tarefas', 'admin.tarefas', 'GET', '/admin/tarefas', admin, {}),
+    ]
+
+
+def _percentil(ordenados, p):
+    """Percentil por posição mais próxima (ordenados em ordem crescente)."""
+    return ordenados[min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))]
+
+
+def _rss_pico_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _drenar_fila():
+    """Executa aqui mesmo as tarefas vencidas, fora do tempo medido."""
+    while fila.executar_proxima():
+        pass
+
+
+def executar(banco: str, repeticoes: int, aquecimento: int, filtro: str | None = None) -> dict:
+    # Sem workers: uma tarefa rodando em outra thread disputaria o banco com a
+    # requisição medida. O que os cenários enfileiram é drenado entre as rodadas.
+    app = create_app(SQLALCHEMY_DATABASE_URI=banco, AUTO_MIGRAR=True, TAREFAS_WORKERS=0, TESTING=True)
+    consultas = [0]
+
+    with app.app_context():
+        cenarios = _cenarios()
+
+        def _contar(*_):
+            consultas[0] += 1
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _contar)
+
+        cliente = app.test_client()
+        resultados = {}
+        for nome, endpoint, metodo, url, sessao, extras in cenarios:
+            if filtro and filtro not in nome and filtro not in endpoint:
+                continue
+            tempos, primeiros_bytes, consultas_por_req, erros = [], [], [], 0
+            for rodada in range(aquecimento + repeticoes):
+                with cliente.session_transaction() as s:
+                    s.clear()
+                    s.update(sessao)
+                consultas[0] = 0
+                inicio = time.perf_counter()
+                resposta = cliente.open(url, method=metodo, headers={'Accept-Encoding': 'gzip'}, **extras)
+                blocos = iter(resposta.response)
+                primeiro = next(blocos, b'')
+                primeiro_byte = (time.perf_counter() - inicio) * 1000
+                transferidos = len(primeiro) + sum(len(b) for b in blocos)
+                resposta.close()
+                decorrido = (time.perf_counter() - inicio) * 1000
+                consultas_da_requisicao = consultas[0]
+                _drenar_fila()
+                if rodada < aquecimento:
+                    continue
+                tempos.append(decorrido)
+                primeiros_bytes.append(primeiro_byte)
+                consultas_por_req.append(consultas_da_requisicao)
+                erros += resposta.status_code >= 400
+            tempos.sort()
+            primeiros_bytes.sort()
+            resultados[nome] = {
+                'endpoint': endpoint,
+                'metodo': metodo,
+                'url': url,
+                'repeticoes': repeticoes,
+                'p50_ms': round(_percentil(tempos, 50), 3),
+                'p95_ms': round(_percentil(tempos, 95), 3),
+                'p99_ms': round(_percentil(tempos, 99), 3),
+                'media_ms': round(sum(tempos) / len(tempos), 3),
+                'ttfb_p50_ms': round(_percentil(primeiros_bytes, 50), 3),
+                'bytes': transferidos,
+                'consultas_por_requisicao': round(sum(consultas_por_req) / len(consultas_por_req), 2),
+                'erros': erros,
+            }
+        for engine in db.engines.values():
+            event.remove(engine, 'before_cursor_execute', _contar)
+
+        medidos = {f'{e} {m}' for _, e, m, *_ in cenarios}
+        sem_cenario = sorted(
+            f'{regra.endpoint} {metodo}'
+            for regra in app.url_map.iter_rules()
+            for metodo in regra.methods - {'HEAD', 'OPTIONS'}
+            if f'{regra.endpoint} {metodo}' not in medidos
+            and f'{regra.endpoint} {metodo}' not in NAO_MEDIDAS and regra.endpoint not in NAO_MEDIDAS
+        )
+        volume = {
+            'usuarios': db.session.query(func.count(UsuarioInfo.id)).scalar(),
+            'produtos': db.session.query(func.count(Produto.id)).scalar(),
+        }
+
+    return {
+        'commit': _commit_atual(),
+        'banco': volume,
+        'repeticoes': repeticoes,
+        'rss_pico_kb': _rss_pico_kb(),
+        'rotas': resultados,
+        'sem_cenario': sem_cenario,
+    }
+
+
+def _imprimir(resultado, anterior=None):
+    print(f"commit {resultado['commit']} · {resultado['banco']['produtos']} produtos · "
+          f"{resultado['repeticoes']} repetições · RSS pico {resultado['rss_pico_kb'] / 1024:.0f} MB")
+    print(f'{"rota":<20} {"p50":>8} {"p95":>8} {"p99":>8} {"TTFB":>8} {"KB":>7} {"SQL/req":>8} {"erros":>6}'
+          + (f' {"Δp95":>8} {"ΔTTFB":>8} {"ΔKB":>8}' if anterior else ''))
+    for nome, r in resultado['rotas'].items():
+        linha = (f"{nome:<20} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+                 f"{r['ttfb_p50_ms']:>8.2f} {r['bytes'] / 1024:>7.1f} "
+                 f"{r['consultas_por_requisicao']:>8} {r['erros']:>6}")
+        antes = (anterior or {}).get('rotas', {}).get(nome)
+        if antes:
+            # Execuções antigas não mediam TTFB nem bytes.
+            for chave in ('p95_ms', 'ttfb_p50_ms', 'bytes'):
+                linha += (f" {(r[chave] / antes[chave] - 1) * 100:>+7.0f}%" if antes.get(chave)
+                          else f" {'-':>8}")
+        print(linha)
+    for rota in resultado['sem_cenario']:
+        print(f'[SEM CENÁRIO] {rota}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark das rotas do app.')
+    parser.add_argument('--banco', required=True, help='URL SQLAlchemy do banco populado por bench.dados')
+    parser.add_argument('--repeticoes', type=int, default=30)
+    parser.add_argument('--aquecimento', type=int, default=3)
+    parser.add_argument('--filtro', help='só cenários cujo nome ou endpoint contém o texto')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    resultado = executar(args.banco, args.repeticoes, args.aquecimento, args.filtro)
+    if args.json:
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+        return
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+    _imprimir(resultado, anterior)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark das estratégias de hash de senha.
+
+    python -m bench.senhas                      # tabela hashes/s por núcleo
+    python -m bench.senhas --orcamento-ms 250   # também sugere o custo
+    python -m bench.senhas --json               # saída para comparar entre commits
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.crypto_service import ScryptStrategy, PBKDF2Strategy, calibrar
+
+CUSTOS = {
+    'scrypt': (ScryptStrategy(), [2 ** k for k in range(12, 19)]),
+    'pbkdf2': (PBKDF2Strategy(), [100_000, 200_000, 400_000, 600_000, 1_000_000]),
+}
+
+
+def _medir(estrategia, duracao: float, threads: int) -> float:
+    """Hashes por segundo rodando `threads` laços em paralelo por `duracao` segundos."""
+    fim = time.perf_counter() + duracao
+
+    def laco():
+        feitos = 0
+        while time.perf_counter() < fim:
+            estrategia.hash('senha-de-benchmark')
+            feitos += 1
+        return feitos
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        total = sum(executor.map(lambda _: laco(), range(threads)))
+    return total / (time.perf_counter() - inicio)
+
+
+def executar(kdfs, duracao: float, orcamento_ms: float | None) -> dict:
+    nucleos = os.cpu_count() or 1
+    resultado = {'nucleos': nucleos, 'kdfs': {}}
+    for nome in kdfs:
+        base, custos = CUSTOS[nome]
+        linhas = []
+        for custo in custos:
+            estrategia = base.com_custo(custo)
+            por_nucleo = _medir(estrategia, duracao, 1)
+            todos = _medir(estrategia, duracao, nucleos)
+            linhas.append({
+                'custo': custo,
+                'ms_por_hash': round(1000 / por_nucleo, 2),
+                'hashes_s_por_nucleo': round(por_nucleo, 2),
+                'hashes_s_todos_nucleos': round(todos, 2),
+            })
+        resultado['kdfs'][nome] = {'medicoes': linhas}
+        if orcamento_ms:
+            resultado['kdfs'][nome]['custo_sugerido'] = calibrar(base, custos, orcamento_ms)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de hash de senhas.')
+    parser.add_argument('--kdf', choices=sorted(CUSTOS), action='append')
+    parser.add_argument('--duracao', type=float, default=1.0, help='segundos por medição')
+    parser.add_argument('--orcamento-ms', type=float, help='latência máxima aceitável por hash')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    resultado = executar(args.kdf or sorted(CUSTOS), args.duracao, args.orcamento_ms)
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+        return
+
+    print(f"{resultado['nucleos']} núcleo(s)")
+    for nome, dados in resultado['kdfs'].items():
+        print(f'\n{nome:>8} {"custo":>10} {"ms/hash":>10} {"h/s/núcleo":>12} {"h/s total":>12}')
+        for linha in dados['medicoes']:
+            print(f"{'':>8} {linha['custo']:>10} {linha['ms_por_hash']:>10} "
+                  f"{linha['hashes_s_por_nucleo']:>12} {linha['hashes_s_todos_nucleos']:>12}")
+        if 'custo_sugerido' in dados:
+            print(f'{"":>8} custo sugerido para {args.orcamento_ms:g} ms: {dados["custo_sugerido"]}')
+
+
+if __name__ == '__main__':
+    main()
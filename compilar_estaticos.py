@@ -0,0 +1,25 @@
+"""Gera static/dist/: cópias versionadas pelo hash, variantes .br/.gz e o manifesto.
+
+Rode a cada deploy, depois de atualizar o código: python compilar_estaticos.py [--limpar]
+"""
+import argparse
+import os
+from services.estaticos import compilar
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Versiona e pré-comprime os arquivos de static/.')
+    parser.add_argument('--limpar', action='store_true',
+                        help='apaga de static/dist as versões que não estão no manifesto novo')
+    args = parser.parse_args()
+
+    manifesto = compilar(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'), args.limpar)
+    for origem, entrada in sorted(manifesto.items()):
+        print(f'{origem} → {entrada["arquivo"]} {" ".join(entrada["codificacoes"])}')
+    if not any('br' in e['codificacoes'] for e in manifesto.values()):
+        print('Pacote brotli não instalado: só variantes .gz foram geradas.')
+    print(f'{len(manifesto)} arquivo(s) em static/dist.')
+
+
+if __name__ == '__main__':
+    main()
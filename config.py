@@ -8,8 +8,75 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///reutilizaif.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SUAP_API_BASE_URL = 'https://suap.ifrn.edu.br'
+    # Desligado: banco desatualizado impede a subida (rode `python init_db.py migrate`),
+    # em vez de cada worker disputar o DDL. `python app.py` (desenvolvimento) liga.
+    AUTO_MIGRAR = os.environ.get('AUTO_MIGRAR', '0') == '1'
+
+    # Perfil do SQLite em arquivo (models/banco.py): WAL e pragmas em cada conexão, um pool
+    # de conexões só de leitura e um escritor serializado. SQLITE_PERFIL=0 usa o engine padrão.
+    SQLITE_PERFIL = os.environ.get('SQLITE_PERFIL', '1') == '1'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_MB = int(os.environ.get('SQLITE_MMAP_MB', 256))
+    SQLITE_CACHE_MB = int(os.environ.get('SQLITE_CACHE_MB', 16))
+    SQLITE_POOL_LEITURA = int(os.environ.get('SQLITE_POOL_LEITURA', 8))
+    SQLITE_POOL_ESCRITA = int(os.environ.get('SQLITE_POOL_ESCRITA', 1))
+    SQLITE_POOL_TIMEOUT = int(os.environ.get('SQLITE_POOL_TIMEOUT', 10))
+    SUAP_API_BASE_URL = os.environ.get('SUAP_API_BASE_URL', 'https://suap.ifrn.edu.br')
+    SUAP_POOL_CONEXOES = int(os.environ.get('SUAP_POOL_CONEXOES', 16))
+    SUAP_MAX_SONDAGENS = int(os.environ.get('SUAP_MAX_SONDAGENS', 8))
+    SUAP_CACHE_TTL = int(os.environ.get('SUAP_CACHE_TTL', 6 * 3600))
+    SUAP_CACHE_CAPACIDADE = int(os.environ.get('SUAP_CACHE_CAPACIDADE', 5000))
     ADMIN_MATRICULAS = {'20231041110013'}
+    PRODUTOS_POR_PAGINA = int(os.environ.get('PRODUTOS_POR_PAGINA', 24))
+    # Busca por proximidade (/api/produtos/proximos): maior raio aceito, em km.
+    PROXIMOS_RAIO_MAXIMO_KM = float(os.environ.get('PROXIMOS_RAIO_MAXIMO_KM', 50))
+    INDICE_TAGS_TTL = int(os.environ.get('INDICE_TAGS_TTL', 60))
+    REGISTRO_TAGS_INTERVALO = int(os.environ.get('REGISTRO_TAGS_INTERVALO', 5))
+    ESTATISTICAS_TTL = int(os.environ.get('ESTATISTICAS_TTL', 300))
+    CACHE_FRAGMENTOS_CAPACIDADE = int(os.environ.get('CACHE_FRAGMENTOS_CAPACIDADE', 2000))
+
+    # Instrumentação de SQL (Server-Timing + /admin/sql). Desligada por padrão.
+    INSTRUMENTAR_SQL = os.environ.get('INSTRUMENTAR_SQL', '0') == '1'
+    SQL_LIMITE_N_MAIS_1 = int(os.environ.get('SQL_LIMITE_N_MAIS_1', 5))
+
+    # Sessões: 'banco' (tabela sessao, vale entre workers), 'memoria' (um processo só)
+    # ou 'cookie' (sessão assinada do Flask). Expiram SESSOES_TTL segundos após o último uso.
+    SESSOES_ARMAZEM = os.environ.get('SESSOES_ARMAZEM', 'banco')
+    SESSOES_TTL = int(os.environ.get('SESSOES_TTL', 7 * 24 * 3600))
+    SESSOES_CAPACIDADE = int(os.environ.get('SESSOES_CAPACIDADE', 10000))
+    SESSOES_INTERVALO_LIMPEZA = int(os.environ.get('SESSOES_INTERVALO_LIMPEZA', 300))
+
+    # Fila de tarefas: threads por processo (0 = só enfileira; rode `python worker.py`).
+    TAREFAS_WORKERS = int(os.environ.get('TAREFAS_WORKERS', 2))
+    TAREFAS_INTERVALO = float(os.environ.get('TAREFAS_INTERVALO', 1.0))
+    TAREFAS_BACKOFF_BASE = int(os.environ.get('TAREFAS_BACKOFF_BASE', 5))
+    TAREFAS_BACKOFF_MAX = int(os.environ.get('TAREFAS_BACKOFF_MAX', 600))
+    # Tarefa 'executando' há mais que isso é dada como abandonada: executores devem terminar bem antes.
+    TAREFAS_TIMEOUT = int(os.environ.get('TAREFAS_TIMEOUT', 900))
+    TAREFAS_RETENCAO = int(os.environ.get('TAREFAS_RETENCAO', 7 * 24 * 3600))
+
+    # Fotos de produto. FOTOS_PASTA vazio = <instance>/fotos. Atrás de nginx,
+    # USE_X_SENDFILE=1 entrega as miniaturas sem passar pelo Python.
+    FOTOS_PASTA = os.environ.get('FOTOS_PASTA', '')
+    FOTOS_TAMANHO_MAX = int(os.environ.get('FOTOS_TAMANHO_MAX', 8 * 1024 * 1024))
+    FOTOS_PROCESSOS = int(os.environ.get('FOTOS_PROCESSOS', 2))
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '0') == '1'
+
+    # Compressão gzip das respostas (inclusive em fluxo); corpos menores que o mínimo vão sem.
+    COMPRESSAO = os.environ.get('COMPRESSAO', '1') == '1'
+    COMPRESSAO_MINIMO = int(os.environ.get('COMPRESSAO_MINIMO', 500))
+    COMPRESSAO_NIVEL = int(os.environ.get('COMPRESSAO_NIVEL', 6))
+
+    # Usa static/dist (gerado por `python compilar_estaticos.py`) quando existir.
+    ESTATICOS_VERSIONADOS = os.environ.get('ESTATICOS_VERSIONADOS', '1') == '1'
+
+    # Hash de senhas: 'scrypt' (padrão) ou 'pbkdf2'. Calibre o custo com
+    # `python -m bench.senhas --orcamento-ms 250` na máquina de produção.
+    SENHA_KDF = os.environ.get('SENHA_KDF', 'scrypt')
+    SENHA_SCRYPT_N = int(os.environ.get('SENHA_SCRYPT_N', 2 ** 14))
+    SENHA_PBKDF2_ITERACOES = int(os.environ.get('SENHA_PBKDF2_ITERACOES', 600_000))
+    SENHA_MAX_PARALELO = int(os.environ.get('SENHA_MAX_PARALELO', max(1, (os.cpu_count() or 2) // 2)))
 
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID', '')
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET', '')
@@ -1,11 +1,20 @@
 from app import create_app
-from models import db
+from models import Avaliacao
+from models.migracoes import migrar
 import sys
 import io
 
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-app = create_app()
+app = create_app(verificar_esquema=False)
 
 with app.app_context():
-    db.create_all()
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'migrate'
+    if comando == 'migrate':
+        print(f'Esquema na versão {migrar()}.')
+    elif comando == 'recalcular-avaliacoes':
+        print(f'{Avaliacao.recalcular_agregados()} produto(s) com agregados corrigidos.')
+    else:
+        print(f'Comando desconhecido: {comando}')
+        print('Uso: python init_db.py [migrate | recalcular-avaliacoes]')
+        sys.exit(1)
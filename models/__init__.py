@@ -1,10 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
+from .banco import SessaoRoteada
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 
 from .usuario import UsuarioInfo, _extrair_nome
 from .tag import Tag, produto_tags
 from .produto import Produto, TipoProduto, StatusProduto
 from .avaliacao import Avaliacao
+from .cache_suap import CacheSuap
+from .versao_conjunto import VersaoConjunto
+from .tarefa import Tarefa
+from .sessao import Sessao
 
-__all__ = ['db', 'UsuarioInfo', '_extrair_nome', 'Tag', 'produto_tags', 'Produto', 'TipoProduto', 'StatusProduto', 'Avaliacao']
+__all__ = ['db', 'UsuarioInfo', '_extrair_nome', 'Tag', 'produto_tags', 'Produto', 'TipoProduto', 'StatusProduto', 'Avaliacao', 'CacheSuap', 'VersaoConjunto', 'Tarefa', 'Sessao']
@@ -1,9 +1,13 @@
-from sqlalchemy import func
+from sqlalchemy import func, case
 from . import db
 
 
 class Avaliacao(db.Model):
     __tablename__ = 'avaliacao'
+    # Um voto por usuário e produto; também serve a busca por produto_id.
+    __table_args__ = (
+        db.Index('uq_avaliacao_produto_avaliador', 'produto_id', 'avaliador_matricula', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'), nullable=False)
@@ -17,33 +21,45 @@ class Avaliacao(db.Model):
     def __repr__(self):
         return f'<Avaliacao {self.nota} estrelas para produto {self.produto_id}>'
 
-    @staticmethod
-    def resumo_por_produtos(produto_ids):
-        if not produto_ids:
-            return {}
-        data = db.session.query(
-            Avaliacao.produto_id,
-            func.count(Avaliacao.id).label('total'),
-            func.avg(Avaliacao.nota).label('media')
-        ).filter(Avaliacao.produto_id.in_(produto_ids)).group_by(Avaliacao.produto_id).all()
-        return {pid: {'total': total, 'media': round(float(media), 1)} for pid, total, media in data}
-
     @staticmethod
     def enriquecer_produtos(produtos):
-        ids = [p.id for p in produtos]
-        resumo = Avaliacao.resumo_por_produtos(ids)
         return [
             {
                 'produto': p,
-                'media_avaliacao': resumo.get(p.id, {}).get('media', 0),
-                'total_avaliacoes': resumo.get(p.id, {}).get('total', 0),
+                'media_avaliacao': p.media_avaliacao,
+                'total_avaliacoes': p.avaliacoes_total,
             }
             for p in produtos
         ]
 
     @staticmethod
-    def calcular_media(produto_id):
-        resultado = db.session.query(
-            func.avg(Avaliacao.nota)
-        ).filter_by(produto_id=produto_id).scalar()
-        return round(float(resultado), 1) if resultado else 0.0
+    def recalcular_agregados(produto_ids=None) -> int:
+        """Reconstrói os agregados de Produto a partir da tabela avaliacao.
+
+        Usado no backfill e para reparar contadores divergentes. Retorna a
+        quantidade de produtos atualizados.
+        """
+        from .produto import Produto
+
+        colunas = [func.count(Avaliacao.id), func.coalesce(func.sum(Avaliacao.nota), 0)]
+        colunas += [func.sum(case((Avaliacao.nota == n, 1), else_=0)) for n in range(1, 6)]
+        consulta = db.session.query(Avaliacao.produto_id, *colunas).group_by(Avaliacao.produto_id)
+        if produto_ids is not None:
+            consulta = consulta.filter(Avaliacao.produto_id.in_(produto_ids))
+        agregados = {pid: valores for pid, *valores in consulta}
+
+        produtos = Produto.query
+        if produto_ids is not None:
+            produtos = produtos.filter(Produto.id.in_(produto_ids))
+
+        atualizados = 0
+        for produto in produtos:
+            total, soma, *histograma = agregados.get(produto.id, [0] * 7)
+            novos = {'avaliacoes_total': total, 'avaliacoes_soma': soma}
+            novos.update({f'avaliacoes_{n}': histograma[n - 1] for n in range(1, 6)})
+            if any(getattr(produto, k) != v for k, v in novos.items()):
+                for k, v in novos.items():
+                    setattr(produto, k, v)
+                atualizados += 1
+        db.session.commit()
+        return atualizados
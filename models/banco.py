@@ -0,0 +1,153 @@
+"""Perfil do SQLite em arquivo para produção.
+
+Cada conexão recebe os pragmas do perfil (WAL, busy_timeout, synchronous,
+mmap_size, cache_size) e o banco ganha dois engines sobre o mesmo arquivo:
+
+- o padrão (`db.engine`) é o escritor: SQLITE_POOL_ESCRITA conexões (1 =
+  escritas em fila dentro do processo), com BEGIN IMMEDIATE — o lock de
+  escrita é pedido no início da transação, onde o busy_timeout vale, e não
+  na promoção de um lock de leitura, que falha na hora com `database is
+  locked`;
+- LEITURA tem SQLITE_POOL_LEITURA conexões com query_only. Em WAL, leitores
+  não esperam o escritor nem o fazem esperar.
+
+`SessaoRoteada` escolhe o engine por comando: SELECTs vão para os leitores;
+flush, INSERT/UPDATE/DELETE, DDL e `session.connection()` vão para o
+escritor. Depois da primeira escrita o resto da transação fica no escritor,
+para enxergar o que ela mesma gravou. Escrita que a view deixou sem commit
+é desfeita ao fim da requisição, antes de a sessão do usuário ser gravada.
+"""
+import re
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.elements import TextClause
+
+LEITURA = 'leitura'
+_SYNCHRONOUS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+_SELECT = re.compile(r'\s*(SELECT|EXPLAIN)\b', re.IGNORECASE)
+
+
+def _so_le(clause, argumentos) -> bool:
+    if argumentos.get('somente_leitura'):
+        return True
+    if getattr(clause, 'is_select', False):
+        return True
+    return isinstance(clause, TextClause) and bool(_SELECT.match(clause.text))
+
+
+class SessaoRoteada(Session):
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self.escreveu = False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self.escreveu or self._flushing or not _so_le(clause, kwargs):
+                self.escreveu = True
+            elif LEITURA in self._db.engines:
+                return self._db.engines[LEITURA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(SessaoRoteada, 'after_transaction_end')
+def _fim_da_transacao(sessao, transacao):
+    if transacao.parent is None:
+        sessao.escreveu = False
+
+
+def conexao_de_leitura():
+    """`db.session.connection()` para SQL cru que só lê (vai para um leitor, se houver)."""
+    from . import db
+    return db.session.connection(bind_arguments={'somente_leitura': True})
+
+
+def motor_de_leitura():
+    """Engine para leituras fora de db.session: o de leitura, ou o padrão sem o perfil."""
+    from . import db
+    return db.engines.get(LEITURA, db.engine)
+
+
+def inserir_ou_atualizar(conn, tabela, valores: dict, chave: str):
+    """INSERT que, se `chave` já existir, atualiza as demais colunas (SQLite, PostgreSQL ou MySQL)."""
+    atualizar = {coluna: valor for coluna, valor in valores.items() if coluna != chave}
+    if conn.dialect.name == 'mysql':
+        comando = mysql.insert(tabela).values(**valores).on_duplicate_key_update(**atualizar)
+    else:
+        insert = postgresql.insert if conn.dialect.name == 'postgresql' else sqlite.insert
+        comando = insert(tabela).values(**valores).on_conflict_do_update(index_elements=[chave], set_=atualizar)
+    conn.execute(comando)
+
+
+def _em_arquivo(uri) -> bool:
+    url = make_url(uri)
+    return (url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+            and url.query.get('mode') != 'memory' and not url.database.startswith('file::memory:'))
+
+
+def _pragmas(app) -> list[str]:
+    synchronous = str(app.config.get('SQLITE_SYNCHRONOUS', 'NORMAL')).upper()
+    if synchronous not in _SYNCHRONOUS:
+        raise ValueError(f'SQLITE_SYNCHRONOUS desconhecido: {synchronous} (use {", ".join(sorted(_SYNCHRONOUS))})')
+    return [
+        f'busy_timeout = {int(app.config.get("SQLITE_BUSY_TIMEOUT_MS", 5000))}',
+        'journal_mode = WAL',
+        f'synchronous = {synchronous}',
+        f'mmap_size = {int(app.config.get("SQLITE_MMAP_MB", 256)) * 1024 * 1024}',
+        f'cache_size = {-int(app.config.get("SQLITE_CACHE_MB", 16)) * 1024}',
+    ]
+
+
+def _ao_conectar(pragmas, escritor: bool):
+    def configurar(conexao_dbapi, registro):
+        if escritor:
+            # O BEGIN passa a ser emitido por _iniciar_imediata, não pelo driver.
+            conexao_dbapi.isolation_level = None
+        cursor = conexao_dbapi.cursor()
+        for pragma in pragmas + ([] if escritor else ['query_only = ON']):
+            cursor.execute(f'PRAGMA {pragma}')
+        cursor.close()
+    return configurar
+
+
+def _iniciar_imediata(conexao):
+    conexao.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def init_banco(app):
+    """db.init_app(app) com o perfil do SQLite, se SQLITE_PERFIL e o banco for um arquivo."""
+    from . import db
+    perfil = app.config.get('SQLITE_PERFIL', True) and _em_arquivo(app.config['SQLALCHEMY_DATABASE_URI'])
+    if perfil:
+        pragmas = _pragmas(app)
+        timeout = app.config.get('SQLITE_POOL_TIMEOUT', 10)
+        opcoes = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        opcoes.update(pool_size=app.config.get('SQLITE_POOL_ESCRITA', 1), max_overflow=0, pool_timeout=timeout)
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes
+        app.config['SQLALCHEMY_BINDS'] = {
+            **(app.config.get('SQLALCHEMY_BINDS') or {}),
+            LEITURA: {'url': app.config['SQLALCHEMY_DATABASE_URI'],
+                      'pool_size': app.config.get('SQLITE_POOL_LEITURA', 8), 'max_overflow': 0,
+                      'pool_timeout': timeout},
+        }
+    db.init_app(app)
+
+    @app.after_request
+    def _desfazer_pendente(resposta):
+        # Escrita que a view não confirmou seria desfeita no teardown, que vem
+        # depois de gravar a sessão no banco: até lá ela seguraria o lock de
+        # escrita (e, com o perfil, o escritor do pool) de que a sessão precisa.
+        if db.session.registry.has() and db.session().escreveu:
+            db.session.rollback()
+        return resposta
+
+    if not perfil:
+        return
+
+    with app.app_context():
+        escritor, leitura = db.engine, db.engines[LEITURA]
+    event.listen(escritor, 'connect', _ao_conectar(pragmas, escritor=True))
+    event.listen(escritor, 'begin', _iniciar_imediata)
+    event.listen(leitura, 'connect', _ao_conectar(pragmas, escritor=False))
+
@@ -0,0 +1,44 @@
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from . import db
+from .banco import inserir_ou_atualizar
+
+
+class CacheSuap(db.Model):
+    """Dados normalizados do SUAP por matrícula, persistidos entre reinícios.
+
+    As escritas usam uma conexão própria, fora de db.session: guardar no
+    cache não faz commit do que a requisição ou a tarefa deixou pendente.
+    """
+    __tablename__ = 'cache_suap'
+
+    matricula     = db.Column(db.String(20), primary_key=True)
+    dados         = db.Column(db.Text, nullable=False)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<CacheSuap {self.matricula}>'
+
+    @classmethod
+    def obter(cls, matricula, ttl_segundos: int) -> dict | None:
+        # Colunas, não a entidade: o mapa de identidade da sessão não enxergaria as escritas de guardar().
+        item = db.session.execute(select(cls.dados, cls.atualizado_em).where(cls.matricula == matricula)).first()
+        if not item or datetime.utcnow() - item.atualizado_em > timedelta(seconds=ttl_segundos):
+            return None
+        return json.loads(item.dados)
+
+    @classmethod
+    def guardar(cls, matricula, dados: dict, capacidade: int):
+        """Grava (ou renova) a entrada e descarta as mais antigas além da capacidade."""
+        with db.engine.begin() as conn:
+            inserir_ou_atualizar(conn, cls.__table__, {
+                'matricula': matricula, 'dados': json.dumps(dados), 'atualizado_em': datetime.utcnow(),
+            }, 'matricula')
+            excedentes = select(cls.matricula).order_by(cls.atualizado_em.desc()).offset(capacidade).subquery()
+            conn.execute(delete(cls).where(cls.matricula.in_(select(excedentes.c.matricula))))
+
+    @classmethod
+    def invalidar(cls, matricula):
+        with db.engine.begin() as conn:
+            conn.execute(delete(cls).where(cls.matricula == matricula))
@@ -0,0 +1,192 @@
+"""Migrações versionadas do esquema.
+
+Cada passo roda uma única vez, em ordem, e grava sua versão em
+schema_version. Os passos são idempotentes (verificam colunas e índices
+antes de criar) para funcionar tanto num banco novo — em que o passo 1 já
+cria as tabelas completas — quanto num banco legado criado por versões
+antigas do app.
+
+    python init_db.py migrate
+"""
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from config import Config
+from . import db
+from .usuario import UsuarioInfo
+from .produto import Produto
+
+
+def _adicionar_coluna(conn, tabela, coluna, ddl):
+    if coluna not in {c['name'] for c in inspect(conn).get_columns(tabela)}:
+        conn.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {ddl}'))
+
+
+def _criar_indices(conn, tabela, *nomes):
+    """Cria, se ainda não existirem, índices declarados no modelo."""
+    for indice in tabela.indexes:
+        if indice.name in nomes:
+            indice.create(conn, checkfirst=True)
+
+
+# ── Passos ───────────────────────────────────────────────────────────────────
+
+def _esquema_inicial(conn):
+    db.metadata.create_all(conn)
+
+
+def _admin_e_cor_de_tag(conn):
+    _adicionar_coluna(conn, 'usuario_info', 'is_admin', 'BOOLEAN NOT NULL DEFAULT 0')
+    _adicionar_coluna(conn, 'tag', 'cor', "VARCHAR(7) NOT NULL DEFAULT '#6c757d'")
+
+
+def _geohash(conn):
+    from services.geo import codificar_geohash
+    _adicionar_coluna(conn, 'produto', 'geohash', 'VARCHAR(12)')
+    _criar_indices(conn, Produto.__table__, 'ix_produto_geohash')
+    pendentes = conn.execute(text(
+        'SELECT id, latitude, longitude FROM produto '
+        'WHERE geohash IS NULL AND latitude IS NOT NULL AND longitude IS NOT NULL')).all()
+    if pendentes:
+        conn.execute(text('UPDATE produto SET geohash = :geohash WHERE id = :id'),
+                     [{'id': i, 'geohash': codificar_geohash(lat, lon)} for i, lat, lon in pendentes])
+
+
+def _agregados_de_avaliacao(conn):
+    for coluna in ['avaliacoes_total', 'avaliacoes_soma', *(f'avaliacoes_{n}' for n in range(1, 6))]:
+        _adicionar_coluna(conn, 'produto', coluna, 'INTEGER NOT NULL DEFAULT 0')
+    _recalcular_agregados(conn)
+
+
+def _recalcular_agregados(conn):
+    # SQL puro em vez de Avaliacao.recalcular_agregados: passos antigos não
+    # podem depender das colunas que o modelo ORM terá no futuro.
+    subconsulta = 'SELECT {} FROM avaliacao a WHERE a.produto_id = produto.id'
+    histograma = ', '.join(
+        f"avaliacoes_{n} = ({subconsulta.format('COUNT(*)')} AND a.nota = {n})" for n in range(1, 6))
+    conn.execute(text(
+        f"UPDATE produto SET avaliacoes_total = ({subconsulta.format('COUNT(*)')}), "
+        f"avaliacoes_soma = ({subconsulta.format('COALESCE(SUM(a.nota), 0)')}), {histograma}"
+    ))
+
+
+def _indice_de_busca(conn):
+    from services.busca_service import criar_indice_busca
+    criar_indice_busca(conn)
+
+
+def _indices_de_listagem(conn):
+    from .avaliacao import Avaliacao
+    from .tag import produto_tags
+    # Bancos antigos podem ter votos repetidos (a rota checava antes de
+    # inserir, sem garantia do banco): fica o mais recente de cada par.
+    removidos = conn.execute(text(
+        'DELETE FROM avaliacao WHERE id NOT IN ('
+        'SELECT MAX(id) FROM avaliacao GROUP BY produto_id, avaliador_matricula)'
+    )).rowcount
+    if removidos:
+        _recalcular_agregados(conn)
+    _criar_indices(conn, Produto.__table__, 'ix_produto_status_created',
+                   'ix_produto_tipo_status_created', 'ix_produto_usuario_created')
+    _criar_indices(conn, Avaliacao.__table__, 'uq_avaliacao_produto_avaliador')
+    _criar_indices(conn, produto_tags, 'ix_produto_tags_tag_id')
+
+
+def _versoes_de_conjunto(conn):
+    from .versao_conjunto import VersaoConjunto
+    VersaoConjunto.__table__.create(conn, checkfirst=True)
+
+
+def _fila_de_tarefas(conn):
+    from .tarefa import Tarefa
+    Tarefa.__table__.create(conn, checkfirst=True)
+
+
+def _foto_de_produto(conn):
+    _adicionar_coluna(conn, 'produto', 'foto_hash', 'VARCHAR(64)')
+    _adicionar_coluna(conn, 'produto', 'foto_pronta', 'BOOLEAN NOT NULL DEFAULT 0')
+    _criar_indices(conn, Produto.__table__, 'ix_produto_foto_hash')
+
+
+def _sessoes_no_servidor(conn):
+    from .sessao import Sessao
+    Sessao.__table__.create(conn, checkfirst=True)
+
+
+def _indice_geografico_por_status(conn):
+    _criar_indices(conn, Produto.__table__, 'ix_produto_status_geohash')
+
+
+MIGRACOES = [
+    (1, 'esquema inicial', _esquema_inicial),
+    (2, 'usuario_info.is_admin e tag.cor', _admin_e_cor_de_tag),
+    (3, 'produto.geohash indexado', _geohash),
+    (4, 'agregados de avaliação em produto', _agregados_de_avaliacao),
+    (5, 'índice FTS5 de produtos', _indice_de_busca),
+    (6, 'índices de listagem, avaliação única e produto_tags.tag_id', _indices_de_listagem),
+    (7, 'versao_conjunto para GET condicional', _versoes_de_conjunto),
+    (8, 'tabela tarefa da fila de tarefas', _fila_de_tarefas),
+    (9, 'foto de capa em produto', _foto_de_produto),
+    (10, 'tabela sessao para sessões no servidor', _sessoes_no_servidor),
+    (11, 'índice (status, geohash) em produto', _indice_geografico_por_status),
+]
+VERSAO_MAIS_RECENTE = MIGRACOES[-1][0]
+
+
+# ── Execução ─────────────────────────────────────────────────────────────────
+
+def versao_atual() -> int:
+    """Versão gravada no banco (0 se nunca migrado). Uma única consulta."""
+    try:
+        return db.session.execute(text('SELECT MAX(versao) FROM schema_version')).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        db.session.rollback()
+        return 0
+
+
+def migrar(saida=print) -> int:
+    """Aplica os passos pendentes, um commit por passo. Retorna a versão final."""
+    db.session.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_version ('
+        'versao INTEGER PRIMARY KEY, descricao VARCHAR(200) NOT NULL, aplicada_em DATETIME NOT NULL)'
+    ))
+    db.session.commit()
+
+    for versao, descricao, passo in MIGRACOES:
+        if versao <= versao_atual():
+            continue
+        saida(f'Aplicando migração {versao}: {descricao}')
+        passo(db.session.connection())
+        db.session.execute(
+            text('INSERT INTO schema_version (versao, descricao, aplicada_em) VALUES (:v, :d, :em)'),
+            {'v': versao, 'd': descricao, 'em': datetime.utcnow()},
+        )
+        db.session.commit()
+
+    _promover_admins()
+    return versao_atual()
+
+
+def _promover_admins():
+    for matricula in Config.ADMIN_MATRICULAS:
+        u = UsuarioInfo.query.filter_by(matricula=matricula).first()
+        if u and not u.is_admin:
+            u.is_admin = True
+    db.session.commit()
+
+
+def verificar_esquema(app):
+    """Na subida do app: só confere a versão. Sem DDL quando o banco está em dia.
+
+    Com AUTO_MIGRAR desligado (o padrão fora de `python app.py`) um banco
+    desatualizado impede a subida em vez de disputar DDL entre processos.
+    """
+    with app.app_context():
+        versao = versao_atual()
+        if versao >= VERSAO_MAIS_RECENTE:
+            return
+        if not app.config.get('AUTO_MIGRAR', False):
+            raise RuntimeError(
+                f'Esquema do banco na versão {versao}, app espera {VERSAO_MAIS_RECENTE}. '
+                'Rode: python init_db.py migrate')
+        migrar()
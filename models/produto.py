@@ -1,6 +1,15 @@
 import enum
+from sqlalchemy.dialects import sqlite
+from services.geo import codificar_geohash
 from . import db
 
+# No SQLite o server_default grava 'YYYY-MM-DD HH:MM:SS'; o formato padrão do
+# dialeto acrescenta microssegundos aos parâmetros e quebraria a comparação do
+# cursor de paginação (created_at, id).
+_DataHora = db.DateTime().with_variant(sqlite.DATETIME(
+    storage_format='%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d',
+), 'sqlite')
+
 
 class TipoProduto(str, enum.Enum):
     VENDA = 'venda'
@@ -15,6 +24,17 @@ class StatusProduto(str, enum.Enum):
 
 class Produto(db.Model):
     __tablename__ = 'produto'
+    # Listagens filtram por igualdade e ordenam pelo cursor (created_at, id):
+    # cada índice cobre o filtro e a ordenação, sem tabela temporária.
+    __table_args__ = (
+        db.Index('ix_produto_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_produto_tipo_status_created', 'tipo', 'status', 'created_at', 'id'),
+        db.Index('ix_produto_usuario_created', 'usuario_matricula', 'created_at', 'id'),
+        # Mapa e busca por proximidade: uma faixa de geohash por célula, já no status pedido.
+        db.Index('ix_produto_status_geohash', 'status', 'geohash'),
+    )
+    # Dono sem nome conhecido ao criar (cadastro com o SUAP ainda sem resposta).
+    NOME_DONO_PADRAO = 'Usuário'
 
     id                = db.Column(db.Integer, primary_key=True)
     nome              = db.Column(db.String(100), nullable=False)
@@ -27,10 +47,22 @@ class Produto(db.Model):
     endereco          = db.Column(db.String(200))
     latitude          = db.Column(db.Float)
     longitude         = db.Column(db.Float)
-    created_at        = db.Column(db.DateTime, server_default=db.func.now())
+    geohash           = db.Column(db.String(12), index=True)
+    # Foto de capa, endereçada pelo SHA-256 do conteúdo; foto_pronta indica que
+    # as miniaturas já existem — as listagens só as exibem a partir daí.
+    foto_hash         = db.Column(db.String(64), index=True)
+    foto_pronta       = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    avaliacoes_total  = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    avaliacoes_soma   = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    avaliacoes_1      = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    avaliacoes_2      = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    avaliacoes_3      = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    avaliacoes_4      = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    avaliacoes_5      = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at        = db.Column(_DataHora, server_default=db.func.now())
     updated_at        = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
 
-    tags = db.relationship('Tag', secondary='produto_tags', lazy='subquery',
+    tags = db.relationship('Tag', secondary='produto_tags', lazy='selectin',
                            backref=db.backref('produtos', lazy=True))
 
     usuario_info = db.relationship(
@@ -43,6 +75,69 @@ class Produto(db.Model):
     def __repr__(self):
         return f'<Produto {self.nome}>'
 
+    @property
+    def media_avaliacao(self) -> float:
+        return round(self.avaliacoes_soma / self.avaliacoes_total, 1) if self.avaliacoes_total else 0.0
+
+    @property
+    def histograma_avaliacoes(self) -> dict:
+        return {n: getattr(self, f'avaliacoes_{n}') for n in range(1, 6)}
+
+    def registrar_nota(self, nota: int, nota_anterior: int | None = None):
+        """Atualiza os agregados de avaliação na mesma transação do voto.
+
+        Usa expressões SQL (coluna = coluna + delta) para que votos simultâneos
+        em processos diferentes não se sobrescrevam.
+        """
+        cls = type(self)
+        if nota_anterior is None:
+            self.avaliacoes_total = cls.avaliacoes_total + 1
+            self.avaliacoes_soma = cls.avaliacoes_soma + nota
+        else:
+            if nota_anterior == nota:
+                return
+            self.avaliacoes_soma = cls.avaliacoes_soma + (nota - nota_anterior)
+            coluna = f'avaliacoes_{nota_anterior}'
+            setattr(self, coluna, getattr(cls, coluna) - 1)
+        coluna = f'avaliacoes_{nota}'
+        setattr(self, coluna, getattr(cls, coluna) + 1)
+
+    def para_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'preco': self.preco,
+            'descricao': self.descricao,
+            'tipo': self.tipo,
+            'status': self.status,
+            'endereco': self.endereco,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'usuario_matricula': self.usuario_matricula,
+            'usuario_nome': self.usuario_nome,
+            'media_avaliacao': self.media_avaliacao,
+            'total_avaliacoes': self.avaliacoes_total,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'tags': [{'id': t.id, 'nome': t.nome, 'cor': t.cor} for t in self.tags],
+            'foto': self.url_miniatura('card'),
+        }
+
+    def url_miniatura(self, tamanho: str) -> str | None:
+        """URL da miniatura em `tamanho` (ver services.fotos.TAMANHOS), ou None enquanto não existe."""
+        if not (self.foto_hash and self.foto_pronta):
+            return None
+        from flask import url_for
+        return url_for('produtos.foto', foto_hash=self.foto_hash, tamanho=tamanho)
+
     def pode_ser_modificado_por(self, matricula: str) -> bool:
         from routes import is_admin
         return is_admin() or self.usuario_matricula == matricula
+
+
+@db.event.listens_for(Produto, 'before_insert')
+@db.event.listens_for(Produto, 'before_update')
+def _atualizar_geohash(mapper, connection, produto):
+    if produto.latitude is not None and produto.longitude is not None:
+        produto.geohash = codificar_geohash(produto.latitude, produto.longitude)
+    else:
+        produto.geohash = None
@@ -0,0 +1,47 @@
+from datetime import datetime
+from sqlalchemy import delete, select
+from . import db
+from .banco import inserir_ou_atualizar, motor_de_leitura
+
+
+class Sessao(db.Model):
+    """Sessões guardadas no servidor (SESSOES_ARMAZEM='banco'); o cookie leva só o id.
+
+    `id` é o SHA-256 do id do cookie: quem lê a tabela não consegue se passar
+    por ninguém. Os métodos usam uma conexão própria, fora de db.session,
+    para que gravar a sessão no fim da requisição não faça commit do que a
+    view deixou pendente.
+    """
+    __tablename__ = 'sessao'
+
+    id        = db.Column(db.String(64), primary_key=True)
+    dados     = db.Column(db.Text, nullable=False)
+    expira_em = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<Sessao {self.id[:8]}>'
+
+    @classmethod
+    def carregar(cls, sessao_id: str) -> tuple[str, datetime] | None:
+        """(dados serializados, expira_em) da sessão ainda válida, ou None."""
+        with motor_de_leitura().connect() as conn:
+            linha = conn.execute(
+                select(cls.dados, cls.expira_em).where(cls.id == sessao_id, cls.expira_em > datetime.utcnow())
+            ).first()
+        return tuple(linha) if linha else None
+
+    @classmethod
+    def salvar(cls, sessao_id: str, dados: str, expira_em: datetime):
+        with db.engine.begin() as conn:
+            inserir_ou_atualizar(conn, cls.__table__, {'id': sessao_id, 'dados': dados, 'expira_em': expira_em}, 'id')
+
+    @classmethod
+    def apagar(cls, sessao_id: str):
+        with db.engine.begin() as conn:
+            conn.execute(delete(cls).where(cls.id == sessao_id))
+
+    @classmethod
+    def expurgar(cls) -> int:
+        """Remove as sessões vencidas (faixa do índice de expira_em)."""
+        with db.engine.begin() as conn:
+            return conn.execute(delete(cls).where(cls.expira_em <= datetime.utcnow())).rowcount
@@ -1,17 +1,25 @@
 import unicodedata
 import re
+from sqlalchemy import and_, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 from . import db
 
 produto_tags = db.Table(
     'produto_tags',
     db.Column('produto_id', db.Integer, db.ForeignKey('produto.id', ondelete='CASCADE'), primary_key=True),
     db.Column('tag_id',     db.Integer, db.ForeignKey('tag.id',     ondelete='CASCADE'), primary_key=True),
+    # A chave primária começa por produto_id; buscas por tag precisam do inverso.
+    db.Index('ix_produto_tags_tag_id', 'tag_id', 'produto_id'),
 )
 
 
+def _dobrar(texto: str) -> str:
+    """Remove acentos e caixa: 'Cadéira' → 'cadeira'."""
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii').lower()
+
+
 def _gerar_slug(nome: str) -> str:
-    normalizado = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode('ascii')
-    return re.sub(r'[^a-z0-9]+', '-', normalizado.lower()).strip('-')
+    return re.sub(r'[^a-z0-9]+', '-', _dobrar(nome)).strip('-')
 
 
 class Tag(db.Model):
@@ -30,3 +38,42 @@ class Tag(db.Model):
         tag = cls(nome=nome.strip(), slug=_gerar_slug(nome), cor=cor)
         db.session.add(tag)
         return tag
+
+    @staticmethod
+    def ids_existentes(tag_ids) -> set[int]:
+        """Quais `tag_ids` existem, lidos na transação de escrita da sessão (a mesma do INSERT que vem depois)."""
+        if not tag_ids:
+            return set()
+        conn = db.session.connection()
+        return set(conn.execute(select(Tag.id).where(Tag.id.in_(set(tag_ids)))).scalars())
+
+    @staticmethod
+    def aplicar_em_lote(pares) -> int:
+        """Insere pares (produto_id, tag_id) ignorando os que já existem. Não faz commit."""
+        if not pares:
+            return 0
+        conn = db.session.connection()
+        linhas = [{'produto_id': p, 'tag_id': t} for p, t in pares]
+        if conn.dialect.name == 'mysql':
+            comando = produto_tags.insert().prefix_with('IGNORE')
+        else:
+            insert = postgresql.insert if conn.dialect.name == 'postgresql' else sqlite.insert
+            comando = insert(produto_tags).on_conflict_do_nothing()
+        return conn.execute(comando, linhas).rowcount
+
+    @staticmethod
+    def remover_em_lote(pares) -> int:
+        """Remove pares (produto_id, tag_id) com um único DELETE. Não faz commit.
+
+        Agrupado por tag — `tag_id = ? AND produto_id IN (...)` — porque o
+        SQLite não usa índice para `(produto_id, tag_id) IN (VALUES ...)`.
+        """
+        if not pares:
+            return 0
+        por_tag = {}
+        for produto_id, tag_id in pares:
+            por_tag.setdefault(tag_id, []).append(produto_id)
+        return db.session.execute(produto_tags.delete().where(or_(*(
+            and_(produto_tags.c.tag_id == tag_id, produto_tags.c.produto_id.in_(produto_ids))
+            for tag_id, produto_ids in por_tag.items()
+        )))).rowcount
@@ -0,0 +1,142 @@
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from . import db
+
+ESTADOS = ('pendente', 'executando', 'concluida', 'falhou')
+
+
+class Tarefa(db.Model):
+    """Trabalho adiado, executado fora da requisição pela fila de tarefas.
+
+    `chave` deduplica: enquanto houver uma tarefa pendente ou em execução
+    com a mesma chave, enfileirar outra devolve a existente. A chave é
+    apagada quando a tarefa termina, então o índice único vale só para as
+    ativas em qualquer banco (NULLs não colidem). Os `argumentos` também:
+    podem levar credenciais (o token do SUAP), que não devem ficar no banco
+    durante a retenção das concluídas nem indefinidamente nas que falharam.
+    """
+    __tablename__ = 'tarefa'
+    __table_args__ = (
+        db.Index('ix_tarefa_estado_executar_em', 'estado', 'executar_em', 'id'),
+        db.Index('ix_tarefa_estado_concluida_em', 'estado', 'concluida_em'),
+    )
+
+    id             = db.Column(db.Integer, primary_key=True)
+    tipo           = db.Column(db.String(60), nullable=False)
+    argumentos     = db.Column(db.Text, nullable=False, default='{}')
+    chave          = db.Column(db.String(120), unique=True)
+    estado         = db.Column(db.String(20), nullable=False, default='pendente')
+    tentativas     = db.Column(db.Integer, nullable=False, default=0)
+    max_tentativas = db.Column(db.Integer, nullable=False, default=5)
+    erro           = db.Column(db.Text)
+    criada_em      = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    executar_em    = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    iniciada_em    = db.Column(db.DateTime)
+    concluida_em   = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<Tarefa {self.id} {self.tipo} {self.estado}>'
+
+    @classmethod
+    def enfileirar(cls, tipo: str, argumentos: dict, chave=None, atraso: int = 0,
+                   max_tentativas: int = 5) -> int:
+        """Grava a tarefa e faz commit. Com `chave`, devolve o id da tarefa ativa equivalente se houver."""
+        if chave:
+            existente = db.session.query(cls.id).filter_by(chave=chave).scalar()
+            if existente:
+                return existente
+        agora = datetime.utcnow()
+        tarefa = cls(tipo=tipo, argumentos=json.dumps(argumentos), chave=chave, max_tentativas=max_tentativas,
+                     criada_em=agora, executar_em=agora + timedelta(seconds=atraso))
+        db.session.add(tarefa)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Outro processo enfileirou a mesma chave entre a consulta e o INSERT.
+            db.session.rollback()
+            return db.session.query(cls.id).filter_by(chave=chave).scalar()
+        return tarefa.id
+
+    @classmethod
+    def reservar(cls) -> 'Tarefa | None':
+        """Marca a próxima tarefa vencida como 'executando' e a devolve (None se a fila está vazia).
+
+        O UPDATE condicionado a estado='pendente' garante que só um worker
+        fique com ela, mesmo entre processos.
+        """
+        agora = datetime.utcnow()
+        for _ in range(3):
+            tarefa_id = db.session.query(cls.id).filter(
+                cls.estado == 'pendente', cls.executar_em <= agora,
+            ).order_by(cls.executar_em, cls.id).limit(1).scalar()
+            if tarefa_id is None:
+                db.session.rollback()
+                return None
+            reservada = db.session.execute(
+                update(cls).where(cls.id == tarefa_id, cls.estado == 'pendente')
+                .values(estado='executando', iniciada_em=agora, tentativas=cls.tentativas + 1)
+            ).rowcount
+            db.session.commit()
+            if reservada:
+                return db.session.get(cls, tarefa_id)
+        return None
+
+    def concluir(self):
+        self.estado = 'concluida'
+        self.concluida_em = datetime.utcnow()
+        self.chave = None
+        self.argumentos = '{}'
+        self.erro = None
+        db.session.commit()
+
+    def falhar(self, erro: str, atraso: float):
+        """Reagenda após `atraso` segundos, ou desiste se esgotou as tentativas."""
+        self.erro = erro
+        if self.tentativas >= self.max_tentativas:
+            self.estado = 'falhou'
+            self.concluida_em = datetime.utcnow()
+            self.chave = None
+            self.argumentos = '{}'
+        else:
+            self.estado = 'pendente'
+            self.executar_em = datetime.utcnow() + timedelta(seconds=atraso)
+        db.session.commit()
+
+    @classmethod
+    def recuperar_abandonadas(cls, limite_segundos: int) -> int:
+        """Devolve à fila tarefas 'executando' há mais de `limite_segundos` (worker que morreu).
+
+        As que já gastaram max_tentativas viram 'falhou': uma tarefa que
+        derruba o próprio worker (ex.: falta de memória) não volta para
+        sempre. Quem passa do limite é tratado como abandonado, então os
+        executores precisam terminar bem antes de TAREFAS_TIMEOUT.
+        """
+        agora = datetime.utcnow()
+        abandonadas = [cls.estado == 'executando', cls.iniciada_em < agora - timedelta(seconds=limite_segundos)]
+        esgotadas = db.session.execute(
+            update(cls).where(*abandonadas, cls.tentativas >= cls.max_tentativas)
+            .values(estado='falhou', concluida_em=agora, chave=None, argumentos='{}',
+                    erro=f'Abandonada: passou de {limite_segundos} s em execução em todas as tentativas.')
+        ).rowcount
+        devolvidas = db.session.execute(
+            update(cls).where(*abandonadas).values(estado='pendente', executar_em=agora)
+        ).rowcount
+        db.session.commit()
+        return esgotadas + devolvidas
+
+    @classmethod
+    def expurgar(cls, retencao_segundos: int) -> int:
+        """Remove tarefas concluídas há mais de `retencao_segundos`; as que falharam ficam para análise."""
+        corte = datetime.utcnow() - timedelta(seconds=retencao_segundos)
+        total = db.session.query(cls).filter(cls.estado == 'concluida', cls.concluida_em < corte).delete(
+            synchronize_session=False)
+        db.session.commit()
+        return total
+
+    @classmethod
+    def profundidade(cls) -> dict:
+        """{estado: quantidade}. Uma contagem por estado, cada uma numa faixa do índice."""
+        return {estado: db.session.query(func.count(cls.id)).filter(cls.estado == estado).scalar()
+                for estado in ESTADOS}
@@ -0,0 +1,41 @@
+from datetime import datetime
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from . import db
+
+
+class VersaoConjunto(db.Model):
+    """Contador de escritas por conjunto de dados ('produtos', 'tags', 'usuario:<matrícula>').
+
+    Incrementado na mesma transação que altera o conjunto; serve de carimbo
+    barato para ETag sem consultar o conjunto em si.
+    """
+    __tablename__ = 'versao_conjunto'
+
+    chave         = db.Column(db.String(60), primary_key=True)
+    versao        = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<VersaoConjunto {self.chave}={self.versao}>'
+
+    @classmethod
+    def obter(cls, chaves) -> dict:
+        """{chave: (versao, atualizado_em)}; chaves nunca escritas ficam de fora."""
+        linhas = db.session.query(cls.chave, cls.versao, cls.atualizado_em).filter(cls.chave.in_(chaves))
+        return {chave: (versao, atualizado_em) for chave, versao, atualizado_em in linhas}
+
+    @classmethod
+    def incrementar(cls, conn, chaves):
+        """Soma 1 a cada chave (criando-a se preciso) usando a conexão da transação corrente."""
+        agora = datetime.utcnow().replace(microsecond=0)
+        tabela = cls.__table__
+        for chave in chaves:
+            valores = {'chave': chave, 'versao': 1, 'atualizado_em': agora}
+            novos = {'versao': tabela.c.versao + 1, 'atualizado_em': agora}
+            if conn.dialect.name == 'mysql':
+                comando = mysql.insert(tabela).values(**valores).on_duplicate_key_update(**novos)
+            else:
+                insert = postgresql.insert if conn.dialect.name == 'postgresql' else sqlite.insert
+                comando = insert(tabela).values(**valores).on_conflict_do_update(
+                    index_elements=['chave'], set_=novos)
+            conn.execute(comando)
@@ -1,5 +1,9 @@
 from functools import wraps
-from flask import session, redirect, url_for
+from flask import session, redirect, url_for, request, abort, jsonify, make_response, current_app, stream_template
+from models import db, UsuarioInfo
+from services.paginacao import paginar_produtos, CursorInvalido
+from services.suap_service import dados_em_cache
+from services.versoes import versoes
 
 
 def login_required(f):
@@ -22,3 +26,118 @@ def admin_required(f):
             return redirect(url_for('main.home'))
         return f(*args, **kwargs)
     return decorated
+
+
+def dados_do_usuario() -> dict:
+    """session['dados_usuario'], completado quando o login terminou sem os dados do SUAP.
+
+    Com o cache frio o cadastro segue sem nome; a tarefa de sincronização
+    preenche o cache e UsuarioInfo depois, e a sessão é completada aqui na
+    primeira requisição seguinte que precisar do nome.
+    """
+    dados = session.get('dados_usuario') or {}
+    if not session.get('usuario_logado') or dados.get('nome_usual') or dados.get('nome'):
+        return dados
+    matricula = session.get('matricula')
+    completos = dados_em_cache(matricula)
+    if not completos:
+        nome = db.session.query(UsuarioInfo.nome).filter_by(matricula=matricula).scalar()
+        completos = {'nome_usual': nome, 'nome': nome} if nome else None
+    if completos:
+        dados = {**dados, **completos}
+        session['dados_usuario'] = dados
+    return dados
+
+
+def quer_json():
+    return request.args.get('formato') == 'json'
+
+
+def pagina_de_produtos(query):
+    """Aplica ?cursor= à query de produtos; cursor malformado vira 400."""
+    try:
+        return paginar_produtos(query, request.args.get('cursor'))
+    except CursorInvalido:
+        abort(400)
+
+
+def listagem_json(produtos_com_avaliacoes, proximo_cursor, **extra):
+    return jsonify({
+        'produtos': [dict(item['produto'].para_dict(),
+                          media_avaliacao=item['media_avaliacao'],
+                          total_avaliacoes=item['total_avaliacoes'])
+                     for item in produtos_com_avaliacoes],
+        'proximo_cursor': proximo_cursor,
+        **extra,
+    })
+
+
+# Tamanho dos blocos enviados depois do layout: grandes o bastante para a
+# compressão render bem, pequenos o bastante para o navegador ir pintando.
+BLOCO_FLUXO = 8 * 1024
+
+
+def _em_blocos(pedacos, descarregar):
+    buffer, tamanho = [], 0
+    for pedaco in pedacos:
+        buffer.append(pedaco)
+        tamanho += len(pedaco)
+        if tamanho >= BLOCO_FLUXO or descarregar:
+            yield ''.join(buffer)
+            buffer, tamanho = [], 0
+            descarregar.clear()
+    if buffer:
+        yield ''.join(buffer)
+
+
+def renderizar_em_fluxo(template, **contexto):
+    """Como render_template, mas envia o HTML enquanto o Jinja o gera.
+
+    O layout sai sozinho no primeiro bloco (base.html chama descarregar()
+    logo depois da navegação) e o resto em blocos de BLOCO_FLUXO. As
+    consultas devem ficar na view: depois do primeiro byte, um erro já não
+    vira página de erro.
+    """
+    descarregar = []
+
+    def marcar():
+        descarregar.append(True)
+        return ''
+
+    pedacos = stream_template(template, descarregar=marcar, **contexto)
+    return current_app.response_class(_em_blocos(pedacos, descarregar), mimetype='text/html')
+
+
+def condicional(*chaves, max_age=0):
+    """GET condicional por ETag a partir das versões de `chaves`.
+
+    As chaves aceitam os argumentos da rota ('usuario:{matricula}'). O ETag
+    também cobre a URL completa e o que a sessão muda na página (usuário,
+    admin), então o 304 sai antes de a view consultar ou renderizar qualquer
+    coisa. Respostas são privadas: dependem de quem está logado. Não há
+    Last-Modified: a data das versões não cobre URL, sessão nem templates,
+    e um If-Modified-Since sozinho daria 304 com a página de outra pessoa.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            etag = versoes.carimbo(
+                [c.format(**kwargs) for c in chaves],
+                request.full_path, session.get('matricula'), session.get('is_admin', False),
+                sorted(session.get('dados_usuario', {}).items()),
+            )
+            cache_control = f'private, max-age={max_age}, must-revalidate' if max_age else 'private, no-cache'
+
+            # Comparação fraca: a compressão marca o ETag como W/ no HTML comprimido.
+            if request.if_none_match.contains_weak(etag):
+                resposta = current_app.response_class(status=304)
+            else:
+                resposta = make_response(f(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+
+            resposta.set_etag(etag)
+            resposta.headers['Cache-Control'] = cache_control
+            return resposta
+        return decorated
+    return decorator
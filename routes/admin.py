@@ -0,0 +1,89 @@
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context
+from routes import login_required, admin_required
+from models import Avaliacao
+from services.cache_fragmentos import cache_fragmentos
+from services.fila_tarefas import fila
+from services.validacao_produtos import validar_linha
+from services.lote_produtos import (importar_produtos, ler_csv, ler_ndjson, exportar_csv, exportar_ndjson,
+                                   ArquivoInvalido)
+from services.instrumentacao_sql import instrumentacao_sql
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.route('/admin/cache')
+@login_required
+@admin_required
+def cache():
+    return jsonify({'fragmentos': cache_fragmentos.estatisticas()})
+
+
+@admin_bp.route('/admin/sql', methods=['GET', 'DELETE'])
+@login_required
+@admin_required
+def sql():
+    if request.method == 'DELETE':
+        instrumentacao_sql.limpar()
+        return '', 204
+    return jsonify(instrumentacao_sql.relatorio(request.args.get('formas', 10, type=int)))
+
+
+# ── Fila de tarefas ──────────────────────────────────────────────────────────
+
+@fila.tarefa('avaliacoes.recalcular_agregados', max_tentativas=3)
+def _recalcular_agregados():
+    Avaliacao.recalcular_agregados()
+
+
+@admin_bp.route('/admin/tarefas')
+@login_required
+@admin_required
+def tarefas():
+    return jsonify(fila.painel(request.args.get('amostras', 500, type=int)))
+
+
+@admin_bp.route('/admin/avaliacoes/recalcular', methods=['POST'])
+@login_required
+@admin_required
+def recalcular_avaliacoes():
+    tarefa_id = fila.enfileirar('avaliacoes.recalcular_agregados', chave='avaliacoes:recalcular')
+    return jsonify({'tarefa': tarefa_id}), 202
+
+
+# ── Importação / exportação de produtos ──────────────────────────────────────
+
+def _formato_da_requisicao(nome_arquivo=''):
+    formato = request.args.get('formato')
+    if formato in ('csv', 'ndjson'):
+        return formato
+    if nome_arquivo.endswith(('.ndjson', '.jsonl')) or 'ndjson' in (request.mimetype or ''):
+        return 'ndjson'
+    return 'csv'
+
+
+@admin_bp.route('/admin/produtos/importar', methods=['POST'])
+@login_required
+@admin_required
+def importar_produtos_em_lote():
+    """Aceita o arquivo no campo 'arquivo' (multipart) ou direto no corpo da requisição."""
+    arquivo = request.files.get('arquivo')
+    stream = arquivo.stream if arquivo else request.stream
+    formato = _formato_da_requisicao(arquivo.filename if arquivo else '')
+    linhas = ler_ndjson(stream) if formato == 'ndjson' else ler_csv(stream)
+    try:
+        relatorio = importar_produtos(linhas, validar_linha, session.get('matricula'))
+    except ArquivoInvalido as e:
+        return jsonify({'erro': str(e)}), 400
+    return jsonify(relatorio), (200 if relatorio['importados'] or not relatorio['total_erros'] else 400)
+
+
+@admin_bp.route('/admin/produtos/exportar')
+@login_required
+@admin_required
+def exportar_produtos_em_lote():
+    if _formato_da_requisicao() == 'ndjson':
+        corpo, mimetype, extensao = exportar_ndjson(), 'application/x-ndjson', 'ndjson'
+    else:
+        corpo, mimetype, extensao = exportar_csv(), 'text/csv', 'csv'
+    return Response(stream_with_context(corpo), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=produtos.{extensao}'})
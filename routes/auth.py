@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session
 from models import UsuarioInfo, db
-from services.suap_service import autenticar_suap
+from services.suap_service import autenticar_suap, dados_em_cache, sincronizar_em_segundo_plano
 from services.auth_service import AuthService
 from services.oauth_service import oauth
 
@@ -97,7 +97,8 @@ def registro():
 
     matricula = session['registro_matricula']
     token = session['registro_token']
-    dados_usuario = session.get('registro_dados', {})
+    # Vazio quando o login não achou cache; a tarefa do SUAP pode já ter preenchido.
+    dados_usuario = session.get('registro_dados') or dados_em_cache(matricula) or {}
 
     if request.method != 'POST':
         return render_template('registro.html', matricula=matricula, dados_usuario=dados_usuario)
@@ -110,6 +111,9 @@ def registro():
         return render_template('registro.html', error=erro, matricula=matricula, dados_usuario=dados_usuario)
 
     usuario = AuthService.registrar(matricula, senha, token, dados_usuario)
+    if not dados_usuario:
+        # A tarefa aplica os dados ao usuário recém-criado quando o SUAP responder.
+        sincronizar_em_segundo_plano(matricula, token)
 
     session.pop('registro_matricula', None)
     session.pop('registro_token', None)
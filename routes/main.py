@@ -1,7 +1,9 @@
-from flask import Blueprint, render_template
-from sqlalchemy import func
-from models import db, Produto, UsuarioInfo, Avaliacao
-from routes import login_required
+from flask import Blueprint, render_template, request
+from models import Produto, Avaliacao, Tag
+from routes import login_required, condicional, quer_json, pagina_de_produtos, listagem_json, renderizar_em_fluxo
+from services.indice_tags import indice_tags
+from services.registro_tags import registro_tags
+from services.estatisticas import estatisticas
 
 main_bp = Blueprint('main', __name__)
 
@@ -9,37 +11,69 @@ main_bp = Blueprint('main', __name__)
 @main_bp.route('/')
 def index():
     try:
-        total_usuarios = db.session.query(func.count(UsuarioInfo.id)).scalar() or 0
-        total_produtos = db.session.query(func.count(Produto.id)).scalar() or 0
-        stats = db.session.query(Produto.tipo, func.count(Produto.id)).filter_by(
-            status='disponivel').group_by(Produto.tipo).all()
-        contagem = dict(stats)
+        stats = estatisticas.obter()
     except Exception:
-        total_usuarios = total_produtos = 0
-        contagem = {}
+        stats = {'total_usuarios': 0, 'total_produtos': 0, 'produtos_venda': 0, 'produtos_troca': 0}
 
-    return render_template('index.html',
-        total_usuarios=total_usuarios,
-        total_produtos=total_produtos,
-        produtos_venda=contagem.get('venda', 0),
-        produtos_troca=contagem.get('troca', 0))
+    return render_template('index.html', **stats)
+
+
+def _filtro_tags():
+    """Lê ?tags=slug1,slug2&modo=e|ou. Retorna (tags selecionadas, slugs desconhecidos, modo)."""
+    slugs = [s.strip() for s in request.args.get('tags', '').split(',') if s.strip()]
+    modo = 'ou' if request.args.get('modo') == 'ou' else 'e'
+    tags = registro_tags.por_slugs(slugs)
+    desconhecidos = list(dict.fromkeys(s for s in slugs if registro_tags.por_slug(s) is None))
+    return tags, desconhecidos, modo
+
+
+def _montar_facetas(selecionadas, desconhecidos, modo, vazio=False):
+    ids_selecionados = {t.id for t in selecionadas}
+    contagens = {} if vazio else indice_tags.facetas(indice_tags.filtrar(ids_selecionados, modo))
+    facetas = []
+    for tag in registro_tags.todas():
+        ativa = tag.id in ids_selecionados
+        slugs = ({t.slug for t in selecionadas} | set(desconhecidos)) ^ {tag.slug}
+        facetas.append({
+            'tag': tag,
+            'total': contagens.get(tag.id, 0),
+            'ativa': ativa,
+            'alternar': ','.join(sorted(slugs)),
+        })
+    return facetas
 
 
 @main_bp.route('/home')
 @login_required
+@condicional('produtos', 'tags')
 def home():
-    produtos = Produto.query.filter_by(status='disponivel').all()
-    ids = [p.id for p in produtos]
-    resumo = Avaliacao.resumo_por_produtos(ids)
+    selecionadas, desconhecidos, modo = _filtro_tags()
+    # Tag inexistente estreita o filtro: no modo 'e' nenhum produto tem todas;
+    # no modo 'ou' ela só não acrescenta nada.
+    vazio = bool(desconhecidos) and (modo == 'e' or not selecionadas)
+    query = Produto.query.filter_by(status='disponivel')
+    if selecionadas and modo == 'ou':
+        query = query.filter(Produto.tags.any(Tag.id.in_([t.id for t in selecionadas])))
+    else:
+        for tag in selecionadas:
+            query = query.filter(Produto.tags.any(Tag.id == tag.id))
+
+    produtos, proximo_cursor = ([], None) if vazio else pagina_de_produtos(query)
+    produtos_com_avaliacoes = Avaliacao.enriquecer_produtos(produtos)
+    facetas = _montar_facetas(selecionadas, desconhecidos, modo, vazio)
 
-    produtos_com_avaliacoes = [{
-        'produto': p,
-        'media_avaliacao': resumo.get(p.id, {}).get('media', 0),
-        'total_avaliacoes': resumo.get(p.id, {}).get('total', 0),
-    } for p in produtos]
+    if quer_json():
+        return listagem_json(produtos_com_avaliacoes, proximo_cursor, facetas=[
+            {'id': f['tag'].id, 'slug': f['tag'].slug, 'nome': f['tag'].nome,
+             'total': f['total'], 'ativa': f['ativa']}
+            for f in facetas
+        ])
 
-    return render_template('home.html',
+    return renderizar_em_fluxo('home.html',
         produtos=produtos,
         produtos_com_avaliacoes=produtos_com_avaliacoes,
-        produtos_mapa=[p for p in produtos if p.latitude and p.longitude],
+        proximo_cursor=proximo_cursor,
+        facetas=facetas,
+        tags_selecionadas=','.join([t.slug for t in selecionadas] + desconhecidos),
+        modo=modo,
         pode_criar=True)
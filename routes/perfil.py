@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session
 from models import db, UsuarioInfo, Produto
-from services.suap_service import obter_dados_usuario_suap
-from routes import login_required
+from services.suap_service import sincronizar_em_segundo_plano
+from routes import login_required, condicional, dados_do_usuario
 
 perfil_bp = Blueprint('perfil', __name__)
 
@@ -34,10 +34,11 @@ def perfil():
         db.session.commit()
         return redirect(url_for('perfil.perfil'))
 
-    dados_usuario = session.get('dados_usuario', {})
-    if not dados_usuario and session.get('token'):
-        dados_usuario = obter_dados_usuario_suap(session['token']) or {}
-        session['dados_usuario'] = dados_usuario
+    dados_usuario = dados_do_usuario()
+    if not dados_usuario.get('nome') and session.get('token'):
+        # Mostra o que já está no banco; a próxima visita encontra o cache preenchido.
+        sincronizar_em_segundo_plano(matricula, session['token'])
+        dados_usuario = _montar_perfil_publico(info, []) if info else {}
 
     return render_template('perfil.html',
         usuario=dados_usuario,
@@ -46,6 +47,7 @@ def perfil():
 
 @perfil_bp.route('/usuarios/<matricula>')
 @login_required
+@condicional('usuario:{matricula}', max_age=60)
 def usuario_publico(matricula):
     info = UsuarioInfo.query.filter_by(matricula=matricula).first()
     produtos = Produto.query.filter_by(usuario_matricula=matricula).all()
@@ -1,31 +1,21 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify
-from models import db, Produto, Avaliacao
-from routes import login_required
+from flask import (Blueprint, render_template, request, redirect, url_for, session, jsonify, abort, send_file,
+                   current_app)
+from models import db, Produto, Avaliacao, TipoProduto, StatusProduto
+from routes import (login_required, condicional, quer_json, pagina_de_produtos, listagem_json, renderizar_em_fluxo,
+                    dados_do_usuario)
+from services.geo import parse_bbox
+from services.validacao_produtos import parse_coordenadas, parse_preco
+from services.mapa_service import agrupar_produtos, produtos_proximos
+from services.busca_service import buscar_produtos
+from services.indice_tags import indice_tags
+from services.fotos import fotos, FotoInvalida
 
 produtos_bp = Blueprint('produtos', __name__)
 
 
 
-def _parse_preco(tipo, preco_str):
-    if tipo != 'venda':
-        return 0.0, None
-    if not preco_str:
-        return None, 'Informe o preço para produtos à venda.'
-    try:
-        return float(preco_str.replace(',', '.')), None
-    except ValueError:
-        return None, 'Preço inválido. Use somente números.'
-
-
-def _parse_coordenadas(lat_str, lon_str):
-    try:
-        return float(lat_str.replace(',', '.')), float(lon_str.replace(',', '.'))
-    except (ValueError, AttributeError):
-        return None, None
-
-
 def _dados_form():
-    lat, lon = _parse_coordenadas(request.form.get('latitude', ''), request.form.get('longitude', ''))
+    lat, lon = parse_coordenadas(request.form.get('latitude', ''), request.form.get('longitude', ''))
     return {
         'nome': request.form.get('nome', '').strip(),
         'tipo': request.form.get('tipo', 'venda').strip(),
@@ -39,7 +29,7 @@ def _dados_form():
 
 def _aplicar_form_ao_produto(produto, f):
     """Aplica dados do formulário ao objeto Produto. Retorna mensagem de erro ou None."""
-    preco, erro = _parse_preco(f['tipo'], f['preco_str'])
+    preco, erro = parse_preco(f['tipo'], f['preco_str'])
     if erro:
         return erro
     produto.nome      = f['nome']
@@ -52,6 +42,29 @@ def _aplicar_form_ao_produto(produto, f):
     return None
 
 
+def _aplicar_foto(produto):
+    """Aplica o upload (ou a remoção) de foto do formulário. Retorna (erro, hash da foto substituída)."""
+    anterior = produto.foto_hash
+    arquivo = request.files.get('foto')
+    if arquivo and arquivo.filename:
+        try:
+            foto_hash = fotos.guardar(arquivo.stream)
+        except FotoInvalida as e:
+            return str(e), None
+        if foto_hash != anterior:
+            produto.foto_hash = foto_hash
+            produto.foto_pronta = fotos.miniaturas_prontas(foto_hash)
+    elif request.form.get('remover_foto'):
+        produto.foto_hash = None
+        produto.foto_pronta = False
+    return None, (anterior if anterior != produto.foto_hash else None)
+
+
+def _depois_de_salvar_foto(produto, anterior):
+    fotos.confirmar(produto)
+    fotos.descartar_se_orfa(anterior)
+
+
 @produtos_bp.route('/produtos/novo', methods=['GET', 'POST'])
 @login_required
 def novo_produto():
@@ -62,17 +75,21 @@ def novo_produto():
     if not f['nome']:
         return render_template('produto_form.html', error='Informe o nome do produto.', produto=None, acao='novo')
 
-    dados = session.get('dados_usuario', {})
+    dados = dados_do_usuario()
     produto = Produto(
-        usuario_nome=dados.get('nome_usual') or dados.get('nome') or 'Usuário',
+        usuario_nome=dados.get('nome_usual') or dados.get('nome') or Produto.NOME_DONO_PADRAO,
         usuario_matricula=session.get('matricula'),
     )
     erro = _aplicar_form_ao_produto(produto, f)
+    if not erro:
+        erro, _ = _aplicar_foto(produto)
     if erro:
         return render_template('produto_form.html', error=erro, produto=None, acao='novo')
 
     db.session.add(produto)
     db.session.commit()
+    indice_tags.registrar_produto(produto.id)
+    _depois_de_salvar_foto(produto, None)
     return redirect(url_for('produtos.meus_produtos'))
 
 
@@ -80,18 +97,15 @@ def novo_produto():
 @login_required
 def meus_produtos():
     matricula = session.get('matricula')
-    produtos = Produto.query.filter_by(usuario_matricula=matricula).order_by(Produto.created_at.desc()).all()
-    ids = [p.id for p in produtos]
-    resumo = Avaliacao.resumo_por_produtos(ids)
+    produtos, proximo_cursor = pagina_de_produtos(Produto.query.filter_by(usuario_matricula=matricula))
+    produtos_com_avaliacoes = Avaliacao.enriquecer_produtos(produtos)
 
-    produtos_com_avaliacoes = [{
-        'produto': p,
-        'media_avaliacao': resumo.get(p.id, {}).get('media', 0),
-        'total_avaliacoes': resumo.get(p.id, {}).get('total', 0),
-    } for p in produtos]
+    if quer_json():
+        return listagem_json(produtos_com_avaliacoes, proximo_cursor)
 
-    return render_template('meus_produtos.html',
-        produtos_com_avaliacoes=produtos_com_avaliacoes)
+    return renderizar_em_fluxo('meus_produtos.html',
+        produtos_com_avaliacoes=produtos_com_avaliacoes,
+        proximo_cursor=proximo_cursor)
 
 
 @produtos_bp.route('/produtos/<int:produto_id>/editar', methods=['GET', 'POST'])
@@ -109,10 +123,14 @@ def editar_produto(produto_id):
         return render_template('produto_form.html', error='Informe o nome do produto.', produto=produto, acao='editar')
 
     erro = _aplicar_form_ao_produto(produto, f)
+    anterior = None
+    if not erro:
+        erro, anterior = _aplicar_foto(produto)
     if erro:
         return render_template('produto_form.html', error=erro, produto=produto, acao='editar')
 
     db.session.commit()
+    _depois_de_salvar_foto(produto, anterior)
     return redirect(url_for('produtos.meus_produtos'))
 
 
@@ -122,23 +140,104 @@ def excluir_produto(produto_id):
     produto = Produto.query.get_or_404(produto_id)
     if not produto.pode_ser_modificado_por(session.get('matricula')):
         return redirect(url_for('main.home'))
+    foto_hash = produto.foto_hash
     db.session.delete(produto)
     db.session.commit()
+    indice_tags.excluir_produto(produto_id)
+    fotos.descartar_se_orfa(foto_hash)
     return redirect(url_for('produtos.meus_produtos'))
 
 
 @produtos_bp.route('/venda')
 @login_required
+@condicional('produtos', 'tags')
 def venda():
-    produtos = Produto.query.filter_by(tipo='venda', status='disponivel').all()
-    return render_template('venda.html', produtos=produtos)
+    produtos, proximo_cursor = pagina_de_produtos(Produto.query.filter_by(tipo='venda', status='disponivel'))
+    if quer_json():
+        return jsonify({'produtos': [p.para_dict() for p in produtos], 'proximo_cursor': proximo_cursor})
+    return renderizar_em_fluxo('venda.html', produtos=produtos, proximo_cursor=proximo_cursor)
 
 
 @produtos_bp.route('/troca')
 @login_required
+@condicional('produtos', 'tags')
 def troca():
-    produtos = Produto.query.filter_by(tipo='troca', status='disponivel').all()
-    return render_template('troca.html', produtos=produtos)
+    produtos, proximo_cursor = pagina_de_produtos(Produto.query.filter_by(tipo='troca', status='disponivel'))
+    if quer_json():
+        return jsonify({'produtos': [p.para_dict() for p in produtos], 'proximo_cursor': proximo_cursor})
+    return renderizar_em_fluxo('troca.html', produtos=produtos, proximo_cursor=proximo_cursor)
+
+
+@produtos_bp.route('/buscar')
+@login_required
+def buscar():
+    q = request.args.get('q', '').strip()
+    produtos = buscar_produtos(q, request.args.get('limite', 50, type=int)) if q else []
+    if quer_json():
+        return jsonify({'q': q, 'produtos': [p.para_dict() for p in produtos]})
+    return renderizar_em_fluxo('buscar.html', q=q, produtos_com_avaliacoes=Avaliacao.enriquecer_produtos(produtos))
+
+
+@produtos_bp.route('/api/produtos/mapa')
+@login_required
+def mapa():
+    bbox = parse_bbox(request.args.get('bbox', ''))
+    if not bbox:
+        return jsonify({'erro': 'bbox inválido. Use min_lon,min_lat,max_lon,max_lat.'}), 400
+    zoom = request.args.get('zoom', 13, type=int)
+    return jsonify(agrupar_produtos(bbox, zoom))
+
+
+@produtos_bp.route('/api/produtos/proximos')
+@login_required
+def proximos():
+    """Produtos a até raio_km de (lat, lon), do mais perto ao mais longe.
+
+    Aceita os mesmos filtros das listagens: tipo (venda/troca, padrão os dois)
+    e status (padrão disponivel).
+    """
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'erro': 'Informe lat (-90 a 90) e lon (-180 a 180).'}), 400
+    raio_maximo = current_app.config.get('PROXIMOS_RAIO_MAXIMO_KM', 50)
+    raio_km = request.args.get('raio_km', 5.0, type=float)
+    if raio_km is None or not 0 < raio_km <= raio_maximo:
+        return jsonify({'erro': f'raio_km deve estar entre 0 e {raio_maximo:g}.'}), 400
+    tipo = request.args.get('tipo') or None
+    if tipo is not None and tipo not in {t.value for t in TipoProduto}:
+        return jsonify({'erro': f'Tipo inválido: {tipo}.'}), 400
+    status = request.args.get('status') or StatusProduto.DISPONIVEL.value
+    if status not in {s.value for s in StatusProduto}:
+        return jsonify({'erro': f'Status inválido: {status}.'}), 400
+    limite = max(1, min(request.args.get('limite', current_app.config['PRODUTOS_POR_PAGINA'], type=int), 100))
+
+    encontrados = produtos_proximos(lat, lon, raio_km, tipo=tipo, status=status, limite=limite)
+    return jsonify({
+        'origem': {'lat': lat, 'lon': lon},
+        'raio_km': raio_km,
+        'produtos': [{**produto.para_dict(), 'distancia_km': round(distancia, 3)}
+                     for produto, distancia in encontrados],
+    })
+
+
+@produtos_bp.route('/fotos/<foto_hash>/<tamanho>.jpg')
+@login_required
+def foto(foto_hash, tamanho):
+    """Só miniaturas. O endereço muda com o conteúdo, então a resposta nunca expira.
+
+    send_file usa wsgi.file_wrapper (sendfile no gunicorn) ou X-Sendfile, e
+    com conditional=True atende If-None-Match e Range.
+    """
+    caminho = fotos.miniatura_existente(foto_hash, tamanho)
+    if caminho is None:
+        abort(404)
+    resposta = send_file(caminho, mimetype='image/jpeg', conditional=True,
+                         etag=f'{foto_hash}-{tamanho}', max_age=365 * 24 * 3600)
+    resposta.cache_control.public = False
+    resposta.cache_control.private = True
+    resposta.cache_control.immutable = True
+    return resposta
 
 
 @produtos_bp.route('/produtos/<int:produto_id>/avaliar', methods=['POST'])
@@ -158,9 +257,11 @@ def avaliar_produto(produto_id):
     avaliacao = Avaliacao.query.filter_by(produto_id=produto_id, avaliador_matricula=matricula).first()
 
     if avaliacao:
+        produto.registrar_nota(nota, nota_anterior=avaliacao.nota)
         avaliacao.nota = nota
         avaliacao.comentario = comentario
     else:
+        produto.registrar_nota(nota)
         db.session.add(Avaliacao(
             produto_id=produto_id, avaliador_matricula=matricula,
             nota=nota, comentario=comentario,
@@ -170,6 +271,6 @@ def avaliar_produto(produto_id):
 
     return jsonify({
         'sucesso': True,
-        'media': Avaliacao.calcular_media(produto_id),
-        'total_avaliacoes': Avaliacao.query.filter_by(produto_id=produto_id).count(),
+        'media': produto.media_avaliacao,
+        'total_avaliacoes': produto.avaliacoes_total,
     })
@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify, session
-from models import db, Tag, Produto, UsuarioInfo
+from flask import Blueprint, request, jsonify, session, abort
+from sqlalchemy.exc import IntegrityError
+from models import db, Tag, Produto, UsuarioInfo, VersaoConjunto
 from models.tag import _gerar_slug
-from routes import login_required, admin_required
+from routes import login_required, admin_required, is_admin
+from services.indice_tags import indice_tags
+from services.registro_tags import registro_tags
 
 tags_bp = Blueprint('tags', __name__)
 
@@ -12,8 +15,15 @@ tags_bp = Blueprint('tags', __name__)
 @login_required
 @admin_required
 def listar_tags():
-    tags = Tag.query.order_by(Tag.nome).all()
-    return jsonify([{'id': t.id, 'nome': t.nome, 'slug': t.slug, 'cor': t.cor} for t in tags])
+    return jsonify([t._asdict() for t in registro_tags.todas()])
+
+
+@tags_bp.route('/api/tags')
+@login_required
+def autocompletar_tags():
+    """?prefix=texto&limite=10 — servido do registro em memória, sem SQL por tecla."""
+    limite = max(1, min(request.args.get('limite', 10, type=int), 50))
+    return jsonify([t._asdict() for t in registro_tags.prefixo(request.args.get('prefix', ''), limite)])
 
 
 @tags_bp.route('/admin/tags', methods=['POST'])
@@ -25,11 +35,17 @@ def criar_tag():
     if not nome:
         return jsonify({'erro': 'O campo nome é obrigatório.'}), 400
 
-    if Tag.query.filter_by(slug=_gerar_slug(nome)).first():
+    if registro_tags.por_slug(nome):
         return jsonify({'erro': 'Já existe uma tag com esse nome.'}), 409
 
     tag = Tag.criar(nome, cor=data.get('cor', '#6c757d'))
-    db.session.commit()
+    # O registro pode estar defasado em relação a outro worker; o índice único decide.
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'erro': 'Já existe uma tag com esse nome.'}), 409
+    registro_tags.invalidar()
     return jsonify({'id': tag.id, 'nome': tag.nome, 'slug': tag.slug, 'cor': tag.cor}), 201
 
 
@@ -42,16 +58,21 @@ def atualizar_tag(tag_id):
 
     novo_nome = (data.get('nome') or '').strip()
     if novo_nome and novo_nome != tag.nome:
-        novo_slug = _gerar_slug(novo_nome)
-        if Tag.query.filter(Tag.id != tag_id, Tag.slug == novo_slug).first():
+        existente = registro_tags.por_slug(novo_nome)
+        if existente and existente.id != tag_id:
             return jsonify({'erro': 'Já existe uma tag com esse nome.'}), 409
         tag.nome = novo_nome
-        tag.slug = novo_slug
+        tag.slug = _gerar_slug(novo_nome)
 
     if 'cor' in data and data['cor']:
         tag.cor = data['cor']
 
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'erro': 'Já existe uma tag com esse nome.'}), 409
+    registro_tags.invalidar()
     return jsonify({'id': tag.id, 'nome': tag.nome, 'slug': tag.slug, 'cor': tag.cor})
 
 
@@ -62,11 +83,19 @@ def excluir_tag(tag_id):
     tag = Tag.query.get_or_404(tag_id)
     db.session.delete(tag)
     db.session.commit()
+    indice_tags.excluir_tag(tag_id)
+    registro_tags.invalidar()
     return '', 204
 
 
 # ── Aplicar / remover tags em produtos (dono ou admin) ───────────────────────
 
+def _incrementar_versoes(matriculas):
+    # Escrita direta em produto_tags: o listener de versões não a vê.
+    VersaoConjunto.incrementar(db.session.connection(),
+                               ['produtos', *sorted({f'usuario:{m}' for m in matriculas})])
+
+
 @tags_bp.route('/produtos/<int:produto_id>/tags', methods=['POST'])
 @login_required
 def aplicar_tag(produto_id):
@@ -79,10 +108,19 @@ def aplicar_tag(produto_id):
     if not tag_id:
         return jsonify({'erro': 'tag_id é obrigatório.'}), 400
 
-    tag = Tag.query.get_or_404(tag_id)
-    if tag not in produto.tags:
-        produto.tags.append(tag)
+    # Aceita 3 ou "3", como a consulta por chave primária aceitava.
+    tag = registro_tags.por_id(int(tag_id)) if str(tag_id).isdigit() else None
+    if tag is None:
+        abort(404)
+    # O registro pode estar até REGISTRO_TAGS_INTERVALO atrás de uma exclusão em outro worker.
+    if not Tag.ids_existentes([tag.id]):
+        db.session.rollback()
+        registro_tags.invalidar()
+        abort(404)
+    if Tag.aplicar_em_lote([(produto.id, tag.id)]):
+        _incrementar_versoes([produto.usuario_matricula])
         db.session.commit()
+        indice_tags.aplicar(tag.id, produto.id)
 
     return jsonify({'sucesso': True, 'tag': {'id': tag.id, 'nome': tag.nome, 'cor': tag.cor}})
 
@@ -94,14 +132,87 @@ def remover_tag(produto_id, tag_id):
     if not produto.pode_ser_modificado_por(session.get('matricula')):
         return jsonify({'erro': 'Sem permissão para modificar este produto.'}), 403
 
-    tag = Tag.query.get_or_404(tag_id)
-    if tag in produto.tags:
-        produto.tags.remove(tag)
+    if registro_tags.por_id(tag_id) is None:
+        abort(404)
+    if Tag.remover_em_lote([(produto.id, tag_id)]):
+        _incrementar_versoes([produto.usuario_matricula])
         db.session.commit()
+        indice_tags.remover(tag_id, produto.id)
 
     return '', 204
 
 
+MAX_PARES_LOTE = 1000
+
+
+def _pares(valor):
+    """Lista de (produto_id, tag_id) a partir de [[p, t], ...] ou [{'produto_id': p, 'tag_id': t}, ...]."""
+    if not isinstance(valor, list):
+        return None
+    pares = []
+    for item in valor:
+        if isinstance(item, dict):
+            item = (item.get('produto_id'), item.get('tag_id'))
+        if not isinstance(item, (list, tuple)) or len(item) != 2:
+            return None
+        if not all(isinstance(v, int) and not isinstance(v, bool) for v in item):
+            return None
+        pares.append(tuple(item))
+    return pares
+
+
+@tags_bp.route('/produtos/tags/lote', methods=['POST'])
+@login_required
+def aplicar_tags_em_lote():
+    """Aplica e remove vários pares produto/tag numa única transação — tudo ou nada.
+
+    Corpo: {"aplicar": [[produto_id, tag_id], ...], "remover": [...]}.
+    """
+    data = request.get_json(silent=True) or {}
+    aplicar, remover = _pares(data.get('aplicar', [])), _pares(data.get('remover', []))
+    if aplicar is None or remover is None:
+        return jsonify({'erro': 'aplicar e remover devem ser listas de pares [produto_id, tag_id].'}), 400
+    # Um par nas duas listas é só removido.
+    remover = sorted(set(remover))
+    aplicar = sorted(set(aplicar) - set(remover))
+    if len(aplicar) + len(remover) > MAX_PARES_LOTE:
+        return jsonify({'erro': f'No máximo {MAX_PARES_LOTE} pares por requisição.'}), 400
+    if not aplicar and not remover:
+        return jsonify({'sucesso': True, 'aplicadas': 0, 'removidas': 0})
+
+    produto_ids = {p for p, _ in aplicar + remover}
+    donos = dict(db.session.query(Produto.id, Produto.usuario_matricula).filter(Produto.id.in_(produto_ids)))
+    inexistentes = sorted(produto_ids - donos.keys())
+    if inexistentes:
+        return jsonify({'erro': 'Produto(s) não encontrado(s).', 'produtos': inexistentes}), 404
+    if not is_admin():
+        alheios = sorted(p for p, dono in donos.items() if dono != session.get('matricula'))
+        if alheios:
+            return jsonify({'erro': 'Sem permissão para modificar estes produtos.', 'produtos': alheios}), 403
+
+    desconhecidas = sorted({t for _, t in aplicar if not registro_tags.por_id(t)})
+    if not desconhecidas:
+        tag_ids = {t for _, t in aplicar}
+        desconhecidas = sorted(tag_ids - Tag.ids_existentes(tag_ids))
+        if desconhecidas:
+            db.session.rollback()
+            registro_tags.invalidar()
+    if desconhecidas:
+        return jsonify({'erro': 'Tag(s) não encontrada(s).', 'tags': desconhecidas}), 404
+
+    aplicadas = Tag.aplicar_em_lote(aplicar)
+    removidas = Tag.remover_em_lote(remover)
+    if aplicadas or removidas:
+        _incrementar_versoes(donos.values())
+    db.session.commit()
+
+    for produto_id, tag_id in aplicar:
+        indice_tags.aplicar(tag_id, produto_id)
+    for produto_id, tag_id in remover:
+        indice_tags.remover(tag_id, produto_id)
+    return jsonify({'sucesso': True, 'aplicadas': aplicadas, 'removidas': removidas})
+
+
 # ── Promoção / rebaixamento de admin ─────────────────────────────────────────
 
 @tags_bp.route('/admin/usuarios/<matricula>/promover', methods=['POST'])
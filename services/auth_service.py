@@ -1,6 +1,6 @@
-from flask import session
+from flask import current_app, session
 from models import db, UsuarioInfo
-from services.crypto_service import verificar_senha, hash_senha
+from services.crypto_service import verificar_senha, hash_senha, precisa_rehash
 
 
 class AuthService:
@@ -12,6 +12,10 @@ class AuthService:
             return {'sucesso': False, 'usuario': None, 'erro': None}
         if not verificar_senha(senha, usuario.senha_hash):
             return {'sucesso': False, 'usuario': None, 'erro': 'Senha incorreta.'}
+        if precisa_rehash(usuario.senha_hash):
+            # Migra hashes antigos (MD5 ou custo desatualizado) enquanto temos a senha em claro.
+            usuario.senha_hash = hash_senha(senha)
+            db.session.commit()
         return {'sucesso': True, 'usuario': usuario, 'erro': None}
 
     @staticmethod
@@ -45,7 +49,17 @@ class AuthService:
 
     @staticmethod
     def iniciar_sessao(usuario: UsuarioInfo, token=None):
-        """Popula session com dados do usuário, incluindo is_admin."""
+        """Popula session com dados do usuário, incluindo is_admin.
+
+        Matrículas de ADMIN_MATRICULAS viram admin aqui, no primeiro login:
+        a promoção de `migrar()` só alcança quem já existia ao migrar.
+        """
+        if not usuario.is_admin and usuario.matricula in current_app.config.get('ADMIN_MATRICULAS', ()):
+            usuario.is_admin = True
+            db.session.commit()
+        if hasattr(session, 'regenerar'):
+            # Sessão no servidor: id novo a cada login, contra fixação de sessão.
+            session.regenerar()
         session['usuario_logado'] = True
         session['matricula'] = usuario.matricula
         session['is_admin'] = usuario.is_admin
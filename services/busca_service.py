@@ -0,0 +1,108 @@
+import re
+from sqlalchemy import event, text, and_, or_
+from models import db, Produto
+from models.banco import conexao_de_leitura
+from models.tag import _dobrar
+
+# Índice FTS5 com o texto já "dobrado" por _dobrar (mesma normalização dos
+# slugs de tag), de modo que 'cadeira', 'Cadeira' e 'cadéira' coincidem.
+# O rowid da tabela virtual é o id do produto.
+_CRIAR_INDICE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS produto_busca "
+    "USING fts5(nome, descricao, tokenize='unicode61', prefix='2 3')"
+)
+_PESOS = 'bm25(produto_busca, 10.0, 1.0)'  # nome pesa mais que descrição
+LIMITE_MAXIMO = 100
+
+
+def _usa_fts(conn) -> bool:
+    return conn.dialect.name == 'sqlite'
+
+
+def _termos(consulta: str) -> list[str]:
+    return re.findall(r'[a-z0-9]+', _dobrar(consulta or ''))
+
+
+def _indexar(conn, produto_id, nome, descricao):
+    conn.execute(text('DELETE FROM produto_busca WHERE rowid = :id'), {'id': produto_id})
+    conn.execute(
+        text('INSERT INTO produto_busca (rowid, nome, descricao) VALUES (:id, :nome, :descricao)'),
+        {'id': produto_id, 'nome': _dobrar(nome or ''), 'descricao': _dobrar(descricao or '')},
+    )
+
+
+def criar_indice_busca(conn):
+    """Cria o índice FTS5 (apenas SQLite) e o popula a partir de produto.
+
+    Executado pela migração correspondente em models/migracoes.py.
+    """
+    if not _usa_fts(conn):
+        return
+    existe = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'produto_busca'")).first()
+    if existe:
+        return
+    conn.execute(text(_CRIAR_INDICE))
+    indexar_em_lote(conn, conn.execute(text('SELECT id, nome, descricao FROM produto')).all())
+
+
+def indexar_em_lote(conn, linhas):
+    """Indexa (id, nome, descricao) de produtos inseridos sem passar pelo ORM."""
+    if linhas and _usa_fts(conn):
+        conn.execute(
+            text('INSERT INTO produto_busca (rowid, nome, descricao) VALUES (:id, :nome, :descricao)'),
+            [{'id': i, 'nome': _dobrar(n or ''), 'descricao': _dobrar(d or '')} for i, n, d in linhas],
+        )
+
+
+# ── Sincronização: roda na mesma transação do INSERT/UPDATE/DELETE ───────────
+
+@event.listens_for(Produto, 'after_insert')
+def _apos_inserir(mapper, conn, produto):
+    if _usa_fts(conn):
+        _indexar(conn, produto.id, produto.nome, produto.descricao)
+
+
+@event.listens_for(Produto, 'after_update')
+def _apos_atualizar(mapper, conn, produto):
+    estado = db.inspect(produto)
+    if _usa_fts(conn) and (estado.attrs.nome.history.has_changes()
+                           or estado.attrs.descricao.history.has_changes()):
+        _indexar(conn, produto.id, produto.nome, produto.descricao)
+
+
+@event.listens_for(Produto, 'after_delete')
+def _apos_excluir(mapper, conn, produto):
+    if _usa_fts(conn):
+        conn.execute(text('DELETE FROM produto_busca WHERE rowid = :id'), {'id': produto.id})
+
+
+# ── Consulta ─────────────────────────────────────────────────────────────────
+
+def buscar_produtos(consulta: str, limite: int = 50) -> list[Produto]:
+    """Produtos disponíveis que casam com todos os termos, por relevância.
+
+    Cada termo casa também como prefixo ('cad' encontra 'cadeira').
+    """
+    termos = _termos(consulta)
+    if not termos:
+        return []
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+
+    conn = conexao_de_leitura()
+    if not _usa_fts(conn):
+        filtros = [or_(Produto.nome.ilike(f'%{t}%'), Produto.descricao.ilike(f'%{t}%')) for t in termos]
+        return (Produto.query.filter(Produto.status == 'disponivel', and_(*filtros))
+                .order_by(Produto.created_at.desc()).limit(limite).all())
+
+    expressao = ' '.join(f'"{t}"*' for t in termos)
+    ids = [linha[0] for linha in conn.execute(text(
+        'SELECT p.id FROM produto_busca '
+        'JOIN produto p ON p.id = produto_busca.rowid '
+        "WHERE produto_busca MATCH :expressao AND p.status = 'disponivel' "
+        f'ORDER BY {_PESOS} LIMIT :limite'
+    ), {'expressao': expressao, 'limite': limite})]
+    if not ids:
+        return []
+
+    por_id = {p.id: p for p in Produto.query.filter(Produto.id.in_(ids))}
+    return [por_id[i] for i in ids if i in por_id]
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+from flask import render_template, session
+from markupsafe import Markup
+
+
+class CacheFragmentos:
+    """LRU limitado de HTML já renderizado dos cards de produto.
+
+    A chave muda sempre que algo visível no card muda, então não há
+    invalidação explícita: versões antigas apenas saem pelo fim do LRU.
+    """
+
+    def __init__(self, capacidade: int = 2000):
+        self._lock = threading.Lock()
+        self._itens: OrderedDict = OrderedDict()
+        self._capacidade = capacidade
+        self.acertos = 0
+        self.falhas = 0
+
+    def init_app(self, app):
+        self._capacidade = app.config.get('CACHE_FRAGMENTOS_CAPACIDADE', self._capacidade)
+        app.jinja_env.globals['card_produto'] = card_produto
+
+    def obter(self, chave, renderizar) -> Markup:
+        with self._lock:
+            html = self._itens.get(chave)
+            if html is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return html
+            self.falhas += 1
+
+        html = Markup(renderizar())
+        with self._lock:
+            self._itens[chave] = html
+            while len(self._itens) > self._capacidade:
+                self._itens.popitem(last=False)
+        return html
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.acertos = self.falhas = 0
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                'itens': len(self._itens),
+                'capacidade': self._capacidade,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / total, 3) if total else 0.0,
+            }
+
+
+cache_fragmentos = CacheFragmentos()
+
+
+def _chave_card(produto, variante: str) -> tuple:
+    # updated_at tem resolução de segundos; o hash dos campos exibidos cobre
+    # duas edições no mesmo segundo.
+    conteudo = hash((produto.nome, produto.preco, produto.descricao, produto.tipo, produto.status,
+                     produto.endereco, produto.usuario_nome, produto.usuario_matricula,
+                     produto.foto_hash, produto.foto_pronta))
+    return (
+        variante,
+        bool(session.get('is_admin')),
+        produto.id,
+        produto.updated_at,
+        (produto.avaliacoes_total, produto.avaliacoes_soma),
+        tuple((t.id, t.nome, t.cor) for t in produto.tags),
+        conteudo,
+    )
+
+
+def card_produto(produto, variante: str) -> Markup:
+    """Global Jinja: HTML do card de `produto` no layout `cards/<variante>.html`."""
+    return cache_fragmentos.obter(
+        _chave_card(produto, variante),
+        lambda: render_template(f'cards/{variante}.html', produto=produto),
+    )
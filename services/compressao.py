@@ -0,0 +1,111 @@
+"""Compressão gzip das respostas, como middleware WSGI.
+
+Funciona também com respostas em fluxo (sem Content-Length): cada bloco
+que a view entrega sai comprimido com Z_SYNC_FLUSH, então o navegador
+recebe o layout sem esperar o resto da página. Ficam de fora respostas
+pequenas, tipos que não comprimem (imagens), corpos já codificados (os
+.gz/.br de static/dist) e respostas parciais ou vazias.
+"""
+import zlib
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+COMPRIMIVEIS = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'application/javascript',
+    'application/json', 'application/x-ndjson', 'application/xml', 'image/svg+xml',
+}
+
+
+def _aceita_gzip(environ) -> bool:
+    return parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', '')).quality('gzip') > 0
+
+
+class Compressao:
+    def __init__(self):
+        self._minimo = 500
+        self._nivel = 6
+
+    def init_app(self, app):
+        """Envolve app.wsgi_app; chame depois de qualquer outro middleware."""
+        if not app.config.get('COMPRESSAO', True):
+            return
+        self._minimo = app.config.get('COMPRESSAO_MINIMO', self._minimo)
+        self._nivel = app.config.get('COMPRESSAO_NIVEL', self._nivel)
+        wsgi_app = app.wsgi_app
+        app.wsgi_app = lambda environ, start_response: self._responder(wsgi_app, environ, start_response)
+
+    def _comprimivel(self, status: str, cabecalhos: Headers) -> bool:
+        codigo = int(status.split(' ', 1)[0])
+        tamanho = cabecalhos.get('Content-Length', type=int)
+        return (200 <= codigo < 300 and codigo not in (204, 206)
+                and cabecalhos.get('Content-Type', '').split(';')[0].strip() in COMPRIMIVEIS
+                and 'Content-Encoding' not in cabecalhos and 'Content-Range' not in cabecalhos
+                and 'X-Sendfile' not in cabecalhos
+                and 'no-transform' not in cabecalhos.get('Cache-Control', '')
+                and (tamanho is None or tamanho >= self._minimo))
+
+    def _responder(self, wsgi_app, environ, start_response):
+        if environ['REQUEST_METHOD'] == 'HEAD' or not _aceita_gzip(environ):
+            return wsgi_app(environ, start_response)
+        capturado, escritos = {}, []
+
+        def adiar(status, cabecalhos, exc_info=None):
+            capturado.update(status=status, cabecalhos=cabecalhos, exc_info=exc_info)
+            return escritos.append
+
+        corpo = wsgi_app(environ, adiar)
+        return self._gerar(corpo, capturado, escritos, start_response)
+
+    def _gerar(self, corpo, capturado, escritos, start_response):
+        try:
+            pedacos = iter(corpo)
+            cabecalhos = Headers(capturado['cabecalhos'])
+            if not self._comprimivel(capturado['status'], cabecalhos):
+                start_response(capturado['status'], capturado['cabecalhos'], capturado['exc_info'])
+                yield from escritos
+                yield from pedacos
+                return
+
+            # Sem Content-Length, só se sabe se o corpo é pequeno lendo o começo dele.
+            inicio, lido, terminou = list(escritos), sum(map(len, escritos)), False
+            while lido < self._minimo and not terminou:
+                pedaco = next(pedacos, None)
+                if pedaco is None:
+                    terminou = True
+                else:
+                    inicio.append(pedaco)
+                    lido += len(pedaco)
+            if lido < self._minimo:
+                start_response(capturado['status'], capturado['cabecalhos'], capturado['exc_info'])
+                yield from inicio
+                return
+
+            em_fluxo = 'Content-Length' not in cabecalhos
+            del cabecalhos['Content-Length']
+            cabecalhos['Content-Encoding'] = 'gzip'
+            if 'accept-encoding' not in cabecalhos.get('Vary', '').lower():
+                cabecalhos.add('Vary', 'Accept-Encoding')
+            etag = cabecalhos.get('ETag')
+            if etag and not etag.startswith('W/'):
+                cabecalhos['ETag'] = f'W/{etag}'
+            compressor = zlib.compressobj(self._nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+            if not em_fluxo:
+                dados = compressor.compress(b''.join(inicio) + b''.join(pedacos)) + compressor.flush()
+                cabecalhos['Content-Length'] = str(len(dados))
+                start_response(capturado['status'], cabecalhos.to_wsgi_list(), capturado['exc_info'])
+                yield dados
+                return
+
+            start_response(capturado['status'], cabecalhos.to_wsgi_list(), capturado['exc_info'])
+            yield compressor.compress(b''.join(inicio)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            for pedaco in pedacos:
+                if pedaco:
+                    yield compressor.compress(pedaco) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield compressor.flush()
+        finally:
+            if hasattr(corpo, 'close'):
+                corpo.close()
+
+
+compressao = Compressao()
@@ -1,5 +1,11 @@
+import base64
 import hashlib
+import hmac
+import os
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
 
 
 class HashStrategy(ABC):
@@ -9,21 +15,148 @@ class HashStrategy(ABC):
     @abstractmethod
     def verificar(self, senha: str, hash_armazenado: str) -> bool: ...
 
+    def reconhece(self, hash_armazenado: str) -> bool:
+        return False
+
+    def precisa_rehash(self, hash_armazenado: str) -> bool:
+        """True se o hash foi gerado por outra estratégia ou com outro custo."""
+        return True
+
+
+def _b64(dados: bytes) -> str:
+    return base64.b64encode(dados).decode('ascii')
+
 
 class MD5Strategy(HashStrategy):
+    """Legado: mantido apenas para verificar hashes antigos e migrá-los no login."""
+
     def hash(self, senha: str) -> str:
         return hashlib.md5(senha.encode('utf-8')).hexdigest()
 
     def verificar(self, senha: str, hash_armazenado: str) -> bool:
-        return self.hash(senha) == hash_armazenado
+        return hmac.compare_digest(self.hash(senha), hash_armazenado)
+
+    def reconhece(self, hash_armazenado: str) -> bool:
+        return len(hash_armazenado) == 32 and all(c in '0123456789abcdef' for c in hash_armazenado)
+
+
+class ScryptStrategy(HashStrategy):
+    """scrypt com sal aleatório. Formato: scrypt$n$r$p$sal$hash (base64)."""
+
+    PREFIXO = 'scrypt'
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1):
+        self.n, self.r, self.p = n, r, p
+
+    def _derivar(self, senha: str, sal: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(senha.encode('utf-8'), salt=sal, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=32)
+
+    def hash(self, senha: str) -> str:
+        sal = os.urandom(16)
+        derivado = self._derivar(senha, sal, self.n, self.r, self.p)
+        return f'{self.PREFIXO}${self.n}${self.r}${self.p}${_b64(sal)}${_b64(derivado)}'
+
+    def verificar(self, senha: str, hash_armazenado: str) -> bool:
+        try:
+            _, n, r, p, sal, esperado = hash_armazenado.split('$')
+            derivado = self._derivar(senha, base64.b64decode(sal), int(n), int(r), int(p))
+            esperado = base64.b64decode(esperado)
+        except ValueError:  # inclui binascii.Error de um hash corrompido
+            return False
+        return hmac.compare_digest(derivado, esperado)
+
+    def reconhece(self, hash_armazenado: str) -> bool:
+        return hash_armazenado.startswith(self.PREFIXO + '$')
+
+    def precisa_rehash(self, hash_armazenado: str) -> bool:
+        if not self.reconhece(hash_armazenado):
+            return True
+        _, n, r, p, *_ = hash_armazenado.split('$')
+        return (int(n), int(r), int(p)) != (self.n, self.r, self.p)
+
+    def com_custo(self, custo: int) -> 'ScryptStrategy':
+        return ScryptStrategy(n=custo, r=self.r, p=self.p)
+
+
+class PBKDF2Strategy(HashStrategy):
+    """PBKDF2-HMAC-SHA256. Formato: pbkdf2_sha256$iteracoes$sal$hash (base64)."""
+
+    PREFIXO = 'pbkdf2_sha256'
+
+    def __init__(self, iteracoes: int = 600_000):
+        self.iteracoes = iteracoes
+
+    def hash(self, senha: str) -> str:
+        sal = os.urandom(16)
+        derivado = hashlib.pbkdf2_hmac('sha256', senha.encode('utf-8'), sal, self.iteracoes)
+        return f'{self.PREFIXO}${self.iteracoes}${_b64(sal)}${_b64(derivado)}'
+
+    def verificar(self, senha: str, hash_armazenado: str) -> bool:
+        try:
+            _, iteracoes, sal, esperado = hash_armazenado.split('$')
+            derivado = hashlib.pbkdf2_hmac('sha256', senha.encode('utf-8'),
+                                           base64.b64decode(sal), int(iteracoes))
+            esperado = base64.b64decode(esperado)
+        except ValueError:
+            return False
+        return hmac.compare_digest(derivado, esperado)
+
+    def reconhece(self, hash_armazenado: str) -> bool:
+        return hash_armazenado.startswith(self.PREFIXO + '$')
+
+    def precisa_rehash(self, hash_armazenado: str) -> bool:
+        if not self.reconhece(hash_armazenado):
+            return True
+        return int(hash_armazenado.split('$')[1]) != self.iteracoes
+
+    def com_custo(self, custo: int) -> 'PBKDF2Strategy':
+        return PBKDF2Strategy(iteracoes=custo)
 
 
-_strategy: HashStrategy = MD5Strategy()
+def _criar_estrategia() -> HashStrategy:
+    if Config.SENHA_KDF == 'pbkdf2':
+        return PBKDF2Strategy(iteracoes=Config.SENHA_PBKDF2_ITERACOES)
+    return ScryptStrategy(n=Config.SENHA_SCRYPT_N)
+
+
+_strategy: HashStrategy = _criar_estrategia()
+_conhecidas: list[HashStrategy] = [ScryptStrategy(), PBKDF2Strategy(), MD5Strategy()]
+
+# KDFs são CPU-intensivos: limitar quantos rodam ao mesmo tempo impede que uma
+# rajada de logins ocupe todos os núcleos e atrase as demais rotas.
+_executor = ThreadPoolExecutor(max_workers=Config.SENHA_MAX_PARALELO, thread_name_prefix='kdf')
+
+
+def _estrategia_do_hash(hash_armazenado: str) -> HashStrategy | None:
+    for estrategia in _conhecidas:
+        if estrategia.reconhece(hash_armazenado):
+            return estrategia
+    return None
 
 
 def hash_senha(senha: str) -> str:
-    return _strategy.hash(senha)
+    return _executor.submit(_strategy.hash, senha).result()
 
 
 def verificar_senha(senha: str, hash_armazenado: str) -> bool:
-    return _strategy.verificar(senha, hash_armazenado)
+    estrategia = _estrategia_do_hash(hash_armazenado or '')
+    if not estrategia:
+        return False
+    return _executor.submit(estrategia.verificar, senha, hash_armazenado).result()
+
+
+def precisa_rehash(hash_armazenado: str) -> bool:
+    return _strategy.precisa_rehash(hash_armazenado or '')
+
+
+def calibrar(estrategia, custos, orcamento_ms: float):
+    """Maior custo de `custos` (em ordem crescente) cujo hash cabe no orçamento."""
+    escolhido = custos[0]
+    for custo in custos:
+        inicio = time.perf_counter()
+        estrategia.com_custo(custo).hash('calibracao')
+        if (time.perf_counter() - inicio) * 1000 > orcamento_ms:
+            break
+        escolhido = custo
+    return escolhido
@@ -0,0 +1,170 @@
+"""Arquivos estáticos versionados pelo conteúdo.
+
+`python compilar_estaticos.py` copia cada arquivo de static/ para
+static/dist/ com o hash do conteúdo no nome (css/base.css →
+css/base.1a2b3c4d5e.css), grava ao lado as variantes .br/.gz dos formatos
+de texto e por último o manifesto. Com o manifesto presente,
+url_for('static', filename=...) passa a gerar o endereço versionado, que
+é servido com Cache-Control immutable; sem ele, nada muda.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+from flask import abort, request, send_from_directory
+
+PASTA_DIST = 'dist'
+MANIFESTO = 'manifest.json'
+COMPRIMIVEIS = ('.css', '.js', '.svg', '.json', '.txt')
+UM_ANO = 365 * 24 * 3600
+# css/base.1a2b3c4d5e.css: só nomes com o hash do conteúdo podem ser cacheados para sempre.
+_VERSIONADO = re.compile(r'\.[0-9a-f]{10}(\.[^./]*)?$')
+
+
+def _hash(dados: bytes) -> str:
+    return hashlib.sha256(dados).hexdigest()[:10]
+
+
+def _brotli(dados: bytes) -> bytes | None:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(dados, quality=11)
+
+
+def _gzip(dados: bytes) -> bytes:
+    # mtime=0: a mesma entrada gera sempre os mesmos bytes (e o mesmo ETag).
+    return gzip.compress(dados, compresslevel=9, mtime=0)
+
+
+# Ordem de preferência na negociação: (Content-Encoding, sufixo, compressor)
+CODIFICACOES = (('br', '.br', _brotli), ('gzip', '.gz', _gzip))
+
+
+def _gravar(caminho: str, dados: bytes):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho))
+    with os.fdopen(descritor, 'wb') as destino:
+        destino.write(dados)
+    os.replace(temporario, caminho)
+
+
+def compilar(pasta_static: str, limpar: bool = False) -> dict:
+    """Gera static/dist/ e devolve o manifesto {origem: {'arquivo', 'codificacoes'}}.
+
+    Versões anteriores ficam em dist/ (páginas já em cache ainda as pedem),
+    a menos que `limpar` seja True.
+    """
+    dist = os.path.join(pasta_static, PASTA_DIST)
+    manifesto, gerados = {}, {MANIFESTO}
+    for raiz, pastas, arquivos in os.walk(pasta_static):
+        if raiz == pasta_static:
+            pastas[:] = [p for p in pastas if p != PASTA_DIST]
+        for nome in sorted(arquivos):
+            origem = os.path.join(raiz, nome)
+            relativo = os.path.relpath(origem, pasta_static).replace(os.sep, '/')
+            with open(origem, 'rb') as f:
+                dados = f.read()
+            base, extensao = os.path.splitext(relativo)
+            versionado = f'{base}.{_hash(dados)}{extensao}'
+            destino = os.path.join(dist, versionado)
+            if not os.path.exists(destino):
+                _gravar(destino, dados)
+            gerados.add(versionado)
+            codificacoes = []
+            if extensao.lower() in COMPRIMIVEIS:
+                for codificacao, sufixo, comprimir in CODIFICACOES:
+                    if os.path.exists(destino + sufixo):
+                        codificacoes.append(codificacao)
+                        gerados.add(versionado + sufixo)
+                        continue
+                    comprimido = comprimir(dados)
+                    if comprimido is not None and len(comprimido) < len(dados):
+                        _gravar(destino + sufixo, comprimido)
+                        codificacoes.append(codificacao)
+                        gerados.add(versionado + sufixo)
+            manifesto[relativo] = {'arquivo': versionado, 'codificacoes': codificacoes}
+
+    _gravar(os.path.join(dist, MANIFESTO), json.dumps(manifesto, indent=1, sort_keys=True).encode())
+    if limpar:
+        for raiz, _, arquivos in os.walk(dist):
+            for nome in arquivos:
+                caminho = os.path.join(raiz, nome)
+                if os.path.relpath(caminho, dist).replace(os.sep, '/') not in gerados:
+                    os.remove(caminho)
+    return manifesto
+
+
+class EstaticosVersionados:
+    def __init__(self):
+        self._pasta_dist = ''
+        self._urls: dict[str, str] = {}
+        self._codificacoes: dict[str, tuple] = {}
+
+    def init_app(self, app):
+        self._pasta_dist = os.path.join(app.static_folder, PASTA_DIST)
+        self._urls, self._codificacoes = {}, {}
+        if app.config.get('ESTATICOS_VERSIONADOS', True):
+            self._carregar(app)
+        app.url_defaults(self._versionar)
+        # Mais específica que /static/<path:filename>, então tem precedência sobre ela.
+        app.add_url_rule(f'{app.static_url_path}/{PASTA_DIST}/<path:filename>',
+                         endpoint='estaticos_versionados', view_func=self.servir)
+
+    def _carregar(self, app):
+        """Lê o manifesto, descartando entradas cuja origem mudou depois da compilação."""
+        try:
+            with open(os.path.join(self._pasta_dist, MANIFESTO), encoding='utf-8') as f:
+                manifesto = json.load(f)
+        except FileNotFoundError:
+            return
+        desatualizados = []
+        for origem, entrada in manifesto.items():
+            caminho = os.path.join(app.static_folder, origem)
+            try:
+                with open(caminho, 'rb') as f:
+                    atual = _hash(f.read())
+            except FileNotFoundError:
+                atual = None
+            if atual is None or not entrada['arquivo'].endswith(f'.{atual}{os.path.splitext(origem)[1]}'):
+                desatualizados.append(origem)
+                continue
+            self._urls[origem] = f'{PASTA_DIST}/{entrada["arquivo"]}'
+            self._codificacoes[entrada['arquivo']] = tuple(entrada['codificacoes'])
+        if desatualizados:
+            app.logger.warning('static/dist desatualizado para %s; rode `python compilar_estaticos.py`.',
+                               ', '.join(sorted(desatualizados)))
+
+    def _versionar(self, endpoint, valores):
+        if endpoint == 'static' and valores.get('filename') in self._urls:
+            valores['filename'] = self._urls[valores['filename']]
+
+    def servir(self, filename):
+        """Entrega o arquivo versionado, pré-comprimido se o cliente aceitar.
+
+        O resto de dist/ (o manifesto, as variantes .br/.gz pedidas pelo nome) não é servido.
+        """
+        if not _VERSIONADO.search(filename):
+            abort(404)
+        sufixo, codificacao = '', None
+        for candidata, sufixo_candidato, _ in CODIFICACOES:
+            if (candidata in self._codificacoes.get(filename, ())
+                    and request.accept_encodings.quality(candidata) > 0):
+                sufixo, codificacao = sufixo_candidato, candidata
+                break
+        resposta = send_from_directory(
+            self._pasta_dist, filename + sufixo, conditional=True, max_age=UM_ANO,
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+        resposta.vary.add('Accept-Encoding')
+        resposta.cache_control.public = True
+        resposta.cache_control.immutable = True
+        return resposta
+
+
+estaticos = EstaticosVersionados()
@@ -0,0 +1,115 @@
+import threading
+import time
+from sqlalchemy import event, func
+from models import db, Produto, UsuarioInfo
+
+
+class CacheEstatisticas:
+    """Contadores da página inicial mantidos em memória.
+
+    Os valores são carregados do banco no máximo uma vez por TTL e, entre
+    recargas, ajustados por delta a cada commit que cria usuários ou cria,
+    exclui ou muda status/tipo de produtos. Em regime, '/' não faz SQL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valores = None
+        self._expira_em = 0.0
+        self._ttl = 300
+
+    def init_app(self, app):
+        self._ttl = app.config.get('ESTATISTICAS_TTL', 300)
+
+    def obter(self) -> dict:
+        with self._lock:
+            if self._valores is not None and time.monotonic() < self._expira_em:
+                return dict(self._valores)
+        valores = self._carregar()
+        with self._lock:
+            self._valores = valores
+            self._expira_em = time.monotonic() + self._ttl
+            return dict(valores)
+
+    def invalidar(self):
+        with self._lock:
+            self._valores = None
+
+    def aplicar_delta(self, delta: dict):
+        with self._lock:
+            if self._valores is None:
+                return
+            for chave, valor in delta.items():
+                self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    @staticmethod
+    def _carregar() -> dict:
+        total_usuarios = db.session.query(func.count(UsuarioInfo.id)).scalar() or 0
+        total_produtos = db.session.query(func.count(Produto.id)).scalar() or 0
+        contagem = dict(db.session.query(Produto.tipo, func.count(Produto.id)).filter_by(
+            status='disponivel').group_by(Produto.tipo).all())
+        return {
+            'total_usuarios': total_usuarios,
+            'total_produtos': total_produtos,
+            'produtos_venda': contagem.get('venda', 0),
+            'produtos_troca': contagem.get('troca', 0),
+        }
+
+
+estatisticas = CacheEstatisticas()
+
+
+# ── Deltas coletados no flush e aplicados só depois do commit ────────────────
+
+_CHAVE_POR_TIPO = {'venda': 'produtos_venda', 'troca': 'produtos_troca'}
+
+
+def _chave_disponivel(tipo, status):
+    if (status or 'disponivel') != 'disponivel':
+        return None
+    return _CHAVE_POR_TIPO.get(tipo)
+
+
+def _somar(delta, chave, valor):
+    if chave:
+        delta[chave] = delta.get(chave, 0) + valor
+
+
+@event.listens_for(db.session, 'after_flush')
+def _coletar_delta(session, flush_context):
+    delta = session.info.setdefault('delta_estatisticas', {})
+    for obj in session.new:
+        if isinstance(obj, UsuarioInfo):
+            _somar(delta, 'total_usuarios', 1)
+        elif isinstance(obj, Produto):
+            _somar(delta, 'total_produtos', 1)
+            _somar(delta, _chave_disponivel(obj.tipo or 'venda', obj.status), 1)
+    for obj in session.deleted:
+        if isinstance(obj, UsuarioInfo):
+            _somar(delta, 'total_usuarios', -1)
+        elif isinstance(obj, Produto):
+            _somar(delta, 'total_produtos', -1)
+            _somar(delta, _chave_disponivel(obj.tipo, obj.status), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Produto):
+            continue
+        estado = db.inspect(obj)
+        tipo, status = estado.attrs.tipo.history, estado.attrs.status.history
+        if not (tipo.has_changes() or status.has_changes()):
+            continue
+        tipo_antigo = tipo.deleted[0] if tipo.deleted else obj.tipo
+        status_antigo = status.deleted[0] if status.deleted else obj.status
+        _somar(delta, _chave_disponivel(tipo_antigo, status_antigo), -1)
+        _somar(delta, _chave_disponivel(obj.tipo, obj.status), 1)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _aplicar_delta(session):
+    delta = session.info.pop('delta_estatisticas', None)
+    if delta:
+        estatisticas.aplicar_delta(delta)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_delta(session):
+    session.info.pop('delta_estatisticas', None)
@@ -0,0 +1,174 @@
+"""Fila de tarefas durável sobre a tabela `tarefa`.
+
+As rotas enfileiram o trabalho lento (chamadas ao SUAP, recálculos) e
+respondem na hora; um pool de threads em cada processo reserva as tarefas
+vencidas e as executa dentro do contexto do app. Falhas são repetidas com
+backoff exponencial até max_tentativas, e tarefas de um worker que morreu
+voltam à fila depois de TAREFAS_TIMEOUT segundos (contando como uma
+tentativa). Não há heartbeat: um executor que passe desse tempo ganha
+uma segunda execução concorrente, então cada um deve terminar bem antes.
+"""
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from models import db, Tarefa
+
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return None
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+class FilaTarefas:
+    def __init__(self):
+        self._tipos: dict[str, tuple] = {}
+        self._app = None
+        self._threads: list[threading.Thread] = []
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._lock_manutencao = threading.Lock()
+        self._manutencao_em = 0.0
+        self._intervalo = 1.0
+        self._backoff_base = 5
+        self._backoff_max = 600
+        self._timeout = 900
+        self._retencao = 7 * 24 * 3600
+
+    def init_app(self, app, iniciar=True):
+        self._app = app
+        self._intervalo = app.config.get('TAREFAS_INTERVALO', 1.0)
+        self._backoff_base = app.config.get('TAREFAS_BACKOFF_BASE', 5)
+        self._backoff_max = app.config.get('TAREFAS_BACKOFF_MAX', 600)
+        self._timeout = app.config.get('TAREFAS_TIMEOUT', 900)
+        self._retencao = app.config.get('TAREFAS_RETENCAO', 7 * 24 * 3600)
+        if iniciar:
+            self.iniciar(app.config.get('TAREFAS_WORKERS', 2))
+
+    def tarefa(self, tipo: str, max_tentativas: int = 5):
+        """Registra a função como executora das tarefas do `tipo`."""
+        def registrar(funcao):
+            self._tipos[tipo] = (funcao, max_tentativas)
+            return funcao
+        return registrar
+
+    def enfileirar(self, tipo: str, chave: str | None = None, atraso: int = 0, **argumentos) -> int:
+        """Grava a tarefa (com commit) e acorda os workers deste processo.
+
+        Os argumentos precisam ser serializáveis em JSON.
+        """
+        if tipo not in self._tipos:
+            raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+        tarefa_id = Tarefa.enfileirar(tipo, argumentos, chave=chave, atraso=atraso,
+                                      max_tentativas=self._tipos[tipo][1])
+        self._acordar.set()
+        return tarefa_id
+
+    # ── Workers ──────────────────────────────────────────────────────────────
+
+    def iniciar(self, workers: int):
+        self._parar.clear()
+        for i in range(workers - len(self._threads)):
+            thread = threading.Thread(target=self._laco, name=f'tarefas-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def parar(self, espera: float = 10):
+        self._parar.set()
+        self._acordar.set()
+        for thread in self._threads:
+            thread.join(espera)
+        self._threads.clear()
+
+    def _laco(self):
+        while not self._parar.is_set():
+            executou = False
+            try:
+                with self._app.app_context():
+                    self._manutencao()
+                    executou = self.executar_proxima()
+            except Exception:
+                self._app.logger.exception('Erro no laço da fila de tarefas')
+            if not executou:
+                self._acordar.wait(self._intervalo)
+                self._acordar.clear()
+
+    def executar_proxima(self) -> bool:
+        """Reserva e executa uma tarefa. False se não havia nenhuma vencida."""
+        tarefa = Tarefa.reservar()
+        if tarefa is None:
+            return False
+        funcao, _ = self._tipos.get(tarefa.tipo, (None, 0))
+        try:
+            if funcao is None:
+                raise LookupError(f'Tipo de tarefa desconhecido: {tarefa.tipo}')
+            funcao(**json.loads(tarefa.argumentos))
+        except Exception as e:
+            db.session.rollback()
+            self._app.logger.warning('Tarefa %s (%s) falhou na tentativa %d: %s',
+                                     tarefa.id, tarefa.tipo, tarefa.tentativas, e)
+            tarefa.falhar(f'{type(e).__name__}: {e}', self._atraso(tarefa.tentativas))
+        else:
+            tarefa.concluir()
+        return True
+
+    def _atraso(self, tentativas: int) -> float:
+        """Backoff exponencial com jitter: base·2^(n-1), limitado a TAREFAS_BACKOFF_MAX."""
+        atraso = min(self._backoff_max, self._backoff_base * 2 ** (tentativas - 1))
+        return atraso * random.uniform(0.5, 1.0)
+
+    def _manutencao(self):
+        """No máximo uma vez por minuto por processo: recupera abandonadas e expurga concluídas."""
+        with self._lock_manutencao:
+            if time.monotonic() < self._manutencao_em:
+                return
+            self._manutencao_em = time.monotonic() + 60
+        Tarefa.recuperar_abandonadas(self._timeout)
+        Tarefa.expurgar(self._retencao)
+
+    # ── Painel ───────────────────────────────────────────────────────────────
+
+    def painel(self, amostras: int = 500) -> dict:
+        """Profundidade da fila, latências recentes por tipo e últimas falhas."""
+        agora = datetime.utcnow()
+        mais_antiga = db.session.query(db.func.min(Tarefa.executar_em)).filter(
+            Tarefa.estado == 'pendente').scalar()
+        vencidas = db.session.query(db.func.count(Tarefa.id)).filter(
+            Tarefa.estado == 'pendente', Tarefa.executar_em <= agora).scalar()
+
+        concluidas = db.session.query(
+            Tarefa.tipo, Tarefa.criada_em, Tarefa.executar_em, Tarefa.iniciada_em, Tarefa.concluida_em,
+        ).filter(Tarefa.estado == 'concluida').order_by(Tarefa.concluida_em.desc()).limit(amostras)
+        por_tipo: dict[str, dict[str, list]] = {}
+        for tipo, criada_em, executar_em, iniciada_em, concluida_em in concluidas:
+            tempos = por_tipo.setdefault(tipo, {'espera': [], 'execucao': []})
+            # Espera conta a partir do vencimento, para o backoff não inflar a latência da fila.
+            tempos['espera'].append(round((iniciada_em - max(criada_em, executar_em)).total_seconds() * 1000, 1))
+            tempos['execucao'].append(round((concluida_em - iniciada_em).total_seconds() * 1000, 1))
+        latencias = {}
+        for tipo, tempos in sorted(por_tipo.items()):
+            espera, execucao = sorted(tempos['espera']), sorted(tempos['execucao'])
+            latencias[tipo] = {
+                'amostras': len(espera),
+                'espera_p50_ms': _percentil(espera, 50), 'espera_p95_ms': _percentil(espera, 95),
+                'execucao_p50_ms': _percentil(execucao, 50), 'execucao_p95_ms': _percentil(execucao, 95),
+            }
+
+        falhas = Tarefa.query.filter(Tarefa.estado == 'falhou').order_by(
+            Tarefa.concluida_em.desc()).limit(20)
+        return {
+            'profundidade': Tarefa.profundidade(),
+            'vencidas': vencidas,
+            'atraso_da_mais_antiga_s': (max(0.0, (agora - mais_antiga).total_seconds())
+                                        if mais_antiga else None),
+            'latencia': latencias,
+            'falhas_recentes': [{'id': t.id, 'tipo': t.tipo, 'tentativas': t.tentativas, 'erro': t.erro,
+                                 'concluida_em': t.concluida_em.isoformat()} for t in falhas],
+            'workers_neste_processo': sum(t.is_alive() for t in self._threads),
+            'tipos': sorted(self._tipos),
+        }
+
+
+fila = FilaTarefas()
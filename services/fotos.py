@@ -0,0 +1,249 @@
+"""Fotos de produto em armazenamento endereçado por conteúdo.
+
+O original fica em <FOTOS_PASTA>/originais/ab/<sha256>: uploads idênticos
+viram o mesmo arquivo. As miniaturas de TAMANHOS são geradas fora da
+requisição — uma tarefa da fila as encomenda a um pool de processos — e só
+então o produto passa a exibi-las. Originais nunca são servidos.
+
+Como o arquivo é compartilhado, apagar a foto órfã concorre com um upload
+idêntico ainda sem commit. O upload guarda sua cópia até depois do commit
+(`confirmar`) e a restaura se o original sumiu; o descarte tira o original
+do lugar antes de consultar o banco e consulta de novo depois de apagar as
+miniaturas, devolvendo-o se alguém passou a usá-lo nesse meio-tempo.
+"""
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app, g
+from sqlalchemy import select, update
+from models import db, Produto, VersaoConjunto
+from models.banco import motor_de_leitura
+from services.fila_tarefas import fila
+
+# nome → (largura, altura, recortar para preencher)
+TAMANHOS = {
+    'mapa':   (160, 120, True),
+    'card':   (480, 360, True),
+    'grande': (1280, 1280, False),
+}
+
+_HASH = re.compile(r'^[0-9a-f]{64}$')
+_BLOCO = 64 * 1024
+
+
+class FotoInvalida(ValueError):
+    pass
+
+
+def _formato_suportado(cabecalho: bytes) -> bool:
+    return (cabecalho.startswith(b'\xff\xd8\xff') or cabecalho.startswith(b'\x89PNG\r\n\x1a\n')
+            or cabecalho[:6] in (b'GIF87a', b'GIF89a')
+            or (cabecalho[:4] == b'RIFF' and cabecalho[8:12] == b'WEBP'))
+
+
+class ArmazemFotos:
+    def __init__(self):
+        self.pasta = ''
+        self._tamanho_max = 8 * 1024 * 1024
+        self._processos = 2
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.pasta = app.config.get('FOTOS_PASTA') or os.path.join(app.instance_path, 'fotos')
+        self._tamanho_max = app.config.get('FOTOS_TAMANHO_MAX', self._tamanho_max)
+        self._processos = app.config.get('FOTOS_PROCESSOS', self._processos)
+        app.teardown_request(self._limpar_pendentes)
+
+    def caminho_original(self, foto_hash: str) -> str:
+        return os.path.join(self.pasta, 'originais', foto_hash[:2], foto_hash)
+
+    def caminho_miniatura(self, foto_hash: str, tamanho: str) -> str:
+        return os.path.join(self.pasta, tamanho, foto_hash[:2], f'{foto_hash}.jpg')
+
+    def miniatura_existente(self, foto_hash: str, tamanho: str) -> str | None:
+        """Caminho da miniatura para servir, ou None (hash/tamanho inválido ou ainda não gerada)."""
+        if tamanho not in TAMANHOS or not _HASH.match(foto_hash):
+            return None
+        caminho = self.caminho_miniatura(foto_hash, tamanho)
+        return caminho if os.path.isfile(caminho) else None
+
+    def miniaturas_prontas(self, foto_hash: str) -> bool:
+        return all(os.path.isfile(self.caminho_miniatura(foto_hash, t)) for t in TAMANHOS)
+
+    # ── Upload ───────────────────────────────────────────────────────────────
+
+    def guardar(self, stream) -> str:
+        """Grava o upload (lido em blocos, sem carregá-lo inteiro) e devolve o SHA-256.
+
+        Se o original já existia, a cópia recebida fica guardada até
+        `confirmar`, depois do commit. Lança FotoInvalida para formatos não
+        suportados ou arquivos grandes demais.
+        """
+        temporarios = os.path.join(self.pasta, 'tmp')
+        os.makedirs(temporarios, exist_ok=True)
+        digest, total = hashlib.sha256(), 0
+        descritor, temporario = tempfile.mkstemp(dir=temporarios)
+        try:
+            with os.fdopen(descritor, 'wb') as destino:
+                while bloco := stream.read(_BLOCO):
+                    if total == 0 and not _formato_suportado(bloco[:12]):
+                        raise FotoInvalida('Formato de imagem não suportado. Use JPEG, PNG, WebP ou GIF.')
+                    total += len(bloco)
+                    if total > self._tamanho_max:
+                        raise FotoInvalida(f'A foto deve ter no máximo {self._tamanho_max // (1024 * 1024)} MB.')
+                    digest.update(bloco)
+                    destino.write(bloco)
+            if total == 0:
+                raise FotoInvalida('Arquivo de foto vazio.')
+            foto_hash = digest.hexdigest()
+            caminho = self.caminho_original(foto_hash)
+            if os.path.exists(caminho):
+                anterior = g.setdefault('fotos_pendentes', {}).pop(foto_hash, None)
+                if anterior:
+                    os.remove(anterior)
+                g.fotos_pendentes[foto_hash] = temporario
+            else:
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                os.replace(temporario, caminho)
+            return foto_hash
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+    def confirmar(self, produto):
+        """Depois do commit do produto: garante o original e as miniaturas que ele espera."""
+        foto_hash = produto.foto_hash
+        pendente = g.get('fotos_pendentes', {}).pop(foto_hash, None)
+        if not foto_hash:
+            return
+        caminho = self.caminho_original(foto_hash)
+        if pendente:
+            if os.path.exists(caminho):
+                os.remove(pendente)
+            else:
+                # Um descarte concorrente levou o original antes de ver este produto.
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                os.replace(pendente, caminho)
+        if produto.foto_pronta and not self.miniaturas_prontas(foto_hash):
+            produto.foto_pronta = False
+            db.session.commit()
+        if not produto.foto_pronta:
+            processar_em_segundo_plano(foto_hash)
+
+    def _limpar_pendentes(self, exc=None):
+        for temporario in g.pop('fotos_pendentes', {}).values():
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    @staticmethod
+    def _em_uso(foto_hash: str) -> bool:
+        # Conexão própria: a consulta precisa ver commits feitos depois do início da requisição.
+        with motor_de_leitura().connect() as conn:
+            return conn.execute(select(Produto.id).where(Produto.foto_hash == foto_hash).limit(1)).first() is not None
+
+    def descartar_se_orfa(self, foto_hash: str | None):
+        """Apaga original e miniaturas se nenhum produto usa mais a foto."""
+        if not foto_hash:
+            return
+        original = self.caminho_original(foto_hash)
+        lixeira = os.path.join(self.pasta, 'tmp', f'{foto_hash}.{uuid.uuid4().hex}.descarte')
+        os.makedirs(os.path.dirname(lixeira), exist_ok=True)
+        try:
+            os.replace(original, lixeira)
+        except FileNotFoundError:
+            lixeira = None
+        if self._em_uso(foto_hash):
+            if lixeira:
+                os.replace(lixeira, original)
+            return
+        for tamanho in TAMANHOS:
+            caminho = self.caminho_miniatura(foto_hash, tamanho)
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        if self._em_uso(foto_hash):
+            # Um upload idêntico foi confirmado enquanto as miniaturas eram apagadas.
+            if lixeira:
+                os.replace(lixeira, original)
+            _atualizar_produtos_da_foto(foto_hash, {'foto_pronta': False})
+            processar_em_segundo_plano(foto_hash)
+        elif lixeira:
+            os.remove(lixeira)
+
+    def em_descarte(self, foto_hash: str) -> bool:
+        pasta = os.path.join(self.pasta, 'tmp')
+        return os.path.isdir(pasta) and any(
+            nome.startswith(f'{foto_hash}.') and nome.endswith('.descarte') for nome in os.listdir(pasta))
+
+    # ── Miniaturas ───────────────────────────────────────────────────────────
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # 'spawn': os workers da fila são threads, e fork com threads vivas não é seguro.
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self._processos,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def gerar_miniaturas(self, foto_hash: str, timeout: float = 120):
+        from services import miniaturas
+        destinos = {self.caminho_miniatura(foto_hash, t): dimensoes for t, dimensoes in TAMANHOS.items()}
+        pool = self._executor()
+        try:
+            pool.submit(miniaturas.gerar, self.caminho_original(foto_hash), destinos).result(timeout)
+        except BrokenProcessPool:
+            # Um filho morreu (ex.: imagem que estoura a memória): o próximo uso recria o pool.
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False)
+            raise
+
+
+fotos = ArmazemFotos()
+
+
+def _atualizar_produtos_da_foto(foto_hash: str, valores: dict) -> int:
+    """UPDATE (com commit) dos produtos que usam a foto.
+
+    Fora do ORM o listener de services/versoes não vê a escrita, então as
+    versões 'produtos' e 'usuario:<matrícula>' são incrementadas aqui. Os
+    cards em cache não precisam de limpeza: a chave deles inclui foto_hash
+    e foto_pronta.
+    """
+    conn = db.session.connection()
+    filtro = Produto.foto_hash == foto_hash
+    matriculas = set(conn.execute(select(Produto.usuario_matricula).where(filtro)).scalars())
+    total = conn.execute(update(Produto).where(filtro).values(valores)).rowcount
+    if total:
+        VersaoConjunto.incrementar(conn, ['produtos', *sorted(f'usuario:{m}' for m in matriculas)])
+    db.session.commit()
+    return total
+
+
+@fila.tarefa('fotos.gerar_miniaturas', max_tentativas=3)
+def gerar_miniaturas(foto_hash):
+    """Gera as miniaturas (se preciso) e libera a foto nos produtos que a usam."""
+    if not fotos.miniaturas_prontas(foto_hash) and not os.path.exists(fotos.caminho_original(foto_hash)):
+        if fotos.em_descarte(foto_hash):
+            raise FileNotFoundError(f'Original {foto_hash} em descarte; tentando de novo.')
+        # Original perdido: tira a foto dos produtos em vez de esgotar as tentativas.
+        sem_foto = _atualizar_produtos_da_foto(foto_hash, {'foto_hash': None, 'foto_pronta': False})
+        current_app.logger.warning('Original da foto %s não existe; removida de %d produto(s).', foto_hash, sem_foto)
+        return
+    if not fotos.miniaturas_prontas(foto_hash):
+        fotos.gerar_miniaturas(foto_hash)
+    for produto in Produto.query.filter_by(foto_hash=foto_hash, foto_pronta=False):
+        produto.foto_pronta = True
+    db.session.commit()
+
+
+def processar_em_segundo_plano(foto_hash: str) -> int:
+    return fila.enfileirar('fotos.gerar_miniaturas', chave=f'fotos:{foto_hash}', foto_hash=foto_hash)
@@ -0,0 +1,107 @@
+import math
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISAO_GEOHASH = 9
+RAIO_TERRA_KM = 6371.0088
+
+# Precisão do geohash usada para agrupar pontos em cada nível de zoom do mapa
+# (células de ~5000 km no zoom 0 até ~5 m no zoom 18+).
+_PRECISAO_POR_ZOOM = [1, 1, 1, 2, 2, 3, 3, 3, 4, 4, 5, 5, 5, 6, 6, 7, 7, 7, 8]
+
+
+def codificar_geohash(lat: float, lon: float, precisao: int = PRECISAO_GEOHASH) -> str:
+    lat_int, lon_int = [-90.0, 90.0], [-180.0, 180.0]
+    resultado, bits, valor, par = [], 0, 0, True
+    while len(resultado) < precisao:
+        intervalo, coord = (lon_int, lon) if par else (lat_int, lat)
+        meio = (intervalo[0] + intervalo[1]) / 2
+        valor <<= 1
+        if coord >= meio:
+            valor |= 1
+            intervalo[0] = meio
+        else:
+            intervalo[1] = meio
+        par = not par
+        bits += 1
+        if bits == 5:
+            resultado.append(_BASE32[valor])
+            bits, valor = 0, 0
+    return ''.join(resultado)
+
+
+def tamanho_celula(precisao: int) -> tuple[float, float]:
+    """(altura, largura) em graus de uma célula geohash com a precisão dada."""
+    bits = 5 * precisao
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def precisao_para_zoom(zoom: int) -> int:
+    return _PRECISAO_POR_ZOOM[max(0, min(zoom, len(_PRECISAO_POR_ZOOM) - 1))]
+
+
+def celulas_cobrindo(bbox, precisao: int, limite: int = 32) -> list[str]:
+    """Prefixos geohash que cobrem o bbox (min_lon, min_lat, max_lon, max_lat).
+
+    Se a cobertura exigir mais que `limite` células a precisão é reduzida,
+    mantendo a quantidade de faixas consultadas no índice pequena.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    while precisao > 1:
+        altura, largura = tamanho_celula(precisao)
+        linhas = math.floor(max_lat / altura) - math.floor(min_lat / altura) + 1
+        colunas = math.floor(max_lon / largura) - math.floor(min_lon / largura) + 1
+        if linhas * colunas <= limite:
+            break
+        precisao -= 1
+
+    altura, largura = tamanho_celula(precisao)
+    celulas = set()
+    lat = math.floor(min_lat / altura) * altura
+    while lat <= max_lat:
+        lon = math.floor(min_lon / largura) * largura
+        while lon <= max_lon:
+            centro_lat = min(max(lat + altura / 2, -90.0), 90.0)
+            centro_lon = min(max(lon + largura / 2, -180.0), 180.0)
+            celulas.add(codificar_geohash(centro_lat, centro_lon, precisao))
+            lon += largura
+        lat += altura
+    return sorted(celulas)
+
+
+def parse_bbox(valor: str):
+    """'min_lon,min_lat,max_lon,max_lat' → tupla de floats, ou None se inválido."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in valor.split(','))
+    except (ValueError, AttributeError):
+        return None
+    if min_lon > max_lon or min_lat > max_lat:
+        return None
+    return (max(min_lon, -180.0), max(min_lat, -90.0), min(max_lon, 180.0), min(max_lat, 90.0))
+
+
+def distancia_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distância de grande círculo (haversine) entre dois pontos, em km."""
+    fi1, fi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((fi2 - fi1) / 2) ** 2
+         + math.cos(fi1) * math.cos(fi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bboxes_do_raio(lat: float, lon: float, raio_km: float) -> list[tuple]:
+    """Bboxes (min_lon, min_lat, max_lon, max_lat) que contêm o círculo dado.
+
+    Perto dos polos a faixa de longitude vira a volta inteira; se o círculo
+    cruza o antimeridiano, devolve dois bboxes, um de cada lado.
+    """
+    delta_lat = math.degrees(raio_km / RAIO_TERRA_KM)
+    min_lat, max_lat = max(lat - delta_lat, -90.0), min(lat + delta_lat, 90.0)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    delta_lon = math.degrees(raio_km / (RAIO_TERRA_KM * cos_lat)) if cos_lat > 1e-9 else 180.0
+    if delta_lon >= 180.0:
+        return [(-180.0, min_lat, 180.0, max_lat)]
+    min_lon, max_lon = lon - delta_lon, lon + delta_lon
+    if min_lon < -180.0:
+        return [(min_lon + 360.0, min_lat, 180.0, max_lat), (-180.0, min_lat, max_lon, max_lat)]
+    if max_lon > 180.0:
+        return [(min_lon, min_lat, 180.0, max_lat), (-180.0, min_lat, max_lon - 360.0, max_lat)]
+    return [(min_lon, min_lat, max_lon, max_lat)]
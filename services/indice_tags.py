@@ -0,0 +1,90 @@
+import threading
+import time
+from models import db, Produto, produto_tags
+
+
+class IndiceTags:
+    """Índice invertido em memória: tag_id → conjunto de ids de produtos.
+
+    Serve as contagens de facetas de /home sem um GROUP BY por requisição.
+    As rotas que alteram tags ou produtos atualizam o índice após o commit;
+    como cada worker tem sua própria cópia, o índice também é reconstruído
+    quando fica mais velho que INDICE_TAGS_TTL, limitando a defasagem entre
+    processos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_tag: dict[int, set[int]] = {}
+        self._disponiveis: set[int] = set()
+        self._carregado_em = 0.0
+        self._ttl = 60
+
+    def init_app(self, app):
+        self._ttl = app.config.get('INDICE_TAGS_TTL', 60)
+        with app.app_context():
+            self.carregar()
+
+    def carregar(self):
+        por_tag: dict[int, set[int]] = {}
+        for tag_id, produto_id in db.session.query(produto_tags.c.tag_id, produto_tags.c.produto_id):
+            por_tag.setdefault(tag_id, set()).add(produto_id)
+        disponiveis = {pid for (pid,) in db.session.query(Produto.id).filter(Produto.status == 'disponivel')}
+        with self._lock:
+            self._por_tag, self._disponiveis = por_tag, disponiveis
+            self._carregado_em = time.monotonic()
+
+    def _garantir_atualizado(self):
+        if time.monotonic() - self._carregado_em > self._ttl:
+            self.carregar()
+
+    # ── Atualizações incrementais ────────────────────────────────────────────
+
+    def aplicar(self, tag_id: int, produto_id: int):
+        with self._lock:
+            self._por_tag.setdefault(tag_id, set()).add(produto_id)
+
+    def remover(self, tag_id: int, produto_id: int):
+        with self._lock:
+            self._por_tag.get(tag_id, set()).discard(produto_id)
+
+    def excluir_tag(self, tag_id: int):
+        with self._lock:
+            self._por_tag.pop(tag_id, None)
+
+    def registrar_produto(self, produto_id: int, disponivel: bool = True):
+        with self._lock:
+            if disponivel:
+                self._disponiveis.add(produto_id)
+            else:
+                self._disponiveis.discard(produto_id)
+
+    def excluir_produto(self, produto_id: int):
+        with self._lock:
+            self._disponiveis.discard(produto_id)
+            for produtos in self._por_tag.values():
+                produtos.discard(produto_id)
+
+    # ── Consultas ────────────────────────────────────────────────────────────
+
+    def filtrar(self, tag_ids, modo: str = 'e') -> set[int]:
+        """Ids de produtos disponíveis com todas (modo 'e') ou alguma (modo 'ou') das tags."""
+        self._garantir_atualizado()
+        with self._lock:
+            if not tag_ids:
+                return set(self._disponiveis)
+            conjuntos = sorted((self._por_tag.get(t, set()) for t in tag_ids), key=len)
+            if modo == 'ou':
+                resultado = set().union(*conjuntos)
+            else:
+                resultado = conjuntos[0].intersection(*conjuntos[1:])
+            return resultado & self._disponiveis
+
+    def facetas(self, candidatos: set[int]) -> dict[int, int]:
+        """Quantos dos `candidatos` têm cada tag."""
+        self._garantir_atualizado()
+        with self._lock:
+            return {tag_id: len(produtos & candidatos) for tag_id, produtos in self._por_tag.items()}
+
+
+indice_tags = IndiceTags()
@@ -0,0 +1,142 @@
+import re
+import threading
+import time
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+_LISTA_DE_PARAMETROS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_NUMERO = re.compile(r'\b\d+\b')
+_ESPACOS = re.compile(r'\s+')
+_MAX_FORMAS_POR_ENDPOINT = 50
+
+
+def forma_do_sql(sql: str) -> str:
+    """Normaliza o SQL para agrupar comandos que só diferem nos valores.
+
+    'IN (?, ?, ?)' vira 'IN (?)' e literais numéricos viram '?', de modo que
+    o mesmo SELECT repetido por linha (N+1) conte como uma forma só.
+    """
+    sql = _LISTA_DE_PARAMETROS.sub('(?)', sql)
+    sql = _NUMERO.sub('?', sql)
+    return _ESPACOS.sub(' ', sql).strip()
+
+
+class InstrumentacaoSql:
+    """Contagem e tempo de SQL por requisição, agregados por endpoint.
+
+    Opcional (INSTRUMENTAR_SQL): quando ligado, cada resposta leva um
+    cabeçalho Server-Timing com o tempo de banco e o número de consultas,
+    e um SELECT repetido SQL_LIMITE_N_MAIS_1 vezes ou mais na mesma
+    requisição é marcado como suspeita de N+1. O relatório acumulado fica
+    em /admin/sql.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_endpoint: dict[str, dict] = {}
+        self._limite_n_mais_1 = 5
+        self.ativo = False
+
+    def init_app(self, app):
+        if not app.config.get('INSTRUMENTAR_SQL'):
+            return
+        self.ativo = True
+        self._limite_n_mais_1 = app.config.get('SQL_LIMITE_N_MAIS_1', 5)
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._antes_de_executar)
+            event.listen(engine, 'after_cursor_execute', self._depois_de_executar)
+        app.before_request(self._iniciar_requisicao)
+        app.after_request(self._finalizar_requisicao)
+
+    # ── Eventos do engine ────────────────────────────────────────────────────
+
+    @staticmethod
+    def _antes_de_executar(conn, cursor, sql, parametros, contexto, executemany):
+        contexto._inicio_sql = time.perf_counter()
+
+    @staticmethod
+    def _depois_de_executar(conn, cursor, sql, parametros, contexto, executemany):
+        if not has_request_context() or '_sql' not in g:
+            return
+        g._sql['consultas'] += 1
+        g._sql['tempo'] += time.perf_counter() - contexto._inicio_sql
+        g._sql['formas'][forma_do_sql(sql)] += 1
+
+    # ── Ciclo da requisição ──────────────────────────────────────────────────
+
+    @staticmethod
+    def _iniciar_requisicao():
+        g._sql = {'consultas': 0, 'tempo': 0.0, 'formas': Counter(), 'inicio': time.perf_counter()}
+
+    def _finalizar_requisicao(self, resposta):
+        dados = g.pop('_sql', None)
+        if dados is None:
+            return resposta
+        total_ms = (time.perf_counter() - dados['inicio']) * 1000
+        db_ms = dados['tempo'] * 1000
+        suspeitas = {forma: n for forma, n in dados['formas'].items()
+                     if n >= self._limite_n_mais_1 and forma.upper().startswith('SELECT')}
+
+        metricas = [
+            f'db;dur={db_ms:.1f};desc="{dados["consultas"]} consulta(s)"',
+            f'app;dur={total_ms:.1f}',
+        ]
+        if suspeitas:
+            metricas.append(f'nmais1;desc="{len(suspeitas)} forma(s) repetida(s)"')
+            for forma, n in suspeitas.items():
+                current_app.logger.warning('Possível N+1 em %s (%dx): %s', request.endpoint, n, forma)
+        resposta.headers.add('Server-Timing', ', '.join(metricas))
+
+        self._acumular(request.endpoint or '<sem endpoint>', dados, db_ms, suspeitas)
+        return resposta
+
+    def _acumular(self, endpoint, dados, db_ms, suspeitas):
+        with self._lock:
+            item = self._por_endpoint.setdefault(endpoint, {
+                'requisicoes': 0, 'consultas': 0, 'max_consultas': 0, 'tempo_db_ms': 0.0,
+                'formas': Counter(), 'n_mais_1': {},
+            })
+            item['requisicoes'] += 1
+            item['consultas'] += dados['consultas']
+            item['max_consultas'] = max(item['max_consultas'], dados['consultas'])
+            item['tempo_db_ms'] += db_ms
+            for forma, n in dados['formas'].items():
+                if forma in item['formas'] or len(item['formas']) < _MAX_FORMAS_POR_ENDPOINT:
+                    item['formas'][forma] += n
+            for forma, n in suspeitas.items():
+                anterior = item['n_mais_1'].get(forma, {'requisicoes': 0, 'max_repeticoes': 0})
+                item['n_mais_1'][forma] = {
+                    'requisicoes': anterior['requisicoes'] + 1,
+                    'max_repeticoes': max(anterior['max_repeticoes'], n),
+                }
+
+    # ── Relatório ────────────────────────────────────────────────────────────
+
+    def relatorio(self, formas_por_endpoint: int = 10) -> dict:
+        with self._lock:
+            endpoints = {}
+            for endpoint, item in sorted(self._por_endpoint.items()):
+                requisicoes = item['requisicoes']
+                endpoints[endpoint] = {
+                    'requisicoes': requisicoes,
+                    'consultas_por_requisicao': round(item['consultas'] / requisicoes, 2),
+                    'max_consultas': item['max_consultas'],
+                    'tempo_db_ms_medio': round(item['tempo_db_ms'] / requisicoes, 2),
+                    'formas_mais_repetidas': [
+                        {'sql': forma, 'execucoes': n}
+                        for forma, n in item['formas'].most_common(formas_por_endpoint)
+                    ],
+                    'n_mais_1': [dict(sql=forma, **dados) for forma, dados in item['n_mais_1'].items()],
+                }
+            return {'ativo': self.ativo, 'limite_n_mais_1': self._limite_n_mais_1, 'endpoints': endpoints}
+
+    def limpar(self):
+        with self._lock:
+            self._por_endpoint.clear()
+
+
+instrumentacao_sql = InstrumentacaoSql()
@@ -0,0 +1,223 @@
+"""Importação e exportação de produtos em lote (CSV ou NDJSON), em streaming.
+
+A entrada é lida linha a linha do corpo da requisição e inserida em blocos
+de LOTE linhas com executemany; a saída percorre a tabela com cursores
+incrementais (yield_per), sem carregar o catálogo em memória.
+"""
+import csv
+import io
+import json
+import re
+from sqlalchemy import select
+from models import db, Produto, Tag, UsuarioInfo, VersaoConjunto, produto_tags
+from services.busca_service import indexar_em_lote
+from services.estatisticas import estatisticas
+from services.geo import codificar_geohash
+from services.indice_tags import indice_tags
+from services.registro_tags import registro_tags
+
+LOTE = 500
+MAX_ERROS_LISTADOS = 1000
+COLUNAS = ['id', 'nome', 'tipo', 'status', 'preco', 'descricao', 'endereco', 'latitude', 'longitude',
+           'usuario_matricula', 'usuario_nome', 'tags', 'created_at']
+
+
+# ── Leitura ──────────────────────────────────────────────────────────────────
+
+class ArquivoInvalido(ValueError):
+    pass
+
+
+ERRO_UTF8 = 'Linha não está em UTF-8.'
+
+
+def _linhas_utf8(stream):
+    """(número, texto, é UTF-8) para cada linha física.
+
+    Decodificar linha a linha (e não com um TextIOWrapper sobre o arquivo
+    todo) deixa um byte inválido virar erro daquela linha, em vez de
+    derrubar a importação no meio, com parte dos blocos já gravada. A linha
+    inválida vem decodificada com substituição, preservando aspas e
+    separadores para o CSV continuar alinhado.
+    """
+    for numero, bruto in enumerate(stream, start=1):
+        try:
+            texto, valida = bruto.decode('utf-8'), True
+        except UnicodeDecodeError:
+            texto, valida = bruto.decode('utf-8', errors='replace'), False
+        yield numero, texto.removeprefix('\ufeff') if numero == 1 else texto, valida
+
+
+def ler_csv(stream):
+    """(número da linha, dados, erro) para cada registro do CSV; a linha 1 é o cabeçalho.
+
+    Lança ArquivoInvalido se o cabeçalho não for UTF-8 (ex.: CSV exportado
+    pelo Excel em Latin-1), antes de qualquer linha ser importada.
+    """
+    invalidas = set()
+
+    def textos():
+        for numero, texto, valida in _linhas_utf8(stream):
+            if not valida:
+                if numero == 1:
+                    raise ArquivoInvalido('O arquivo deve estar em UTF-8 (no Excel, salve como "CSV UTF-8").')
+                invalidas.add(numero)
+            yield texto
+
+    leitor = csv.DictReader(textos())
+    inicio = 2
+    for linha in leitor:
+        # Um registro pode ocupar várias linhas físicas (campo entre aspas com quebra de linha).
+        fim = leitor.reader.line_num
+        if invalidas.intersection(range(inicio, fim + 1)):
+            yield inicio, None, ERRO_UTF8
+        else:
+            yield inicio, linha, None
+        inicio = fim + 1
+
+
+def ler_ndjson(stream):
+    """(número da linha, dados, erro) para cada objeto JSON; linhas em branco são ignoradas."""
+    for numero, bruto, valida in _linhas_utf8(stream):
+        if not valida:
+            yield numero, None, ERRO_UTF8
+            continue
+        if not bruto.strip():
+            continue
+        try:
+            dados = json.loads(bruto)
+        except ValueError:
+            yield numero, None, 'JSON inválido.'
+            continue
+        if not isinstance(dados, dict):
+            yield numero, None, 'Cada linha deve ser um objeto JSON.'
+            continue
+        yield numero, dados, None
+
+
+def _slugs(valor) -> list[str]:
+    if isinstance(valor, list):
+        return [str(s).strip() for s in valor if str(s).strip()]
+    return [s for s in re.split(r'[,;]\s*', str(valor or '').strip()) if s]
+
+
+# ── Importação ───────────────────────────────────────────────────────────────
+
+def importar_produtos(linhas, validar, dono_padrao: str) -> dict:
+    """Valida e insere as `linhas` em blocos. Uma linha inválida não impede as demais.
+
+    `validar(dados)` devolve (campos, erro). Produtos sem usuario_matricula
+    ficam com `dono_padrao`. Tags são referenciadas pelo slug (ou nome).
+    """
+    relatorio = {'importados': 0, 'total_erros': 0, 'erros': []}
+    lote = []
+
+    for numero, dados, erro in linhas:
+        if not erro:
+            campos, erro = validar(dados)
+        if not erro:
+            slugs = _slugs(dados.get('tags'))
+            tags = [registro_tags.por_slug(s) for s in slugs]
+            desconhecidas = [s for s, tag in zip(slugs, tags) if tag is None]
+            if desconhecidas:
+                erro = f"Tag(s) desconhecida(s): {', '.join(desconhecidas)}."
+        if erro:
+            relatorio['total_erros'] += 1
+            if len(relatorio['erros']) < MAX_ERROS_LISTADOS:
+                relatorio['erros'].append({'linha': numero, 'erro': erro})
+            continue
+
+        campos['usuario_matricula'] = campos['usuario_matricula'] or dono_padrao
+        lote.append((campos, {tag.id for tag in tags}))
+        if len(lote) >= LOTE:
+            relatorio['importados'] += _inserir(lote)
+            lote.clear()
+
+    if lote:
+        relatorio['importados'] += _inserir(lote)
+    if relatorio['importados']:
+        estatisticas.invalidar()
+    return relatorio
+
+
+def _inserir(lote) -> int:
+    """Insere um bloco numa transação: produtos, produto_tags, índice de busca e versões."""
+    matriculas = {campos['usuario_matricula'] for campos, _ in lote}
+    nomes = dict(db.session.query(UsuarioInfo.matricula, UsuarioInfo.nome)
+                 .filter(UsuarioInfo.matricula.in_(matriculas)))
+    linhas = []
+    for campos, _ in lote:
+        geohash = None
+        if campos['latitude'] is not None and campos['longitude'] is not None:
+            geohash = codificar_geohash(campos['latitude'], campos['longitude'])
+        linhas.append(dict(campos, geohash=geohash,
+                           usuario_nome=campos['usuario_nome'] or nomes.get(campos['usuario_matricula'])))
+
+    conn = db.session.connection()
+    ids = conn.execute(
+        Produto.__table__.insert().returning(Produto.id, sort_by_parameter_order=True), linhas,
+    ).scalars().all()
+    aplicacoes = [{'produto_id': produto_id, 'tag_id': tag_id}
+                  for produto_id, (_, tag_ids) in zip(ids, lote) for tag_id in tag_ids]
+    if aplicacoes:
+        conn.execute(produto_tags.insert(), aplicacoes)
+    indexar_em_lote(conn, [(produto_id, l['nome'], l['descricao']) for produto_id, l in zip(ids, linhas)])
+    VersaoConjunto.incrementar(conn, ['produtos', *sorted(f'usuario:{m}' for m in matriculas)])
+    db.session.commit()
+
+    for produto_id, (campos, tag_ids) in zip(ids, lote):
+        indice_tags.registrar_produto(produto_id, disponivel=campos['status'] == 'disponivel')
+        for tag_id in tag_ids:
+            indice_tags.aplicar(tag_id, produto_id)
+    return len(ids)
+
+
+# ── Exportação ───────────────────────────────────────────────────────────────
+
+def _produtos_com_tags(lote: int = 1000):
+    """Dicionários na ordem de COLUNAS, por id, com as tags em 'slug1,slug2'.
+
+    Dois cursores incrementais ordenados por produto_id — produtos e
+    produto_tags — percorridos juntos como num merge join.
+    """
+    colunas = [getattr(Produto, c) for c in COLUNAS if c != 'tags']
+    produtos = db.session.execute(select(*colunas).order_by(Produto.id).execution_options(yield_per=lote))
+    tags = iter(db.session.execute(
+        select(produto_tags.c.produto_id, Tag.slug).join(Tag, Tag.id == produto_tags.c.tag_id)
+        .order_by(produto_tags.c.produto_id).execution_options(yield_per=lote)
+    ))
+    pendente = next(tags, None)
+    for linha in produtos:
+        slugs = []
+        while pendente is not None and pendente.produto_id <= linha.id:
+            if pendente.produto_id == linha.id:
+                slugs.append(pendente.slug)
+            pendente = next(tags, None)
+        dados = linha._asdict()
+        dados['tags'] = ','.join(sorted(slugs))
+        dados['created_at'] = dados['created_at'].isoformat() if dados['created_at'] else None
+        yield {c: dados[c] for c in COLUNAS}
+
+
+def exportar_csv(linhas_por_bloco: int = 200):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS)
+    for i, dados in enumerate(_produtos_com_tags(), start=1):
+        escritor.writerow(dados.values())
+        if i % linhas_por_bloco == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def exportar_ndjson(linhas_por_bloco: int = 200):
+    bloco = []
+    for dados in _produtos_com_tags():
+        bloco.append(json.dumps(dados, ensure_ascii=False))
+        if len(bloco) >= linhas_por_bloco:
+            yield '\n'.join(bloco) + '\n'
+            bloco.clear()
+    if bloco:
+        yield '\n'.join(bloco) + '\n'
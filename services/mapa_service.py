@@ -0,0 +1,94 @@
+import heapq
+from sqlalchemy import func, or_, and_
+from models import db, Produto
+from services.geo import bboxes_do_raio, celulas_cobrindo, distancia_km, precisao_para_zoom
+
+# Precisão máxima das células do pré-filtro de proximidade; celulas_cobrindo
+# reduz conforme o raio para manter poucas faixas no índice.
+_PRECISAO_PROXIMOS = 7
+
+
+def _feature(lon, lat, propriedades):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+        'properties': propriedades,
+    }
+
+
+def _faixas_geohash(celulas, *filtros):
+    """OR de uma faixa do índice por célula, cada uma já com os filtros de igualdade.
+
+    Repetir os filtros em cada termo deixa o SQLite resolver o OR com
+    ix_produto_status_geohash (uma busca por célula) em vez de percorrer todos
+    os produtos do status pelo índice de listagem.
+    """
+    return or_(*(and_(*filtros, Produto.geohash >= c, Produto.geohash < c + '{') for c in celulas))
+
+
+def agrupar_produtos(bbox, zoom):
+    """GeoJSON com os produtos disponíveis no bbox, agrupados por célula geohash.
+
+    O agrupamento é feito no banco (GROUP BY no prefixo do geohash), então o
+    tamanho da resposta depende do que está na tela, não do catálogo inteiro.
+    Grupos com um único produto trazem os dados do produto para o popup.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    precisao = precisao_para_zoom(zoom)
+    faixas = _faixas_geohash(celulas_cobrindo(bbox, precisao), Produto.status == 'disponivel')
+    prefixo = func.substr(Produto.geohash, 1, precisao)
+
+    grupos = db.session.query(
+        func.count(Produto.id),
+        func.avg(Produto.latitude),
+        func.avg(Produto.longitude),
+        func.min(Produto.id),
+    ).filter(
+        faixas,
+        Produto.latitude.between(min_lat, max_lat),
+        Produto.longitude.between(min_lon, max_lon),
+    ).group_by(prefixo).all()
+
+    ids_unicos = [produto_id for total, _, _, produto_id in grupos if total == 1]
+    unicos = {p.id: p for p in Produto.query.filter(Produto.id.in_(ids_unicos))} if ids_unicos else {}
+
+    features = []
+    for total, lat, lon, produto_id in grupos:
+        produto = unicos.get(produto_id)
+        if produto:
+            features.append(_feature(produto.longitude, produto.latitude, {
+                'quantidade': 1,
+                'id': produto.id,
+                'nome': produto.nome,
+                'tipo': produto.tipo,
+                'preco': produto.preco,
+                'foto': produto.url_miniatura('mapa'),
+            }))
+        else:
+            features.append(_feature(float(lon), float(lat), {'quantidade': total}))
+
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def produtos_proximos(lat, lon, raio_km, tipo=None, status='disponivel', limite=50):
+    """[(produto, distância em km)] dentro do raio, do mais perto ao mais longe.
+
+    O índice de geohash seleciona só as células que cobrem o círculo (mais o
+    recorte pelo bbox); a distância exata é calculada nesses candidatos, que
+    vêm como (id, lat, lon). Só os `limite` mais próximos são carregados.
+    """
+    bboxes = bboxes_do_raio(lat, lon, raio_km)
+    filtros = [Produto.status == status] + ([Produto.tipo == tipo] if tipo else [])
+    faixas = _faixas_geohash([c for bbox in bboxes for c in celulas_cobrindo(bbox, _PRECISAO_PROXIMOS)], *filtros)
+    recortes = [and_(Produto.latitude.between(min_lat, max_lat), Produto.longitude.between(min_lon, max_lon))
+                for min_lon, min_lat, max_lon, max_lat in bboxes]
+
+    candidatos = db.session.query(Produto.id, Produto.latitude, Produto.longitude).filter(faixas, or_(*recortes))
+    distancias = heapq.nsmallest(limite, (
+        (d, produto_id) for produto_id, p_lat, p_lon in candidatos
+        if (d := distancia_km(lat, lon, p_lat, p_lon)) <= raio_km
+    ))
+    if not distancias:
+        return []
+    produtos = {p.id: p for p in Produto.query.filter(Produto.id.in_([i for _, i in distancias]))}
+    return [(produtos[i], d) for d, i in distancias if i in produtos]
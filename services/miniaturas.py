@@ -0,0 +1,30 @@
+"""Geração de miniaturas. Roda nos processos do pool de services.fotos.
+
+Fica num módulo à parte, só com o Pillow, para que os processos filhos
+(iniciados com 'spawn') não importem o app inteiro.
+"""
+import os
+from PIL import Image, ImageOps
+
+
+def gerar(original: str, destinos: dict) -> list[str]:
+    """Grava cada miniatura de `destinos` ({caminho: (largura, altura, recortar)}) em JPEG.
+
+    Com `recortar`, preenche exatamente largura×altura (cards e mapa);
+    sem, só limita o maior lado. Retorna os caminhos gravados.
+    """
+    gravados = []
+    with Image.open(original) as imagem:
+        imagem = ImageOps.exif_transpose(imagem).convert('RGB')
+        for caminho, (largura, altura, recortar) in destinos.items():
+            if recortar:
+                miniatura = ImageOps.fit(imagem, (largura, altura), Image.LANCZOS)
+            else:
+                miniatura = imagem.copy()
+                miniatura.thumbnail((largura, altura), Image.LANCZOS)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            temporario = f'{caminho}.{os.getpid()}.tmp'
+            miniatura.save(temporario, 'JPEG', quality=82, optimize=True, progressive=True)
+            os.replace(temporario, caminho)
+            gravados.append(caminho)
+    return gravados
@@ -0,0 +1,44 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+from config import Config
+from models import Produto
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(produto) -> str:
+    valor = json.dumps([produto.created_at.isoformat(), produto.id])
+    return base64.urlsafe_b64encode(valor.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, produto_id = json.loads(bruto)
+        return datetime.fromisoformat(created_at), int(produto_id)
+    except (ValueError, TypeError):
+        raise CursorInvalido(cursor)
+
+
+def paginar_produtos(query, cursor=None, limite=None):
+    """Paginação por keyset em (created_at, id), do mais recente para o mais antigo.
+
+    Retorna (produtos, proximo_cursor); proximo_cursor é None na última página.
+    """
+    limite = limite or Config.PRODUTOS_POR_PAGINA
+    if cursor:
+        created_at, produto_id = decodificar_cursor(cursor)
+        query = query.filter(or_(
+            Produto.created_at < created_at,
+            and_(Produto.created_at == created_at, Produto.id < produto_id),
+        ))
+
+    produtos = query.order_by(Produto.created_at.desc(), Produto.id.desc()).limit(limite + 1).all()
+    if len(produtos) <= limite:
+        return produtos, None
+    produtos = produtos[:limite]
+    return produtos, codificar_cursor(produtos[-1])
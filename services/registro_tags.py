@@ -0,0 +1,109 @@
+import bisect
+import threading
+import time
+from typing import NamedTuple
+from models import db, Tag, VersaoConjunto
+from models.tag import _gerar_slug
+
+
+class TagRegistrada(NamedTuple):
+    id: int
+    nome: str
+    slug: str
+    cor: str
+
+
+class _Retrato:
+    """Cópia imutável da tabela de tags; substituída inteira a cada recarga."""
+
+    def __init__(self, tags: list[TagRegistrada], versao: int):
+        self.versao = versao
+        self.ordenadas = sorted(tags, key=lambda t: t.nome)
+        self.por_id = {t.id: t for t in tags}
+        self.por_slug = {t.slug: t for t in tags}
+        # Cada tag entra uma vez por palavra do slug: 'livros-didaticos' é
+        # encontrada por 'liv' e por 'did'.
+        self.prefixos = sorted(
+            (t.slug[i:], t.id) for t in tags
+            for i in range(len(t.slug)) if i == 0 or t.slug[i - 1] == '-'
+        )
+
+
+class RegistroTags:
+    """Tags em memória por id, por slug e por prefixo (autocompletar).
+
+    As tags mudam pouco e são lidas em toda listagem e no CRUD. O CRUD
+    local chama invalidar() após o commit; mudanças feitas por outros
+    workers aparecem pela versão 'tags' de VersaoConjunto, consultada no
+    máximo a cada REGISTRO_TAGS_INTERVALO segundos — a tabela só é relida
+    quando a versão muda. Uma busca por id ou slug que não acha a tag
+    consulta a versão na hora, para não negar uma tag recém-criada em
+    outro worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._retrato = None
+        self._verificar_em = 0.0
+        self._intervalo = 5
+
+    def init_app(self, app):
+        self._intervalo = app.config.get('REGISTRO_TAGS_INTERVALO', 5)
+
+    def invalidar(self):
+        with self._lock:
+            self._retrato = None
+
+    def _atual(self, verificar: bool = False) -> _Retrato:
+        with self._lock:
+            retrato, verificar = self._retrato, verificar or time.monotonic() >= self._verificar_em
+        if retrato is not None and not verificar:
+            return retrato
+        # A versão é lida antes das tags: uma escrita entre as duas leituras
+        # só provoca uma recarga a mais na próxima verificação.
+        versao = VersaoConjunto.obter(['tags']).get('tags', (0, None))[0]
+        if retrato is None or versao != retrato.versao:
+            tags = [TagRegistrada(*linha) for linha in db.session.query(Tag.id, Tag.nome, Tag.slug, Tag.cor)]
+            retrato = _Retrato(tags, versao)
+        with self._lock:
+            self._retrato = retrato
+            self._verificar_em = time.monotonic() + self._intervalo
+        return retrato
+
+    # ── Consultas ────────────────────────────────────────────────────────────
+
+    def todas(self) -> list[TagRegistrada]:
+        """Todas as tags, ordenadas pelo nome."""
+        return self._atual().ordenadas
+
+    def por_id(self, tag_id) -> TagRegistrada | None:
+        return self._atual().por_id.get(tag_id) or self._atual(verificar=True).por_id.get(tag_id)
+
+    def por_slug(self, texto: str) -> TagRegistrada | None:
+        """Aceita o slug ou o nome: 'Eletrônicos', 'eletronicos' e 'ELETRONICOS ' são a mesma tag."""
+        slug = _gerar_slug(texto)
+        return self._atual().por_slug.get(slug) or self._atual(verificar=True).por_slug.get(slug)
+
+    def por_slugs(self, textos) -> list[TagRegistrada]:
+        slugs = list(dict.fromkeys(map(_gerar_slug, textos)))
+        por_slug = self._atual().por_slug
+        if any(s not in por_slug for s in slugs):
+            por_slug = self._atual(verificar=True).por_slug
+        return [por_slug[s] for s in slugs if s in por_slug]
+
+    def prefixo(self, texto: str, limite: int = 10) -> list[TagRegistrada]:
+        """Tags com alguma palavra começando por `texto`; as que começam por ele vêm primeiro."""
+        retrato = self._atual()
+        chave = _gerar_slug(texto)
+        if not chave:
+            return retrato.ordenadas[:limite]
+        encontradas = {}
+        for sufixo, tag_id in retrato.prefixos[bisect.bisect_left(retrato.prefixos, (chave,)):]:
+            if not sufixo.startswith(chave):
+                break
+            encontradas[tag_id] = retrato.por_id[tag_id]
+        ordem = sorted(encontradas.values(), key=lambda t: (not t.slug.startswith(chave), t.nome))
+        return ordem[:limite]
+
+
+registro_tags = RegistroTags()
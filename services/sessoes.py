@@ -0,0 +1,215 @@
+"""Sessão do Flask guardada no servidor.
+
+O cookie leva só um id aleatório; os dados ficam num armazém plugável:
+'memoria' (LRU deste processo, para um worker só) ou 'banco' (tabela
+`sessao`, compartilhada entre workers). Com 'cookie' fica a sessão
+assinada padrão do Flask.
+
+A sessão é carregada na primeira vez que a requisição a lê, então rotas
+que não tocam em `session` (arquivos estáticos, fotos) não consultam o
+armazém. Cada sessão expira SESSOES_TTL segundos depois do último uso; a
+validade só é renovada quando já passou da metade, para não gravar a
+cada requisição, e as vencidas são varridas periodicamente.
+"""
+import hashlib
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import has_app_context
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from models import Sessao
+
+_ID = re.compile(r'^[A-Za-z0-9_-]{43}$')
+
+
+def _chave(sessao_id: str) -> str:
+    return hashlib.sha256(sessao_id.encode()).hexdigest()
+
+
+class ArmazemMemoria:
+    """LRU limitado em memória: sessões somem no reinício e não são vistas por outros processos."""
+
+    def __init__(self, capacidade: int):
+        self._lock = threading.Lock()
+        self._itens: OrderedDict[str, tuple[str, datetime]] = OrderedDict()
+        self._capacidade = capacidade
+
+    def carregar(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            if item[1] <= datetime.utcnow():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return item
+
+    def salvar(self, chave, dados, expira_em):
+        with self._lock:
+            self._itens[chave] = (dados, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self._capacidade:
+                self._itens.popitem(last=False)
+
+    def apagar(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def expurgar(self) -> int:
+        agora = datetime.utcnow()
+        with self._lock:
+            vencidas = [chave for chave, (_, expira_em) in self._itens.items() if expira_em <= agora]
+            for chave in vencidas:
+                del self._itens[chave]
+        return len(vencidas)
+
+
+class ArmazemBanco:
+    """Tabela `sessao` do banco da aplicação."""
+
+    def __init__(self, app):
+        self._app = app
+
+    def _executar(self, metodo, *args):
+        # A sessão pode ser lida fora do contexto da app (ex.: session_transaction nos testes).
+        if has_app_context():
+            return metodo(*args)
+        with self._app.app_context():
+            return metodo(*args)
+
+    def carregar(self, chave):
+        return self._executar(Sessao.carregar, chave)
+
+    def salvar(self, chave, dados, expira_em):
+        self._executar(Sessao.salvar, chave, dados, expira_em)
+
+    def apagar(self, chave):
+        self._executar(Sessao.apagar, chave)
+
+    def expurgar(self) -> int:
+        return self._executar(Sessao.expurgar)
+
+
+class SessaoServidor(SessionMixin):
+    """Dicionário da sessão que só consulta o armazém no primeiro acesso."""
+
+    def __init__(self, armazem, sessao_id: str | None):
+        self._armazem = armazem
+        self.sid = sessao_id
+        self._dados: dict | None = None if sessao_id else {}
+        self.expira_em: datetime | None = None
+        self.sid_anterior: str | None = None
+        self.vencida = False
+        self.new = sessao_id is None
+        self.modified = False
+        self.accessed = False
+
+    def _carregados(self) -> dict:
+        self.accessed = True
+        if self._dados is None:
+            item = self._armazem.carregar(_chave(self.sid))
+            if item is None:
+                # Id desconhecido ou vencido: começa vazia e ganha id novo ao gravar.
+                self.sid, self.new, self.vencida, self._dados = None, True, True, {}
+            else:
+                self._dados = session_json_serializer.loads(item[0])
+                self.expira_em = item[1]
+        return self._dados
+
+    def __getitem__(self, chave):
+        return self._carregados()[chave]
+
+    def __setitem__(self, chave, valor):
+        self._carregados()[chave] = valor
+        self.modified = True
+
+    def __delitem__(self, chave):
+        del self._carregados()[chave]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._carregados())
+
+    def __len__(self):
+        return len(self._carregados())
+
+    def clear(self):
+        if self._carregados():
+            self._dados.clear()
+            self.modified = True
+
+    def regenerar(self):
+        """Troca o id mantendo os dados (no login, contra fixação de sessão)."""
+        self._carregados()
+        if self.sid:
+            self.sid_anterior, self.sid = self.sid, None
+        self.modified = True
+
+
+class InterfaceSessaoServidor(SessionInterface):
+    def __init__(self, armazem, ttl: int, intervalo_limpeza: int):
+        self.armazem = armazem
+        self._ttl = timedelta(seconds=ttl)
+        self._intervalo_limpeza = intervalo_limpeza
+        self._limpeza_em = 0.0
+        self._lock_limpeza = threading.Lock()
+
+    def open_session(self, app, request):
+        sessao_id = request.cookies.get(self.get_cookie_name(app))
+        return SessaoServidor(self.armazem, sessao_id if sessao_id and _ID.match(sessao_id) else None)
+
+    def save_session(self, app, session, response):
+        if not session.accessed:
+            return
+        response.vary.add('Cookie')
+        nome, dominio, caminho = self.get_cookie_name(app), self.get_cookie_domain(app), self.get_cookie_path(app)
+        if session.sid_anterior:
+            self.armazem.apagar(_chave(session.sid_anterior))
+
+        if not session:
+            if session.sid:
+                self.armazem.apagar(_chave(session.sid))
+            if session.sid or session.vencida or session.sid_anterior:
+                response.delete_cookie(nome, domain=dominio, path=caminho, secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app), httponly=self.get_cookie_httponly(app))
+            return
+
+        agora = datetime.utcnow()
+        renovar = session.expira_em is None or session.expira_em - agora < self._ttl / 2
+        if not (session.modified or renovar):
+            return
+        novo_id = session.sid is None
+        if novo_id:
+            session.sid = secrets.token_urlsafe(32)
+        self.armazem.salvar(_chave(session.sid), session_json_serializer.dumps(dict(session)), agora + self._ttl)
+        if novo_id or session.permanent:
+            response.set_cookie(nome, session.sid, expires=self.get_expiration_time(app, session),
+                                httponly=self.get_cookie_httponly(app), domain=dominio, path=caminho,
+                                secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+        self._talvez_expurgar()
+
+    def _talvez_expurgar(self):
+        """No máximo uma varredura por intervalo e por processo, pega pela requisição que grava."""
+        with self._lock_limpeza:
+            if time.monotonic() < self._limpeza_em:
+                return
+            self._limpeza_em = time.monotonic() + self._intervalo_limpeza
+        self.armazem.expurgar()
+
+
+def init_sessoes(app):
+    tipo = app.config.get('SESSOES_ARMAZEM', 'banco')
+    if tipo == 'cookie':
+        return
+    if tipo == 'memoria':
+        armazem = ArmazemMemoria(app.config.get('SESSOES_CAPACIDADE', 10000))
+    elif tipo == 'banco':
+        armazem = ArmazemBanco(app)
+    else:
+        raise ValueError(f"SESSOES_ARMAZEM desconhecido: {tipo} (use 'cookie', 'memoria' ou 'banco')")
+    app.session_interface = InterfaceSessaoServidor(
+        armazem, app.config.get('SESSOES_TTL', 7 * 24 * 3600), app.config.get('SESSOES_INTERVALO_LIMPEZA', 300))
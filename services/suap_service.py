@@ -1,10 +1,26 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
 from config import Config
-from models import _extrair_nome
+from models import db, _extrair_nome, CacheSuap, Produto, UsuarioInfo
+from services.fila_tarefas import fila
 
 _TIMEOUT = 15
 _HEADERS = {'Content-Type': 'application/json', 'Accept': 'application/json'}
 
+# Sessão compartilhada: reaproveita conexões TLS (keep-alive) entre logins.
+_http = requests.Session()
+_http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=Config.SUAP_POOL_CONEXOES))
+_http.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=Config.SUAP_POOL_CONEXOES))
+
+_executor = ThreadPoolExecutor(max_workers=Config.SUAP_MAX_SONDAGENS, thread_name_prefix='suap')
+
+# Padrão de matrícula → endpoint que respondeu 200 da última vez.
+_endpoint_por_padrao: dict[str, str] = {}
+_memo_lock = threading.Lock()
+
 
 def _base_url() -> str:
     return Config.SUAP_API_BASE_URL
@@ -27,7 +43,7 @@ def autenticar_suap(matricula, senha):
     payload = {'username': str(matricula).strip(), 'password': str(senha).strip()}
 
     try:
-        response = requests.post(url, json=payload, headers=_HEADERS, timeout=_TIMEOUT, verify=True)
+        response = _http.post(url, json=payload, headers=_HEADERS, timeout=_TIMEOUT, verify=True)
     except requests.exceptions.ConnectionError:
         return {'sucesso': False, 'erro': 'Não foi possível conectar ao SUAP. Verifique sua conexão.'}
     except requests.exceptions.Timeout:
@@ -61,27 +77,116 @@ def autenticar_suap(matricula, senha):
     if not token:
         return {'sucesso': False, 'erro': 'Token não encontrado na resposta do SUAP'}
 
-    dados_usuario = obter_dados_usuario_suap(token)
-    if not dados_usuario:
-        return {'sucesso': False, 'erro': 'Não foi possível obter os dados do usuário'}
+    # Sem cache, os dados chegam em segundo plano: o login não espera as sondagens.
+    dados_usuario = dados_em_cache(payload['username'])
+    if dados_usuario is None:
+        sincronizar_em_segundo_plano(payload['username'], token)
 
-    return {'sucesso': True, 'token': token, 'dados_usuario': dados_usuario}
+    return {'sucesso': True, 'token': token, 'dados_usuario': dados_usuario or {}}
 
 
-def obter_dados_usuario_suap(token):
-    headers = {'Authorization': f'Bearer {token}', 'Accept': 'application/json'}
+def _padrao_matricula(matricula) -> str | None:
+    """Forma da matrícula (dígitos → 9, letras → a): alunos e servidores diferem."""
+    if not matricula:
+        return None
+    return re.sub(r'[a-z]', 'a', re.sub(r'\d', '9', str(matricula).strip().lower()))
 
-    for url in _endpoints_dados():
-        try:
-            response = requests.get(url, headers=headers, timeout=_TIMEOUT, verify=True)
-            if response.status_code == 200:
-                return _normalizar_dados(response.json())
-        except requests.exceptions.RequestException:
-            continue
 
+def _buscar(url, headers):
+    try:
+        response = _http.get(url, headers=headers, timeout=_TIMEOUT, verify=True)
+        if response.status_code == 200:
+            return response.json()
+    except (requests.exceptions.RequestException, ValueError):
+        pass
     return None
 
 
+def _sondar_em_paralelo(urls, headers):
+    """Consulta todos os endpoints ao mesmo tempo; o primeiro 200 vence.
+
+    As sondagens ainda não iniciadas são canceladas; as que já estão em voo
+    terminam em segundo plano e são descartadas.
+    """
+    futuros = {_executor.submit(_buscar, url, headers): url for url in urls}
+    try:
+        for futuro in as_completed(futuros):
+            dados = futuro.result()
+            if dados is not None:
+                return futuros[futuro], dados
+    finally:
+        for futuro in futuros:
+            futuro.cancel()
+    return None, None
+
+
+def obter_dados_usuario_suap(token, matricula=None):
+    headers = {'Authorization': f'Bearer {token}', 'Accept': 'application/json'}
+    urls = _endpoints_dados()
+    padrao = _padrao_matricula(matricula)
+
+    with _memo_lock:
+        memorizado = _endpoint_por_padrao.get(padrao)
+    if memorizado:
+        dados = _buscar(memorizado, headers)
+        if dados is not None:
+            return _normalizar_dados(dados)
+        urls = [u for u in urls if u != memorizado]
+
+    url, dados = _sondar_em_paralelo(urls, headers)
+    if dados is None:
+        return None
+
+    if padrao:
+        with _memo_lock:
+            _endpoint_por_padrao[padrao] = url
+    return _normalizar_dados(dados)
+
+
+def dados_em_cache(matricula):
+    return CacheSuap.obter(matricula, Config.SUAP_CACHE_TTL)
+
+
+def dados_usuario_suap(token, matricula):
+    """Leitura com cache: usa os dados guardados da matrícula se ainda dentro do TTL."""
+    dados = dados_em_cache(matricula)
+    if dados is not None:
+        return dados
+    dados = obter_dados_usuario_suap(token, matricula)
+    if dados:
+        CacheSuap.guardar(matricula, dados, Config.SUAP_CACHE_CAPACIDADE)
+    return dados
+
+
+@fila.tarefa('suap.sincronizar_usuario')
+def sincronizar_usuario(matricula, token):
+    """Busca os dados no SUAP (ou no cache) e os aplica ao usuário, se ele já existir.
+
+    Produtos criados antes de o nome chegar recebem o nome agora.
+    """
+    dados = dados_usuario_suap(token, matricula)
+    if not dados:
+        raise RuntimeError('O SUAP não devolveu os dados do usuário.')
+    usuario = UsuarioInfo.query.filter_by(matricula=matricula).first()
+    if usuario:
+        usuario.atualizar_dados_suap(dados)
+        if usuario.nome:
+            for produto in Produto.query.filter_by(usuario_matricula=matricula,
+                                                   usuario_nome=Produto.NOME_DONO_PADRAO):
+                produto.usuario_nome = usuario.nome
+        db.session.commit()
+
+
+def sincronizar_em_segundo_plano(matricula, token) -> int:
+    """Enfileira sincronizar_usuario; pedidos repetidos da mesma matrícula viram uma tarefa só.
+
+    O token fica na tarefa só enquanto ela está ativa: Tarefa apaga os
+    argumentos quando ela conclui ou desiste.
+    """
+    return fila.enfileirar('suap.sincronizar_usuario', chave=f'suap:{matricula}',
+                           matricula=matricula, token=token)
+
+
 def _normalizar_dados(dados):
     nome = _extrair_nome(dados)
     if nome:
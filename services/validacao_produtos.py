@@ -0,0 +1,52 @@
+"""Validação dos campos de produto, comum ao formulário e à importação em lote."""
+from models import TipoProduto, StatusProduto
+
+
+def parse_preco(tipo, preco_str):
+    if tipo != 'venda':
+        return 0.0, None
+    if not preco_str:
+        return None, 'Informe o preço para produtos à venda.'
+    try:
+        return float(preco_str.replace(',', '.')), None
+    except ValueError:
+        return None, 'Preço inválido. Use somente números.'
+
+
+def parse_coordenadas(lat_str, lon_str):
+    try:
+        return float(lat_str.replace(',', '.')), float(lon_str.replace(',', '.'))
+    except (ValueError, AttributeError):
+        return None, None
+
+
+def validar_linha(linha):
+    """Valida uma linha de importação (CSV/NDJSON) com as regras do formulário.
+
+    Retorna (campos, erro); campos usa os nomes das colunas de Produto.
+    """
+    nome = str(linha.get('nome') or '').strip()
+    if not nome:
+        return None, 'Informe o nome do produto.'
+    tipo = str(linha.get('tipo') or TipoProduto.VENDA.value).strip()
+    if tipo not in {t.value for t in TipoProduto}:
+        return None, f'Tipo inválido: {tipo}.'
+    status = str(linha.get('status') or StatusProduto.DISPONIVEL.value).strip()
+    if status not in {s.value for s in StatusProduto}:
+        return None, f'Status inválido: {status}.'
+    preco, erro = parse_preco(tipo, str(linha.get('preco') or '').strip())
+    if erro:
+        return None, erro
+    lat, lon = parse_coordenadas(str(linha.get('latitude') or ''), str(linha.get('longitude') or ''))
+    return {
+        'nome': nome,
+        'tipo': tipo,
+        'status': status,
+        'preco': preco,
+        'descricao': str(linha.get('descricao') or '').strip(),
+        'endereco': str(linha.get('endereco') or '').strip() or None,
+        'latitude': lat,
+        'longitude': lon,
+        'usuario_matricula': str(linha.get('usuario_matricula') or '').strip() or None,
+        'usuario_nome': str(linha.get('usuario_nome') or '').strip() or None,
+    }, None
@@ -0,0 +1,74 @@
+import hashlib
+import os
+from sqlalchemy import event
+from models import db, Produto, Tag, UsuarioInfo, VersaoConjunto
+
+
+class Versoes:
+    """Carimbos para GET condicional a partir de VersaoConjunto.
+
+    As chaves são incrementadas automaticamente no flush (ver listener
+    abaixo); escritas que não passam pelo ORM devem chamar
+    VersaoConjunto.incrementar com as chaves afetadas. Os templates entram
+    no carimbo para que um deploy não devolva 304 com HTML antigo.
+    """
+
+    def __init__(self):
+        self._versao_templates = ''
+
+    def init_app(self, app):
+        pasta = os.path.join(app.root_path, app.template_folder)
+        mtimes = (os.path.getmtime(os.path.join(raiz, nome))
+                  for raiz, _, arquivos in os.walk(pasta) for nome in arquivos)
+        self._versao_templates = str(max(mtimes, default=0))
+
+    def carimbo(self, chaves, *contexto) -> str:
+        """ETag das `chaves` combinadas com o `contexto`. Uma única consulta por chave primária."""
+        versoes = VersaoConjunto.obter(chaves)
+        partes = [self._versao_templates, *map(str, contexto)]
+        partes += [f'{c}={versoes[c][0] if c in versoes else 0}' for c in chaves]
+        return hashlib.sha1('\x1f'.join(partes).encode('utf-8')).hexdigest()
+
+
+versoes = Versoes()
+
+
+# ── Chaves alteradas no flush, gravadas na mesma transação ──────────────────
+
+def _chaves_afetadas(obj) -> set[str]:
+    if isinstance(obj, Produto):
+        return {'produtos', f'usuario:{obj.usuario_matricula}'}
+    if isinstance(obj, Tag):
+        return {'tags'}
+    if isinstance(obj, UsuarioInfo):
+        return {f'usuario:{obj.matricula}'}
+    return set()
+
+
+# Coletadas no before_flush: depois do flush, atributos atribuídos com
+# expressões SQL (Produto.registrar_nota) já não aparecem como modificados.
+@event.listens_for(db.session, 'before_flush')
+def _coletar_chaves(session, flush_context, instancias):
+    chaves = session.info.setdefault('versoes_pendentes', set())
+    for obj in session.new | session.deleted:
+        chaves |= _chaves_afetadas(obj)
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            chaves |= _chaves_afetadas(obj)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _incrementar_versoes(session, flush_context):
+    # Um incremento por chave e transação, mesmo com vários flushes.
+    gravadas = session.info.setdefault('versoes_gravadas', set())
+    chaves = session.info.pop('versoes_pendentes', set()) - gravadas
+    if chaves:
+        VersaoConjunto.incrementar(session.connection(), sorted(chaves))
+        gravadas |= chaves
+
+
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_rollback')
+def _limpar_versoes(session):
+    session.info.pop('versoes_pendentes', None)
+    session.info.pop('versoes_gravadas', None)
@@ -0,0 +1,204 @@
+const mapHomeElement = document.getElementById('map-home');
+if (mapHomeElement) {
+    const view = new ol.View({
+        center: ol.proj.fromLonLat([-35.2110, -5.7945]),
+        zoom: 13
+    });
+
+    const escaparHtml = (texto) => String(texto).replace(/[&<>"']/g,
+        (c) => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+
+    const formatoPreco = (p) => p.tipo === 'venda'
+        ? `R$ ${Number(p.preco).toFixed(2)}`
+        : 'Disponível para troca';
+
+    const styleFunction = (feature) => {
+        const quantidade = feature.get('quantidade');
+        if (quantidade > 1) {
+            return new ol.style.Style({
+                image: new ol.style.Circle({
+                    radius: Math.min(11 + Math.log2(quantidade) * 3, 26),
+                    fill: new ol.style.Fill({ color: 'rgba(0,255,136,0.85)' }),
+                    stroke: new ol.style.Stroke({ color: '#000', width: 2 })
+                }),
+                text: new ol.style.Text({
+                    text: String(quantidade),
+                    fill: new ol.style.Fill({ color: '#000' }),
+                    font: 'bold 12px Poppins, sans-serif'
+                })
+            });
+        }
+        const isVenda = feature.get('tipo') === 'venda';
+        return new ol.style.Style({
+            image: new ol.style.Circle({
+                radius: 11,
+                fill: new ol.style.Fill({ color: isVenda ? '#00FF88' : '#e0e0e0' }),
+                stroke: new ol.style.Stroke({ color: '#000', width: 2 })
+            }),
+            text: new ol.style.Text({
+                text: isVenda ? 'V' : 'T',
+                fill: new ol.style.Fill({ color: '#000' }),
+                font: 'bold 12px Poppins, sans-serif'
+            })
+        });
+    };
+
+    const vectorSource = new ol.source.Vector();
+    const vectorLayer = new ol.layer.Vector({
+        source: vectorSource,
+        style: styleFunction
+    });
+
+    const tileLayer = new ol.layer.Tile({
+        source: new ol.source.XYZ({
+            url: 'https://{a-c}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}.png',
+            attributions: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors, &copy; <a href="https://carto.com/attributions">CARTO</a>'
+        })
+    });
+
+    const mapHome = new ol.Map({
+        target: 'map-home',
+        layers: [tileLayer, vectorLayer],
+        view
+    });
+
+    const geojson = new ol.format.GeoJSON({ featureProjection: 'EPSG:3857' });
+    let requisicaoMapa = null;
+
+    mapHome.on('moveend', function () {
+        const extent = ol.proj.transformExtent(
+            mapHome.getView().calculateExtent(mapHome.getSize()), 'EPSG:3857', 'EPSG:4326');
+        const params = new URLSearchParams({
+            bbox: extent.map((v) => v.toFixed(6)).join(','),
+            zoom: Math.round(mapHome.getView().getZoom())
+        });
+        if (requisicaoMapa) requisicaoMapa.abort();
+        requisicaoMapa = new AbortController();
+        fetch(`${mapHomeElement.dataset.urlMapa}?${params}`, { signal: requisicaoMapa.signal })
+            .then((response) => response.json())
+            .then((data) => {
+                vectorSource.clear();
+                vectorSource.addFeatures(geojson.readFeatures(data));
+            })
+            .catch((error) => {
+                if (error.name !== 'AbortError') console.error(error);
+            });
+    });
+
+    const popupContainer = document.createElement('div');
+    popupContainer.className = 'ol-popup';
+    popupContainer.style.position = 'absolute';
+    popupContainer.style.zIndex = '1000';
+    const popupCloser = document.createElement('a');
+    popupCloser.className = 'ol-popup-closer';
+    popupCloser.href = '#';
+    popupCloser.innerHTML = '&times;';
+    popupContainer.appendChild(popupCloser);
+    const popupContent = document.createElement('div');
+    popupContainer.appendChild(popupContent);
+    document.body.appendChild(popupContainer);
+
+    const overlay = new ol.Overlay({
+        element: popupContainer,
+        autoPan: { animation: { duration: 250 } }
+    });
+    mapHome.addOverlay(overlay);
+
+    popupCloser.onclick = function () {
+        overlay.setPosition(undefined);
+        popupCloser.blur();
+        return false;
+    };
+
+    mapHome.on('singleclick', function (evt) {
+        const feature = mapHome.forEachFeatureAtPixel(evt.pixel, (ft) => ft);
+        if (feature && feature.get('quantidade') > 1) {
+            overlay.setPosition(undefined);
+            view.animate({ center: feature.getGeometry().getCoordinates(), zoom: view.getZoom() + 2, duration: 250 });
+        } else if (feature) {
+            const coord = feature.getGeometry().getCoordinates();
+            const nome = feature.get('nome');
+            const tipo = feature.get('tipo');
+            const preco = formatoPreco(feature.getProperties());
+            const foto = feature.get('foto');
+            const imagem = foto ? `<img src="${escaparHtml(foto)}" alt="" width="160" height="120" style="display:block;margin-bottom:6px;border-radius:6px;">` : '';
+            popupContent.innerHTML = `${imagem}<strong>${escaparHtml(nome)}</strong><br>${tipo.charAt(0).toUpperCase() + tipo.slice(1)}<br>${preco}`;
+            overlay.setPosition(coord);
+        } else {
+            overlay.setPosition(undefined);
+        }
+    });
+}
+
+let notaSelecionada = 0;
+
+function abrirAvaliacao(produtoId) {
+    document.getElementById('produto_id_avaliacao').value = produtoId;
+    document.getElementById('modalAvaliacao').style.display = 'flex';
+    notaSelecionada = 0;
+    atualizarEstrelas();
+}
+
+function fecharAvaliacao() {
+    document.getElementById('modalAvaliacao').style.display = 'none';
+    document.getElementById('formAvaliacao').reset();
+    notaSelecionada = 0;
+    atualizarEstrelas();
+}
+
+function atualizarEstrelas() {
+    const estrelas = document.querySelectorAll('#estrelas i');
+    estrelas.forEach((estrela, index) => {
+        if (index < notaSelecionada) {
+            estrela.className = 'fas fa-star';
+        } else {
+            estrela.className = 'far fa-star';
+        }
+    });
+    document.getElementById('nota_avaliacao').value = notaSelecionada;
+}
+
+document.querySelectorAll('#estrelas i').forEach(estrela => {
+    estrela.addEventListener('click', function() {
+        notaSelecionada = parseInt(this.getAttribute('data-nota'));
+        atualizarEstrelas();
+    });
+    estrela.addEventListener('mouseenter', function() {
+        const nota = parseInt(this.getAttribute('data-nota'));
+        const estrelas = document.querySelectorAll('#estrelas i');
+        estrelas.forEach((e, index) => {
+            if (index < nota) {
+                e.className = 'fas fa-star';
+            } else {
+                e.className = 'far fa-star';
+            }
+        });
+    });
+});
+
+document.getElementById('estrelas').addEventListener('mouseleave', atualizarEstrelas);
+
+function enviarAvaliacao(event) {
+    event.preventDefault();
+    const formData = new FormData(event.target);
+    const produtoId = document.getElementById('produto_id_avaliacao').value;
+
+    fetch(`/produtos/${produtoId}/avaliar`, {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.sucesso) {
+            alert('Avaliação enviada com sucesso!');
+            fecharAvaliacao();
+            location.reload();
+        } else {
+            alert(data.erro || 'Erro ao enviar avaliação');
+        }
+    })
+    .catch(error => {
+        alert('Erro ao enviar avaliação');
+        console.error(error);
+    });
+}
@@ -0,0 +1,94 @@
+const tipoSelect = document.getElementById('tipo');
+const precoGroup = document.getElementById('preco-group');
+const precoInput = document.getElementById('preco');
+
+function togglePreco() {
+    if (tipoSelect.value === 'troca') {
+        precoInput.removeAttribute('required');
+        precoGroup.style.opacity = '0.5';
+    } else {
+        precoInput.setAttribute('required', 'required');
+        precoGroup.style.opacity = '1';
+    }
+}
+
+tipoSelect.addEventListener('change', togglePreco);
+togglePreco();
+
+const enderecoInput = document.getElementById('endereco-input');
+const sugestoesDiv = document.getElementById('sugestoes-endereco');
+let timeoutBusca = null;
+
+if (enderecoInput) {
+    enderecoInput.addEventListener('input', function() {
+        const texto = this.value.trim();
+
+        if (timeoutBusca) {
+            clearTimeout(timeoutBusca);
+        }
+
+        if (texto.length < 3) {
+            sugestoesDiv.style.display = 'none';
+            return;
+        }
+
+        timeoutBusca = setTimeout(function() {
+            buscarSugestoesEndereco(texto);
+        }, 500);
+    });
+
+    document.addEventListener('click', function(e) {
+        if (!enderecoInput.contains(e.target) && !sugestoesDiv.contains(e.target)) {
+            sugestoesDiv.style.display = 'none';
+        }
+    });
+
+    enderecoInput.addEventListener('focus', function() {
+        if (this.value.trim().length >= 3) {
+            buscarSugestoesEndereco(this.value.trim());
+        }
+    });
+}
+
+function buscarSugestoesEndereco(texto) {
+    fetch(`https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(texto)}&limit=5&addressdetails=1&countrycodes=br`)
+        .then(response => response.json())
+        .then(data => {
+            if (data && data.length > 0) {
+                mostrarSugestoes(data);
+            } else {
+                sugestoesDiv.style.display = 'none';
+            }
+        })
+        .catch(() => {
+            sugestoesDiv.style.display = 'none';
+        });
+}
+
+function mostrarSugestoes(sugestoes) {
+    sugestoesDiv.innerHTML = '';
+
+    sugestoes.forEach(function(sugestao) {
+        const item = document.createElement('div');
+        item.className = 'sugestao-item';
+
+        const nome = sugestao.display_name || sugestao.name || 'Endereço';
+        const tipo = sugestao.type || '';
+
+        item.innerHTML = `
+            <strong>${nome}</strong>
+            <small>${tipo ? tipo + ' • ' : ''}${sugestao.lat}, ${sugestao.lon}</small>
+        `;
+
+        item.addEventListener('click', function() {
+            enderecoInput.value = nome;
+            document.getElementById('latitude').value = sugestao.lat;
+            document.getElementById('longitude').value = sugestao.lon;
+            sugestoesDiv.style.display = 'none';
+        });
+
+        sugestoesDiv.appendChild(item);
+    });
+
+    sugestoesDiv.style.display = 'block';
+}
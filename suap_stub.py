@@ -0,0 +1,122 @@
+"""Servidor SUAP falso para desenvolvimento e testes offline.
+
+Implementa /api/token/pair e os endpoints de dados usados por
+services/suap_service.py, com latência e taxa de falhas configuráveis:
+
+    python suap_stub.py --porta 8001 --latencia 0.3 --falhas 0.1
+    SUAP_API_BASE_URL=http://127.0.0.1:8001 python app.py
+
+Matrículas com 14 dígitos respondem como aluno (endpoints de ensino); as
+demais como servidor (endpoints de RH). A senha 'errada' devolve 401.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+_ENDPOINTS_ALUNO = {'/api/ensino/meus-dados-aluno/', '/api/v2/ensino/meus-dados-aluno/'}
+_ENDPOINTS_SERVIDOR = {'/api/rh/eu/', '/api/v2/rh/eu/'}
+
+
+class StubSuap:
+    def __init__(self, porta=0, latencia=0.0, falhas=0.0, semente=None):
+        self.latencia = latencia
+        self.falhas = falhas
+        self.requisicoes: list[str] = []
+        self._aleatorio = random.Random(semente)
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', porta), self._criar_handler())
+        self._servidor.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self._servidor.server_port}'
+
+    def iniciar(self) -> 'StubSuap':
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def _criar_handler(stub):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status, corpo):
+                dados = json.dumps(corpo).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _simular_rede(self) -> bool:
+                """Aplica a latência; retorna False se a requisição deve falhar."""
+                stub.requisicoes.append(f'{self.command} {self.path}')
+                if stub.latencia:
+                    time.sleep(stub.latencia)
+                if stub.falhas and stub._aleatorio.random() < stub.falhas:
+                    self._responder(503, {'detail': 'Falha simulada'})
+                    return False
+                return True
+
+            def do_POST(self):
+                if not self._simular_rede():
+                    return
+                if self.path != '/api/token/pair':
+                    return self._responder(404, {'detail': 'Não encontrado'})
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                try:
+                    corpo = json.loads(self.rfile.read(tamanho) or b'{}')
+                except ValueError:
+                    corpo = {}
+                if not corpo.get('username') or corpo.get('password') == 'errada':
+                    return self._responder(401, {'detail': 'Credenciais inválidas'})
+                self._responder(200, {'access': f"stub-{corpo['username']}", 'refresh': 'stub'})
+
+            def do_GET(self):
+                if not self._simular_rede():
+                    return
+                token = self.headers.get('Authorization', '').removeprefix('Bearer ')
+                if not token.startswith('stub-'):
+                    return self._responder(401, {'detail': 'Token inválido'})
+                matricula = token.removeprefix('stub-')
+                aluno = matricula.isdigit() and len(matricula) == 14
+                if self.path not in (_ENDPOINTS_ALUNO if aluno else _ENDPOINTS_SERVIDOR):
+                    return self._responder(404, {'detail': 'Não encontrado'})
+                self._responder(200, {
+                    'matricula': matricula,
+                    'nome_usual': f'Usuário {matricula}',
+                    'url_foto_150x200': '/media/fotos/stub.jpg',
+                    'vinculo': {
+                        'curso': 'Tecnologia em Análise e Desenvolvimento de Sistemas' if aluno else None,
+                        'campus': 'ZN',
+                    },
+                })
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SUAP falso para testes offline.')
+    parser.add_argument('--porta', type=int, default=8001)
+    parser.add_argument('--latencia', type=float, default=0.0, help='segundos por requisição')
+    parser.add_argument('--falhas', type=float, default=0.0, help='fração de respostas 503 (0 a 1)')
+    args = parser.parse_args()
+
+    stub = StubSuap(args.porta, args.latencia, args.falhas).iniciar()
+    print(f'SUAP falso em {stub.base_url} (latência {args.latencia}s, falhas {args.falhas:.0%})')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub.parar()
@@ -0,0 +1,26 @@
+"""Worker dedicado da fila de tarefas: python worker.py [--threads N]
+
+Com TAREFAS_WORKERS=0 nos processos web, só este processo executa tarefas.
+"""
+import argparse
+import threading
+from app import create_app
+from services.fila_tarefas import fila
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Executa a fila de tarefas.')
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    create_app(TAREFAS_WORKERS=args.threads)
+    print(f'Fila de tarefas com {args.threads} thread(s). Ctrl+C para sair.')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fila.parar()
+
+
+# O guard importa: o pool de miniaturas inicia processos com 'spawn', que reimportam este módulo.
+if __name__ == '__main__':
+    main()